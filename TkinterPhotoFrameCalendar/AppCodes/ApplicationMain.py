@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from AppCodes.Configuration import APP_ROOT_FILE, SoundConfig
+from AppCodes.Configuration import APP_ROOT_FILE, MetricsConfig, SoundConfig
+from AppCodes.EventBus import DATE_CHANGED, DATE_SELECTED, EventBus
+from AppCodes.HotPathMetrics import METRICS
 from AppCodes.ImportCommon import *
 from AppCodes.OutputMedia import SoundSpeaker
+from AppCodes.TickScheduler import TickScheduler
 
 ## 各画面オブジェクト設計モジュール
 from AppCodes.CalendarWindow import Window1
 from AppCodes.DayDetailWindow import Window2
+from AppCodes.YearWindow import Window3
 
 ## 音声スケジューリング用ライブラリ
 import schedule as sd
@@ -23,6 +27,7 @@ class ApplicationMain:
         Param:  アプリ実行フォルダ絶対パス
         '''
         self.__set_app_root(app_root)   # アプリ実行フォルダ絶対パスをテキストファイルへ記憶
+        self.__set_metrics()            # 周期処理の処理時間計測設定
         self._root = tk.Tk()
         self._root.title("TkinterPhotoFrameCalendar")       # ウィンドウタイトル
         scr_w, scr_h = pag.size()
@@ -36,21 +41,28 @@ class ApplicationMain:
         # 各画面オブジェクト生成
         # 0: カレンダー／デジタル時計／スライドショー画面
         # 1: アナログ時計／日付詳細画面
-        self._windows = [Window1(self._root, self._get_current_datetime()),
-                         Window2(self._root, self._get_current_datetime())]
+        # 2: 年間カレンダー画面
+        self._event_bus = EventBus()    # 画面間イベント通知
+        init_datetime = self._get_current_datetime()
+        self.__current_date = init_datetime.date()
+        self._windows = [Window1(self._root, init_datetime, self._event_bus),
+                         Window2(self._root, init_datetime, self._event_bus),
+                         Window3(self._root, init_datetime, self._event_bus)]
+        # カレンダー／年間カレンダーで日付を選択した場合、日付詳細画面を表示（日付詳細情報の更新後）
+        self._event_bus.subscribe(DATE_SELECTED, lambda select_date: self._select_window(1))
         # 各種設定画面
         self._set_sounds()              # 音設定
         self._create_menu_bar()         # メニューバー生成
         self._is_app = True
-        self._datetime_thread = None    # 現在日時更新スレッド
-        self._start_datetime_thread()   # 現在日時更新スレッド開始
+        self._ticker = TickScheduler(self._root, self._update_current_datetime)    # 現在日時更新（毎秒）
+        self._start_datetime_update()   # 現在日時更新開始
         self._select_window(0)          # メイン画面を一番上に表示
         self._root.mainloop()
         
     def __del__(self):
         '''デストラクタ
         '''
-        self._stop_datetime_thread()    # 現在日時更新スレッド終了
+        self._stop_datetime_update()    # 現在日時更新終了
         
     def __set_app_root(self, app_root:str):
         '''アプリ実行フォルダ絶対パスをテキストファイルへ記憶
@@ -61,6 +73,13 @@ class ApplicationMain:
             with open(APP_ROOT_FILE, 'x') as f:
                 f.write(app_root + "/")
 
+    def __set_metrics(self):
+        '''周期処理の処理時間計測設定
+        '''
+        metrics_config = MetricsConfig()
+        METRICS.configure(metrics_config.enabled, metrics_config.export_file, metrics_config.format,
+                          metrics_config.interval)
+
     def _set_sounds(self):
         '''音設定
         '''
@@ -81,57 +100,69 @@ class ApplicationMain:
         self._menu_bar.add_cascade(label='Close', menu=close_menu)
         window_menu.add_command(label='Calendar', command=lambda: self._select_window(0))   # カレンダー／デジタル時計／スライドショー画面表示
         window_menu.add_command(label='DayDetail', command=lambda: self._select_window(1))  # アナログ時計／日付詳細画面表示
+        window_menu.add_command(label='Year', command=lambda: self._select_window(2))       # 年間カレンダー画面表示
         close_menu.add_command(label='Screen Close', command=self.__window_all_close)       # 画面を閉じる
         
     def _select_window(self, window_no:int):
         '''表示画面選択
             0: カレンダー／デジタル時計／スライドショー画面
             1: アナログ時計／日付詳細画面
+            2: 年間カレンダー画面
         '''
         self._windows[window_no].tkraise()
+        # 隠れた画面の更新を止め、表示した画面を現在日時に合わせて更新
+        now = self._get_current_datetime()
+        for index, window in enumerate(self._windows):
+            window.set_shown(index == window_no, now)
         
     def __window_all_close(self):
         '''全ての画面を閉じる
         '''
         self._is_app = False
+        self._stop_datetime_update()    # 現在日時更新終了
+        if METRICS.enabled:
+            METRICS.export()            # 最後の出力周期以降の計測結果を出力
         self._root.destroy()
-        self._stop_datetime_thread()    # 現在日時更新スレッド終了
 
     def _get_current_datetime(self) -> dt.datetime:
         '''現在日時取得
         '''
         return dt.datetime.now()
 
-    def _start_datetime_thread(self):
-        '''現在日時更新スレッド開始
+    def _start_datetime_update(self):
+        '''現在日時更新開始（Tkのメインループ上で毎秒の境界に実行）
+        '''
+        self.__sound_scheduling()       # 音声出力スケジュール
+        self._ticker.start()
+
+    def _stop_datetime_update(self):
+        '''現在日時更新終了
         '''
-        if self._datetime_thread is None:
-            self._datetime_thread = threading.Thread(target=self._update_current_datetime, daemon=True)
-            self._datetime_thread.start()
+        self._ticker.stop()
 
-    def _stop_datetime_thread(self):
-        '''現在日時更新スレッド終了
+    def tick_stats(self) -> dict:
+        '''現在日時更新の遅れの統計を取得
         '''
-        if self._datetime_thread is not None:
-            self._datetime_thread.join()
-            self._datetime_thread = None
+        return self._ticker.stats()
 
-    def _update_current_datetime(self):
+    @METRICS.timed("tick")
+    def _update_current_datetime(self, now:dt.datetime):
         '''現在日時更新
+        Param: 更新日時（秒の境界）
+        ※ウィジェットを操作するため、Tkのメインループ上で呼び出すこと
         '''
-        self.__sound_scheduling()               # 音声出力スケジュール
-        while self._is_app:
-            now = self._get_current_datetime()  # 現在日時を取得
+        if not self._is_app:
+            return
+        with METRICS.timer("schedule_run_pending"):
             sd.run_pending()
-            # カレンダー／デジタル時計／アナログ時計更新
-            self._windows[0].current_datetime_callback(now)
-            self._windows[1].current_time_callback(now.time())
-            # 日時選択確認
-            if self._windows[0].send_date_select_flag():
-                self._windows[1].select_date_callback(self._windows[0].send_selected_date())
-                self._windows[0].date_select_flag_down()
-                self._select_window(1)
-            time.sleep(1)
+        if (self.__current_date != now.date()):
+            # 日付が進んだ場合
+            self.__current_date = now.date()
+            self._event_bus.publish(DATE_CHANGED, now.date())
+        # デジタル時計／アナログ時計更新
+        self._windows[0].current_datetime_callback(now)
+        self._windows[1].current_time_callback(now.time())
+        METRICS.export_if_due(now.timestamp())
 
     def __sound_scheduling(self):
         '''音声出力スケジュール
@@ -28,12 +28,27 @@ class BaseWindow(BaseFrame):
         '''
         super().__init__(master=master)
         self.grid(row=0, column=0, sticky="nsew")
-        self._is_window = True      # 画面が表示されているか
+        self._is_window = True      # 画面が表示されているか（一番上に表示されていない場合は更新しない）
         
     def __del__(self):
         '''デストラクタ
         '''
         self._is_window = False
+
+    def set_shown(self, is_shown:bool, now:dt.datetime):
+        '''画面の表示状態を設定
+        Param: 一番上に表示されているか、現在日時
+        ※隠れていた画面が表示された場合、隠れていた間の更新をまとめて1回だけ行う
+        '''
+        was_shown = self._is_window
+        self._is_window = is_shown
+        if is_shown and (not was_shown):
+            self._catch_up(now)
+
+    def _catch_up(self, now:dt.datetime):
+        '''隠れていた画面が表示された場合の更新（派生クラスで実装）
+        '''
+        pass
         
 
 class BaseCanvas(tk.Canvas):
@@ -58,10 +73,12 @@ class ShowDateCanvas(BaseCanvas):
     def __init__(self, master, height:int, width:int):
         super().__init__(master=master, height=height, width=width)
 
-    def _show_date_label(self, year:int, month:int, day:int):
+    @staticmethod
+    def _show_date_label(year:int, month:int, day:int):
         return "{:04} / {:02} / {:02}".format(year, month, day)
 
-    def _show_time_label(self, hour:int, minute:int, second:int):
+    @staticmethod
+    def _show_time_label(hour:int, minute:int, second:int):
         return "{:02} : {:02} : {:02}".format(hour, minute, second)
 
 
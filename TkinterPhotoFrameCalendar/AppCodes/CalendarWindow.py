@@ -1,25 +1,45 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from AppCodes.BaseLibrary import BaseWindow, BaseFrame, BaseButton, ButtonConfig, ShowDateCanvas
-from AppCodes.Configuration import CalendarConfig, EventFolderConfig
+from AppCodes.Configuration import CalendarConfig, DuplicateConfig, EventFolderConfig, FileConfig, PhotoIndexConfig
+from AppCodes.EventBus import DATE_CHANGED, DATE_SELECTED, MONTH_CHANGED, EventBus
+from AppCodes.FolderWatch import EVENT_ADD, EVENT_REMOVE, EVENT_REMOVE_FOLDER, EVENT_RESCAN, create_folder_watcher
+from AppCodes.HotPathMetrics import METRICS
 from AppCodes.ImportCommon import *
-from AppCodes.OutputMedia import ImageView, ImageSynchronize
+from AppCodes.MonthGrid import MonthGridCache
+from AppCodes.OutputMedia import ImageView, ImagePrefetcher, ImageSynchronize, ImageTranscoder
+from AppCodes.PhotoIndex import PhotoIndex
+from AppCodes.Playlist import ShufflePlaylist, StreamingPlaylist
+
+## 同期処理用ライブラリ
+from concurrent.futures import ThreadPoolExecutor
+
+## ログ出力用ライブラリ
+import logging
+
+
+### 定数
+LOGGER = logging.getLogger(__name__)
 
 
 class Window1(BaseWindow):
     ''' カレンダー／デジタル時計／スライドショー画面設計クラス
     '''
-    def __init__(self, master, init_date:dt.datetime):
+    def __init__(self, master, init_date:dt.datetime, event_bus:EventBus):
         '''コンストラクタ
-        Param: 画面生成日時
+        Param: 画面生成日時、画面間イベント通知
         '''
         super().__init__(master=master)
-        self.__current_date = init_date
+        self.__event_bus = event_bus
         self.__folder_config = EventFolderConfig()
+        self.__prestage_date = None     # 翌日のスライドショー画像の準備を開始した日付
+        self.__create_photo_index()
         # カレンダーとディジタル時計表示部分
         self._create_datetime_frame(init_date)
         # スライドショー表示部分
         self._create_slideshow_frame(init_date.date())
+        # 日付が進んだ場合にカレンダーとスライドショー画像フォルダを変更
+        event_bus.subscribe(DATE_CHANGED, self.__date_changed_callback)
         # メイン画面生成時の日時を設定
         self.current_datetime_callback(now=init_date)
         
@@ -34,7 +54,7 @@ class Window1(BaseWindow):
         datetime_frame = BaseFrame(master=self)
         datetime_frame.pack(side=tk.LEFT)
         # カレンダー表示部分生成
-        self._cal = Calendar(master=datetime_frame, init_date=init_date.date())     # カレンダーオブジェクト生成
+        self._cal = Calendar(master=datetime_frame, init_date=init_date.date(), event_bus=self.__event_bus)    # カレンダーオブジェクト生成
         self._cal.pack()
         self.update()
         # ディジタル時計表示部分生成
@@ -49,11 +69,80 @@ class Window1(BaseWindow):
         '''
         slideshow_frame = BaseFrame(master=self)
         slideshow_frame.pack(side=tk.LEFT)
-        self._slideshow_view = SlideShow(master=slideshow_frame, length=self._MAIN_L, interval=self.__folder_config.interval)
+        self._slideshow_view = SlideShow(master=slideshow_frame, length=self._MAIN_L, interval=self.__folder_config.interval,
+                                        prefetch=self.__folder_config.prefetch, sync_mode=self.__folder_config.sync_mode,
+                                        copy_concurrency=self.__folder_config.copy_concurrency,
+                                        transcode_workers=self.__folder_config.transcode_workers,
+                                        watcher=create_folder_watcher(self.__folder_config.watch, self.__folder_config.watch_interval),
+                                        duplicate_filter=self.__create_duplicate_filter(),
+                                        playlist_mode=self.__folder_config.playlist,
+                                        stream_window=self.__folder_config.stream_window)
         self._slideshow_view.pack(fill = tk.BOTH)
         self.update()
         # スライドショー画像フォルダ初期値設定
-        self._slideshow_view.change_src_folder(self.__folder_config.get_event_folder(init_date.month, init_date.day))
+        self.__change_slideshow_folder(init_date)
+        
+    def __create_duplicate_filter(self):
+        '''類似画像の重複表示抑制オブジェクトを生成
+        Return: 重複表示抑制オブジェクト（抑制しない場合はNone）
+        '''
+        duplicate_config = DuplicateConfig()
+        if not duplicate_config.enabled:
+            return None
+        from AppCodes.PhotoHash import DuplicateFilter     # NumPy は重複表示抑制を使用する場合のみ必要
+        return DuplicateFilter(FileConfig().app_root_folder + "images/" + duplicate_config.db_file,
+                               duplicate_config.distance, duplicate_config.workers)
+
+    def __create_photo_index(self):
+        '''画像メタデータ索引を生成し、外部画像フォルダの走査をバックグラウンドで開始
+        '''
+        index_config = PhotoIndexConfig()
+        self.__photo_index = None
+        self.__on_this_day = index_config.on_this_day
+        if index_config.enabled:
+            self.__photo_index = PhotoIndex(FileConfig().app_root_folder + "images/" + index_config.db_file)
+            self.__photo_index.start_rescan(self.__folder_config.root_folder)
+
+    def __get_slideshow_source(self, show_date:dt.date) -> tuple:
+        '''指定月日のスライドショー画像の取得元を取得
+        Return: (外部側フォルダリスト, フォルダ毎の表示重み, 索引から取得した画像（索引を使用しない場合はNone）)
+        ※索引の走査が完了するまでは、フォルダを走査する
+        '''
+        folders = self.__folder_config.get_event_folder(show_date.month, show_date.day)
+        weights = self.__folder_config.get_folder_weights(folders)
+        if (self.__photo_index is None) or (not self.__photo_index.is_ready):
+            return (folders, weights, None)
+        if self.__on_this_day:
+            # 同じ月日に撮影された画像がある場合はそれを表示
+            images = self.__photo_index.query_on_this_day(show_date.month, show_date.day)
+            if (len(images) > 0):
+                return ([], {}, images)
+        return (folders, weights, self.__photo_index.query_folders(folders))
+
+    def __change_slideshow_folder(self, show_date:dt.date):
+        '''スライドショー画像フォルダを指定月日のものに変更
+        ※準備済みの場合は切り替えのみ行う
+        '''
+        if self.__photo_index is not None:
+            self.__photo_index.start_rescan(self.__folder_config.root_folder)   # 翌日以降のために索引を更新
+        if self._slideshow_view.activate_staged(show_date):
+            return
+        folders, weights, images = self.__get_slideshow_source(show_date)
+        self._slideshow_view.change_src_folder(folders, weights, images)
+
+    def __prestage_slideshow_folder(self, now:dt.datetime):
+        '''日付変更の設定時間前になった場合、翌日のスライドショー画像をバックグラウンドで準備
+        '''
+        if (self.__folder_config.prestage_minutes <= 0):
+            return
+        tomorrow = now.date() + dt.timedelta(days=1)
+        if (self.__prestage_date == tomorrow):
+            return      # 準備開始済み
+        prestage_start = dt.datetime.combine(tomorrow, dt.time()) - dt.timedelta(minutes=self.__folder_config.prestage_minutes)
+        if (now >= prestage_start):
+            self.__prestage_date = tomorrow
+            folders, weights, images = self.__get_slideshow_source(tomorrow)
+            self._slideshow_view.prestage_src_folder(tomorrow, folders, weights, images)
         
     def current_datetime_callback(self, now:dt.datetime):
         '''現在日時を更新
@@ -61,32 +150,44 @@ class Window1(BaseWindow):
         if (self._is_window == True):
             self._d_clock.clock_update(now)                     # ディジタル時計更新
             self._slideshow_view.change_show_image(now.second)  # スライドショー画像更新
-            if (self.__current_date != now.date()):
-                # 日付が進んだ場合
-                self._cal.current_date_callback(now.date())     # カレンダー更新
-                self._slideshow_view.change_src_folder(self.__folder_config.get_event_folder(now.month, now.day))   # スライドショー画像フォルダ変更
-                self.__current_date = now.date()
-            
-    def send_date_select_flag(self) -> bool:
-        return self._cal.date_selected
+        self.__prestage_slideshow_folder(now)                   # 翌日のスライドショー画像を準備（画面が隠れていても行う）
 
-    def date_select_flag_down(self):
-        self._cal.date_selected = False
+    def _catch_up(self, now:dt.datetime):
+        '''隠れていた画面が表示された場合、時計とスライドショー画像を現在日時に合わせて更新
+        ※隠れていた間に表示間隔を過ぎているため、表示間隔の秒でなくてもスライドショー画像を1回だけ進める
+        '''
+        self._d_clock.clock_update(now)                                 # ディジタル時計更新
+        self._slideshow_view.change_show_image(now.second, force=True)  # スライドショー画像更新
+        self.__prestage_slideshow_folder(now)                           # 翌日のスライドショー画像を準備
 
-    def send_selected_date(self) -> dt.date:
-        return self._cal.select_date_send()
+    def __date_changed_callback(self, new_date:dt.date):
+        '''日付が進んだ場合の処理
+        '''
+        self._cal.current_date_callback(new_date)       # カレンダー更新
+        self.__change_slideshow_folder(new_date)        # スライドショー画像フォルダ変更
     
 
 class Calendar(BaseFrame):
     ''' カレンダー設計クラス
     '''
-    def __init__(self, master, init_date:dt.date):
+    ### 定数
+    # 表示年月の変更依頼をまとめる待ち時間[ms]（年選択ボックスの自動リピート（50ms間隔）やボタンの連打より長くする）
+    NAVIGATE_DELAY_MS = 150
+
+    def __init__(self, master, init_date:dt.date, event_bus:EventBus):
         '''コンストラクタ
-        Param: 画面生成日時
+        Param: 画面生成日時、画面間イベント通知
         '''
         super().__init__(master=master)
+        self.__event_bus = event_bus
         self._is_shown = False
         self._set_calendar_config()                 # カレンダー表示設定
+        # 連続した表示年月の変更をまとめるための状態
+        self.__render_id = None                     # 予約中の表示処理（after）
+        self.__requested_at = 0.0                   # 最後に表示年月の変更を依頼した時刻（perf_counter）
+        self.requests = 0                           # 表示年月の変更依頼数
+        self.renders = 0                            # カレンダーの表示回数
+        self.navigation_latency = 0.0               # 最後の依頼から表示完了までの時間[s]
         # カレンダー生成時の日時を初期値として設定
         self.current_date_callback(init_date)
         self.__select_date = [init_date.year, init_date.month, init_date.day]
@@ -95,7 +196,6 @@ class Calendar(BaseFrame):
         self.__create_weekday_frame()               # 曜日フレームを生成
         self.__create_show_calendar_frame()         # 選択年月カレンダー表示フレームを生成
         self._is_shown = True
-        self.date_selected = False
         
     def __del__(self):
         '''デストラクタ
@@ -108,6 +208,7 @@ class Calendar(BaseFrame):
         self.__config = CalendarConfig()
         self._week_texts = self.__config.get_week_texts()
         self._month_texts = self.__config.get_month_texts()
+        self.__month_grids = MonthGridCache()       # 年月毎のカレンダー表示内容
 
     def current_date_callback(self, now:dt.date):
         '''現在の年月日外部から取得
@@ -115,11 +216,6 @@ class Calendar(BaseFrame):
         self.__current_date = now
         self.__show_today()
 
-    def select_date_send(self) -> dt.date:
-        '''選択した年月日を外部へ渡す
-        '''
-        return dt.date(self.__select_date[0], self.__select_date[1], self.__select_date[2])
-
     def __create_select_frame(self):
         '''年月選択フレームを生成
         Param:
@@ -181,87 +277,89 @@ class Calendar(BaseFrame):
         '''
         self.__show_calendar_frame = BaseFrame(master=self)
         self.__show_calendar_frame.pack()
+        # 日付ボタン42マス分は1回だけ生成し、表示年月の変更時は表示内容のみ変更
+        self.__day_buttons = []
+        for index in range(0, 42):
+            day_button = DayButton(self.__show_calendar_frame)
+            day_button.bind('<ButtonPress>', self.__set_select_day)
+            day_button.grid(row=index // 7, column=index % 7)
+            self.__day_buttons.append(day_button)
         self.__show_select_calendar(self.__select_date[0], self.__select_date[1])
         
+    @METRICS.timed("calendar_show")
     def __show_select_calendar(self, year, month):
         '''指定した年月のカレンダー表示
         Param: 指定年月
         '''
-        try:
-            for key,item in button_day.items():
-                item.destroy()
-        except:
-            pass
-        days = self.__config.get_monthcalendar(year, month)
-        holiday_list = self.__config.get_holiday_list(year, month)  # 祝日リストを取得
-        button_day = {}     # 日付ボタンを格納する変数をdict型で作成
-        f_color = 0
-        b_color = 0
-        # 日付ボタンを生成
-        for index in range(0, 42):
-            day_text = ""
-            col = index - (7 * int(index/7))
-            row = int(index/7)
-            try:
-                if (days[row][col] != 0):
-                    day_text = str(days[row][col])      # ボタンに日付を記入（0でない場合）
-                    if (col == 0):
-                        f_color = 2         # 日曜日
-                    elif (col == 6):
-                        if days[row][col] in holiday_list.keys():
-                            f_color = 2     # 祝日
-                        else:
-                            f_color = 1     # 通常の土曜日
-                    else:
-                        if days[row][col] in holiday_list.keys():
-                            f_color = 2     # 祝日
-                        else:
-                            f_color = 0     # 平日
-                    # 今日の日付のボタンのみ背景を変える
-                    if (days[row][col] != self.__current_date.day):
-                        b_color = 0
-                    else:
-                        if ((year==self.__current_date.year) and (month==self.__current_date.month)):
-                            b_color = 1
-                        else:
-                            b_color = 0
-                else:
-                    day_text = ""
-                    f_color = 0
-                    b_color = 0
-            except:
-                # 月によってはindex=41まで日付がないため、日付がないindexのエラー回避が必要
-                day_text = ""
-                f_color = 0
-                b_color = 0
-            button_day[index] = DayButton(self.__show_calendar_frame, day_text, f_color, b_color)
-            if (day_text!=""):
-                button_day[index].bind('<ButtonPress>', self.__set_select_day)
-            button_day[index].grid(row=row, column=col)
+        cells = self.__month_grids.get(year, month).cells(self.__current_date)
+        for day_button, (day_text, f_color, b_color) in zip(self.__day_buttons, cells):
+            day_button.set_day(day_text, f_color, b_color)
+        self.__month_grids.prefetch_neighbors(year, month)     # 前後の月への移動に備える
         self.__select_date[0] = year
         self.__select_date[1] = month
+        self.__shown_month = (year, month)
+        self.renders += 1
+        self.__event_bus.publish(MONTH_CHANGED, (year, month))
         
     def __set_select_day(self, event):
-        '''選択した日付を設定
+        '''選択した日付を設定し、日付選択イベントを発行
         '''
-        self.__select_date[2] = int(event.widget.cget("text"))
-        self.date_selected = True
+        day_text = event.widget.cget("text")
+        if (day_text == ""):
+            return      # 日付がないマス
+        # 表示待ちの年月ではなく、表示中の年月の日付とする
+        self.__select_date[2] = int(day_text)
+        self.__event_bus.publish(DATE_SELECTED, dt.date(self.__shown_month[0], self.__shown_month[1], self.__select_date[2]))
 
     def __show_today(self):
         '''表示カレンダーを今日の年月のものに戻す
         '''
         if (self._is_shown == True):
-            self.__select_year_box.set(self.__current_date.year)                        # 現在の年
-            self.__select_month_box.set(self._month_texts[self.__current_date.month])   # 現在の月
-            self.__show_select_calendar(self.__current_date.year, self.__current_date.month)
+            self.request_month(self.__current_date.year, self.__current_date.month)   # 現在の年月
+
+    def show_month(self, year:int, month:int):
+        '''表示カレンダーを指定した年月のものにすぐに変更
+        '''
+        self.__select_year_box.set(year)
+        self.__select_month_box.set(self._month_texts[month])
+        self.__show_select_calendar(year, month)
+
+    def request_month(self, year:int, month:int):
+        '''表示カレンダーの指定した年月への変更を依頼
+        ※年月選択ボックスはすぐに変更し、カレンダーは依頼が NAVIGATE_DELAY_MS 途切れた時点で最後に依頼された年月のみ表示
+          （ボタンの連打や年選択ボックスの連続変更で、途中の年月を表示しない）
+        '''
+        self.__select_year_box.set(year)
+        self.__select_month_box.set(self._month_texts[month])
+        self.__select_date[0] = year
+        self.__select_date[1] = month
+        self.__requested_at = time.perf_counter()
+        self.requests += 1
+        if self.__render_id is not None:
+            self.after_cancel(self.__render_id)     # 依頼の度に待ち時間を延長
+        self.__render_id = self.after(self.NAVIGATE_DELAY_MS, self.__show_requested_month)
+
+    def __show_requested_month(self):
+        '''最後に依頼された年月のカレンダーを表示
+        '''
+        self.__render_id = None
+        requested_at = self.__requested_at
+        self.__show_select_calendar(self.__select_date[0], self.__select_date[1])
+        # ボタンの再描画も待機状態で行われるため、その後に表示完了までの時間を記録
+        self.after_idle(self.__record_navigation_latency, requested_at)
+
+    def __record_navigation_latency(self, requested_at:float):
+        '''最後の依頼から表示完了までの時間を記録
+        '''
+        self.navigation_latency = time.perf_counter() - requested_at
+        if METRICS.enabled:
+            METRICS.observe("calendar_navigation", self.navigation_latency)
 
     def __change_year(self):
         '''表示年を変更
         '''
-        self.__select_date[0] = int(self.__select_year_box.get())
         # 表示カレンダーを選択した年のものに変更
-        self.__select_year_box.set(self.__select_date[0])
-        self.__show_select_calendar(self.__select_date[0], self.__select_date[1])
+        self.request_month(int(self.__select_year_box.get()), self.__select_date[1])
 
     def __change_month(self, event):
         '''表示月を変更
@@ -281,9 +379,7 @@ class Calendar(BaseFrame):
             self.__select_date[0] += 1
             self.__select_date[1] = 1
         # 表示カレンダーを選択した年月のものに変更
-        self.__select_year_box.set(self.__select_date[0])
-        self.__select_month_box.set(self._month_texts[self.__select_date[1]])
-        self.__show_select_calendar(self.__select_date[0], self.__select_date[1])
+        self.request_month(self.__select_date[0], self.__select_date[1])
         
 
 class DayButton(tk.Button):
@@ -299,6 +395,23 @@ class DayButton(tk.Button):
         super().__init__(master=master)
         self.configure(font=(FONT, 14), height=2, width=4, relief=tk.RAISED, text=text,
                        foreground=self._fg_color[fg], background=self._bg_color[bg])
+        self.__shown = (text, fg, bg)   # 表示中の内容
+
+    def set_day(self, text:str, fg:int, bg:int):
+        '''表示内容を変更（変わった項目のみ設定）
+        Param: 日付テキスト、文字色番号、背景色番号
+        '''
+        if (text, fg, bg) == self.__shown:
+            return
+        options = {}
+        if text != self.__shown[0]:
+            options["text"] = text
+        if fg != self.__shown[1]:
+            options["foreground"] = self._fg_color[fg]
+        if bg != self.__shown[2]:
+            options["background"] = self._bg_color[bg]
+        self.configure(**options)
+        self.__shown = (text, fg, bg)
 
 
 class MonthSelectBox(ttk.Combobox):
@@ -321,6 +434,7 @@ class DigitalClock(ShowDateCanvas):
         global digital
         digital = self.create_text(width/2, height/2, font=self._set_font(28), fill=self._fg_color)
 
+    @METRICS.timed("digital_clock")
     def clock_update(self, now:dt.datetime):
         '''ディジタル時計更新
         '''
@@ -331,68 +445,418 @@ class DigitalClock(ShowDateCanvas):
 class SlideShow(ImageView):
     ''' 外部格納画像表示クラス
     '''
-    def __init__(self, master, length:int, interval:int):
+    ### 定数
+    __IMAGE_PATTERN = re.compile(r'.+\.(jpe?g|png|bmp|gif|webp|tiff?)$', re.IGNORECASE)   # 表示対象の画像形式
+
+    def __init__(self, master, length:int, interval:int, prefetch:int, sync_mode:str, copy_concurrency:int=1,
+                 transcode_workers:int=0, watcher=None, duplicate_filter=None, playlist_mode:str="shuffle",
+                 stream_window:int=1024):
         '''コンストラクタ
-        Param: マスター、表示用キャンバス長、画像切り替え間隔[s]
+        Param: マスター、表示用キャンバス長、画像切り替え間隔[s]、先読み枚数、外部画像の同期方式、
+               外部画像の同時コピー数、JPEG変換のワーカープロセス数、外部側フォルダ監視オブジェクト（監視しない場合はNone）、
+               類似画像の重複表示抑制オブジェクト（抑制しない場合はNone）、表示順の作成方式、stream 方式で保持する画像数
         '''
         super().__init__(master, length, length)
         self._set_folder_path("SlideShow")
-        self._inside_folder_init()      # 内部側画像フォルダ初期化
-        self.__syn_pcs = ImageSynchronize(self._inside_folder)
+        self.__syn_pcs = ImageSynchronize(self._inside_folder, sync_mode, copy_concurrency)
+        # 翌日分の準備用（日付変更時に表示用と入れ替える）
+        self.__spare_folder = self._images_root_folder + "SlideShow_2"
+        self.__spare_syn_pcs = ImageSynchronize(self.__spare_folder, sync_mode, copy_concurrency)
+        self.__staged = None            # 準備済みの翌日分 (日付, 外部側フォルダ, 表示重み, 索引の画像, 同期, 表示順)
+        self.__stage_lock = threading.Lock()
         # アプリ起動時に表示する初期画像設定
-        init_image = os.path.basename(self.__syn_pcs.move_image(self._images_root_folder + "top_sample.jpg"))
-        self._set_image_plot_to_all_canvas(init_image)
+        if self.__syn_pcs.is_direct():
+            # 直接表示の場合、内部側フォルダを使用しない
+            self._set_image_path_plot_to_all_canvas(self._images_root_folder + "top_sample.jpg")
+        else:
+            self._inside_folder_init()      # 内部側画像フォルダ初期化
+            self.__init_folder(self.__spare_folder)
+            self._set_image_path_plot_to_all_canvas(self.__syn_pcs.move_image(self._images_root_folder + "top_sample.jpg"))
         global slide
         slide = self.create_image(0, 0, image=self._show_image, anchor=tk.NW)
         # スライドショー設定
         self._outside_folders = []
-        self._show_list = []
-        self._show_index = 0
+        self.__folder_weights = {}      # 外部側フォルダ毎の表示重み
+        self.__indexed_images = None    # 索引から取得した表示画像（索引を使用しない場合はNone）
+        self._playlist = ShufflePlaylist()
+        self.__playlist_mode = playlist_mode
+        self.__stream_window = stream_window
         self.__interval_sec = interval
+        self.__prefetch_depth = prefetch
+        self.__prefetcher = ImagePrefetcher(self._load_image, prefetch)   # 表示予定画像の先読み
+        self.__watcher = watcher
+        self.__transcoder = ImageTranscoder(self._images_root_folder + "Transcoded", transcode_workers)
+        self.__dup_filter = duplicate_filter
+        self.__dup_generation = None    # 表示リストへ反映済みの重複判定結果
+        # 同期・表示順の作成は周期処理の外（ワーカースレッド）で行う
+        self.__sync_worker = ThreadPoolExecutor(max_workers=1)
+        self.__resync = None            # 同期中の処理（完了後に表示順を切り替える）
+        self.__waiting_image = None     # 先読みが間に合わず、読み込み完了を待っている画像
         
     def __del__(self):
         '''デストラクタ
         '''
-        self._inside_folder_init()
+        self.__prefetcher.stop_thread()
+        self.__transcoder.stop()
+        self.__sync_worker.shutdown(wait=True, cancel_futures=True)
+        if self.__dup_filter is not None:
+            self.__dup_filter.stop_thread()
+        if self.__watcher is not None:
+            self.__watcher.stop_thread()
+        if not self.__syn_pcs.is_direct():
+            self._inside_folder_init()
+            self.__init_folder(self.__spare_folder)
         
+    def _source_record(self, image_path:str) -> tuple:
+        '''表示画像の元画像の (ファイルパス, サイズ, 更新日時) を取得
+        ※内部側フォルダのコピーは再起動や日付変更で作り直されるため、外部側フォルダの画像を元画像とする
+        '''
+        for syn_pcs in (self.__syn_pcs, self.__spare_syn_pcs):
+            record = syn_pcs.source_record(image_path)
+            if record is not None:
+                return record
+        return super()._source_record(image_path)
+
     def _inside_folder_init(self):
         '''内部側画像フォルダ初期化
         '''
-        if os.path.isdir(self._inside_folder):
-            shutil.rmtree(self._inside_folder)  # 内部側フォルダが既に存在する場合、フォルダごと画像を削除
-        os.mkdir(self._inside_folder)           # フォルダを作り直す
+        self.__init_folder(self._inside_folder)
+
+    def __init_folder(self, folder:str):
+        '''画像フォルダ初期化
+        '''
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)   # フォルダが既に存在する場合、フォルダごと画像を削除
+        os.mkdir(folder)            # フォルダを作り直す
 
-    def change_src_folder(self, folders:list):
+    def change_src_folder(self, folders:list, weights:dict=None, indexed_images:list=None):
         '''スライドショー表示画像が格納されている外部側フォルダを変更
+        Param: 外部側フォルダリスト、フォルダ毎の表示重み（省略時は全て1）、
+               索引から取得した (画像ファイルパス, サイズ, 更新日時) のリスト（省略時はフォルダを走査）
         '''
         self._outside_folders = folders
-        self.__syn_pcs.synchronize(folders)     # 外部側フォルダと内部側フォルダの画像を同期
-        self._show_images_shuffle()             # 表示画像の順番をシャッフル
-        self._show_index = 0
+        self.__folder_weights = weights if weights is not None else {}
+        self.__indexed_images = indexed_images
+        # 外部側フォルダと内部側フォルダの画像を同期し、表示順を作成（完了までは現在の表示順で表示）
+        self.__resync = self.__sync_worker.submit(self.__resync_worker, self.__syn_pcs, folders, self.__folder_weights,
+                                                  indexed_images, True, True)
+
+    def prestage_src_folder(self, show_date:dt.date, folders:list, weights:dict, indexed_images:list=None):
+        '''指定日のスライドショー画像をバックグラウンドで準備
+        Param: 表示日、外部側フォルダリスト、フォルダ毎の表示重み、索引から取得した画像（省略時はフォルダを走査）
+        ※同期・表示順の作成・最初の数枚の読み込みを行い、activate_staged() で切り替える
+        '''
+        if ((folders == self._outside_folders) and (weights == self.__folder_weights)
+            and (indexed_images == self.__indexed_images)):
+            with self.__stage_lock:
+                self.__staged = (show_date, None, None, None, None, None)   # 表示画像の変更なし
+            return
+        stage_thread = threading.Thread(target=self.__prestage_worker, args=(show_date, folders, weights, indexed_images),
+                                        daemon=True)
+        stage_thread.start()
+
+    def activate_staged(self, show_date:dt.date) -> bool:
+        '''準備済みのスライドショー画像へ切り替え
+        Param:  表示日
+        Return: 切り替えたか（指定日の準備が完了していない場合はFalse）
+        '''
+        with self.__stage_lock:
+            staged = self.__staged
+            self.__staged = None
+        if (staged is None) or (staged[0] != show_date):
+            return False
+        staged_date, folders, weights, indexed_images, syn_pcs, playlist = staged
+        if folders is None:
+            return True     # 表示画像の変更なし
+        # 表示用と準備用を入れ替え
+        self.__spare_syn_pcs, self.__syn_pcs = self.__syn_pcs, syn_pcs
+        self.__spare_folder, self._inside_folder = self._inside_folder, self.__spare_folder
+        self._outside_folders = folders
+        self.__folder_weights = weights
+        self.__indexed_images = indexed_images
+        playlist.continue_from(self._playlist)
+        self._playlist = playlist
+        self.__dup_generation = None    # 準備中に更新された重複判定結果を反映し直す
+        self.__waiting_image = None
+        # 外部側フォルダの監視対象の変更のみワーカースレッドで行う
+        self.__resync = self.__sync_worker.submit(self.__resync_worker, syn_pcs, folders, weights, indexed_images,
+                                                  True, False)
+        self.__prefetch_next_images()
+        return True
+
+    def __resync_worker(self, syn_pcs:ImageSynchronize, folders:list, weights:dict, indexed_images:list,
+                        rewatch:bool, resync:bool, playlist=None) -> tuple:
+        '''外部側フォルダの監視対象の変更、同期、表示順の作成（ワーカースレッドで実行）
+        Param:  同期、外部側フォルダリスト、フォルダ毎の表示重み、索引から取得した画像、監視対象を変更するか、同期するか、
+                引き続き使用する表示順（省略時は新規作成）
+        Return: (同期, 作成した表示順（同期しない場合はNone）)
+        '''
+        if rewatch and (self.__watcher is not None):
+            self.__watcher.watch(folders)       # 外部側フォルダの監視対象を変更
+            self.__watcher.get_events()         # 直後の同期に含まれるため、変更前のイベントは破棄
+        if not resync:
+            return (syn_pcs, None)
+        syn_pcs.synchronize(folders, indexed_images)
+        self.__prune_transcoded()
+        return (syn_pcs, self.__build_playlist(syn_pcs, folders, weights, indexed_images, playlist))
+
+    def __prune_transcoded(self):
+        '''表示用・準備用のどちらの同期対象でもなくなった画像の変換済み画像を削除
+        '''
+        sources = [source for syn_pcs in (self.__syn_pcs, self.__spare_syn_pcs)
+                   for source in syn_pcs.outside_images() if self.__transcoder.needs_transcode(source[0])]
+        self.__transcoder.prune(sources)
+
+    def __apply_resync(self) -> bool:
+        '''ワーカースレッドでの同期が完了した場合、作成した表示順へ切り替え
+        Return: 同期中か
+        '''
+        if self.__resync is None:
+            return False
+        if not self.__resync.done():
+            return True
+        future = self.__resync
+        self.__resync = None
+        try:
+            syn_pcs, playlist = future.result()
+        except Exception:
+            LOGGER.exception("failed to resynchronize slideshow images")
+            return False    # 次の周回で再同期
+        if (syn_pcs is self.__syn_pcs) and (playlist is not None):
+            if playlist is not self._playlist:
+                playlist.continue_from(self._playlist)  # 周の切り替わりで同じ画像が連続しないようにする
+            self._playlist = playlist
+            self.__dup_generation = None
+            self.__prefetch_next_images()
+        return False
+
+    def __prestage_worker(self, show_date:dt.date, folders:list, weights:dict, indexed_images:list):
+        '''翌日分の準備処理
+        '''
+        syn_pcs = self.__spare_syn_pcs
+        syn_pcs.synchronize(folders, indexed_images)
+        playlist = self.__build_playlist(syn_pcs, folders, weights, indexed_images)
+        if isinstance(playlist, StreamingPlaylist):
+            playlist.wait_ready()   # 最初の一定数の走査・読み出しを待つ
+        # 最初に表示する数枚を読み込み、画像キャッシュに載せておく
+        for image_path in playlist.upcoming(self.__prefetch_depth):
+            try:
+                self._load_image(image_path)
+            except (OSError, ValueError):
+                pass
+        with self.__stage_lock:
+            self.__staged = (show_date, folders, weights, indexed_images, syn_pcs, playlist)
         
-    def change_show_image(self, second:int):
+    @METRICS.timed("slideshow_change")
+    def change_show_image(self, second:int, force:bool=False):
         '''スライドショー表示画像の変更
-        Param: 秒
-        '''
-        if ((second % self.__interval_sec)==0):
-            self._set_image_plot_to_all_canvas(self._show_list[self._show_index])
-            self.itemconfig(slide, image=self._show_image)
-            self._show_index = self._show_index + 1
-        elif (self._show_index >= len(self._show_list)):
-            self.__syn_pcs.synchronize(self._outside_folders)   # 外部側フォルダと内部側フォルダの画像を同期
-            self._show_images_shuffle()     # 表示画像の順番をシャッフル
-            self._show_index = 0
+        Param: 秒、表示間隔に関わらず次の画像へ進めるか（隠れていた画面が表示された場合）
+        '''
+        if not self.__apply_resync():
+            # 同期中は、完了後の表示順へ反映するため取り出さない
+            self.__apply_folder_events()
+            self.__apply_copied_images()
+            self.__apply_transcoded_images()
+            self.__apply_duplicates()
+        if force or ((second % self.__interval_sec)==0):
+            if (self._playlist.is_cycle_end() and (self.__watcher is None) and (not self.__syn_pcs.is_copying())
+                and (self.__resync is None)):
+                # フォルダを監視していない場合のみ、1周ごとに外部側フォルダと内部側フォルダの画像を同期
+                # stream 方式の場合は表示中の表示順を引き継ぎ、準備済みの周回を続ける
+                self.__resync = self.__sync_worker.submit(self.__resync_worker, self.__syn_pcs, self._outside_folders,
+                                                          self.__folder_weights, self.__indexed_images, False, True,
+                                                          self._playlist)
+            image_path = self._playlist.next()
+            self.__waiting_image = None
+            if image_path is None:
+                return      # 表示できる画像がない（コピー／変換中を含む）
+            loaded_img = self.__prefetcher.take(image_path)
+            if loaded_img is None:
+                # 先読みが間に合っていない場合、読み込みを先読みスレッドへ依頼し、完了後の周期で表示
+                self.__waiting_image = image_path
+            else:
+                self.__show_loaded_image(image_path, loaded_img)
+            self.__prefetch_next_images()
+        elif self.__waiting_image is not None:
+            loaded_img = self.__prefetcher.poll(self.__waiting_image)
+            if loaded_img is not None:
+                self.__show_loaded_image(self.__waiting_image, loaded_img)
+                self.__waiting_image = None
+
+    def __show_loaded_image(self, image_path:str, loaded_img):
+        '''読み込み済みの画像を表示
+        '''
+        self._set_image_path_plot_to_all_canvas(image_path, loaded_img)
+        self.itemconfig(slide, image=self._show_image)
+
+    def __apply_folder_events(self):
+        '''外部側フォルダの画像の追加／削除を表示リストへ反映
+        ※追加された画像は未表示の範囲のランダムな位置へ挿入
+        '''
+        if self.__watcher is None:
+            return
+        events = self.__watcher.get_events()
+        if any(event == EVENT_RESCAN for event, src_path in events):
+            # 監視で取りこぼしがあるため、監視対象を張り直して全体を同期（個別のイベントは同期に含まれる）
+            self.__resync = self.__sync_worker.submit(self.__resync_worker, self.__syn_pcs, self._outside_folders,
+                                                      self.__folder_weights, self.__indexed_images, True, True)
+            return
+        for event, src_path in events:
+            try:
+                if event == EVENT_ADD:
+                    if self.__IMAGE_PATTERN.match(os.path.basename(src_path)) is None:
+                        continue
+                    image_path = self.__syn_pcs.add_image(src_path)
+                    if image_path is not None:
+                        self.__add_show_image(image_path)
+                elif event == EVENT_REMOVE:
+                    image_path = self.__syn_pcs.remove_image(src_path)
+                    if image_path is not None:
+                        self._playlist.remove(image_path)
+                        self._playlist.remove(self.__transcoder.transcoded_path(image_path))
+                elif event == EVENT_REMOVE_FOLDER:
+                    for image_path in self.__syn_pcs.remove_folder(src_path):
+                        self._playlist.remove(image_path)
+                        self._playlist.remove(self.__transcoder.transcoded_path(image_path))
+            except OSError:
+                pass    # 反映前に再度変更された画像は次回の同期で反映
+        if len(events) > 0:
+            self.__prefetch_next_images()
+
+    def __apply_copied_images(self):
+        '''コピーが完了した画像を表示リストへ反映
+        ※同期の完了を待たず、コピーできた画像から順に表示対象とする
+        '''
+        copied_images = self.__syn_pcs.take_copied_images()
+        for image_path in copied_images:
+            self.__add_show_image(image_path)
+        if len(copied_images) > 0:
+            self.__prefetch_next_images()
+
+    def __apply_transcoded_images(self):
+        '''JPEG変換が完了した画像を表示リストへ反映
+        '''
+        transcoded_images = self.__transcoder.take_transcoded_images()
+        for src_path, dst_path in transcoded_images:
+            if self.__syn_pcs.owns_image(src_path):     # 翌日分の準備で変換した画像は対象外
+                self._playlist.add(dst_path, self.__get_weight(src_path, self.__syn_pcs, self.__folder_weights))
+        if len(transcoded_images) > 0:
+            self.__prefetch_next_images()
+
+    def __apply_duplicates(self):
+        '''類似画像の判定結果が更新された場合、重複画像を表示リストから削除
+        '''
+        if (self.__dup_filter is None) or (self.__dup_filter.generation == self.__dup_generation):
+            return
+        self.__dup_generation = self.__dup_filter.generation
+        image_paths = set()
+        for src_path in self.__dup_filter.duplicates():
+            image_path = self.__syn_pcs.image_path(src_path)
+            if image_path is not None:
+                image_paths.add(image_path)
+                image_paths.add(self.__transcoder.transcoded_path(image_path))
+        if len(image_paths) > 0:
+            self._playlist.remove_all(image_paths)
+            self.__prefetch_next_images()
+
+    def __is_duplicate(self, image_path:str, syn_pcs:ImageSynchronize) -> bool:
+        '''類似画像の中で表示しない画像か
+        '''
+        if self.__dup_filter is None:
+            return False
+        return self.__dup_filter.is_duplicate(syn_pcs.source_path(image_path) or image_path)
+
+    def __get_weight(self, image_path:str, syn_pcs:ImageSynchronize, folder_weights:dict) -> int:
+        '''画像の表示重みを取得（画像の外部側フォルダの重み）
+        '''
+        src_path = syn_pcs.source_path(image_path) or image_path
+        for folder, weight in folder_weights.items():
+            if src_path.startswith(folder.rstrip("/") + "/"):
+                return weight
+        return 1
+
+    def __get_show_image(self, image_path:str) -> str:
+        '''表示リストに登録する画像ファイルパスを取得
+        Return: 画像ファイルパス（JPEG変換中、または画像でない場合はNone）
+        '''
+        if self.__IMAGE_PATTERN.match(os.path.basename(image_path)) is None:
+            return None
+        if self.__transcoder.needs_transcode(image_path):
+            # 変換完了後に表示リストへ追加
+            return self.__transcoder.request(image_path, self._source_record(image_path))
+        return image_path
+
+    def __add_show_image(self, image_path:str):
+        '''追加された画像を表示リストへ反映（JPEG以外の場合は変換を依頼）
+        '''
+        if self.__is_duplicate(image_path, self.__syn_pcs):
+            return
+        try:
+            show_image = self.__get_show_image(image_path)
+        except OSError:
+            return      # 反映前に削除された画像
+        if show_image is not None:
+            self._playlist.add(show_image, self.__get_weight(image_path, self.__syn_pcs, self.__folder_weights))
+
+    def __prefetch_next_images(self):
+        '''次に表示する画像の先読みを依頼
+        '''
+        waiting = [self.__waiting_image] if self.__waiting_image is not None else []
+        self.__prefetcher.request(waiting + self._playlist.upcoming(self.__prefetch_depth))
+
+    def prefetch_stats(self) -> dict:
+        '''先読みのヒット／ミス回数を取得
+        '''
+        return {"hits": self.__prefetcher.hits, "misses": self.__prefetcher.misses,
+                "hit_ratio": self.__prefetcher.hit_ratio()}
             
-    def _show_images_shuffle(self):
-        '''表示画像の順番をシャッフル
-        '''
-        self._show_list.clear()
-        for dirpath, dirnames, images in os.walk(self._inside_folder):
-            for image in images:
-                if re.search('.+\.(jpg|JPG)', image) == None:
-                    # 画像の形式がJPEGでない場合、JPEG変換
-                    self._change_to_jpeg(image)
-                self._show_list.append(image)
-        # リスト内の画像をシャッフル
-        random.shuffle(self._show_list)
-    
\ No newline at end of file
+    def __build_playlist(self, syn_pcs:ImageSynchronize, folders:list, folder_weights:dict, indexed_images:list,
+                         playlist=None):
+        '''同期結果から表示順を作成
+        Param: 同期、外部側フォルダリスト、フォルダ毎の表示重み、索引から取得した画像、
+               引き続き使用する表示順（stream 方式の場合のみ。省略時は新規作成）
+        ※stream 方式の場合、全画像のリストを作らず、表示画像のフォルダを走査しながら一定数ずつ取り出す
+          （走査はバックグラウンドで行い、表示中の表示順を引き継いだ場合は準備済みの周回を続ける）
+          （索引を使用する場合は、索引から取得した画像が既にあるため shuffle 方式で作成）
+        '''
+        if (self.__playlist_mode == "stream") and (indexed_images is None):
+            if not isinstance(playlist, StreamingPlaylist):
+                playlist = StreamingPlaylist(self.__stream_window, self.__IMAGE_PATTERN)
+            playlist.set_source(syn_pcs.image_folders(folders),
+                                weight_of=lambda image_path: self.__get_weight(image_path, syn_pcs, folder_weights),
+                                resolver=lambda image_path: self.__get_stream_image(image_path, syn_pcs))
+        else:
+            playlist = self.__build_shuffle_playlist(syn_pcs, folder_weights)
+        if self.__dup_filter is not None:
+            self.__dup_filter.request(syn_pcs.outside_images())     # 類似画像の判定をバックグラウンドで更新
+        return playlist
+
+    def __build_shuffle_playlist(self, syn_pcs:ImageSynchronize, folder_weights:dict) -> ShufflePlaylist:
+        '''同期結果の全画像から表示順を作成
+        '''
+        entries = []
+        # 同期結果から表示画像を取得（ディレクトリの再走査は行わない）
+        for image_path in syn_pcs.image_paths():
+            if self.__is_duplicate(image_path, syn_pcs):
+                continue    # 類似画像の中で表示しない画像
+            try:
+                # 画像の形式がJPEGでない場合、JPEG変換（変換完了後に表示リストへ追加）
+                show_image = self.__get_show_image(image_path)
+            except OSError:
+                continue
+            if show_image is not None:
+                entries.append((show_image, self.__get_weight(image_path, syn_pcs, folder_weights)))
+        playlist = ShufflePlaylist()
+        playlist.reset(entries)
+        return playlist
+
+    def __get_stream_image(self, image_path:str, syn_pcs:ImageSynchronize) -> str:
+        '''走査で取り出した画像の表示画像ファイルパスを取得
+        Return: 画像ファイルパス（類似画像の中で表示しない画像、JPEG変換中の場合はNone）
+        '''
+        if self.__is_duplicate(image_path, syn_pcs):
+            return None
+        try:
+            return self.__get_show_image(image_path)
+        except OSError:
+            return None     # 走査後に削除された画像
@@ -3,6 +3,10 @@
 from AppCodes.ImportCommon import *
 from qreki import Kyureki
 
+## 祝日表用ライブラリ
+from array import array
+from bisect import bisect_left, bisect_right
+
 
 ### 定数
 APP_ROOT_FILE = "AppRoot.txt"
@@ -34,8 +38,8 @@ class JsonFileConfig(FileConfig):
             with open(self.app_root_folder + "settings/Configure.json",'r') as f:
                 load_config = json.load(f)
                 self._get_setting = load_config[item_name]
-        except FileNotFoundError:
-            self._get_setting = None
+        except (FileNotFoundError, KeyError):
+            self._get_setting = None    # ファイルまたは設定項目がない場合はデフォルト設定
 
 
 class SoundConfig(JsonFileConfig):
@@ -88,6 +92,17 @@ class SlideShowConfig(JsonFileConfig):
         '''初期設定
         '''
         self.interval = 0               # スライドショー時間間隔
+        self.prefetch = 0               # 先読み枚数
+        self.sync_mode = ""             # 外部画像の同期方式（copy / link / direct）
+        self.copy_concurrency = 0       # 外部画像の同時コピー数
+        self.transcode_workers = 0      # JPEG変換のワーカープロセス数（0の場合はCPUコア数）
+        self.event_weight = 0           # イベント画像の表示重み（月共通画像を1とする）
+        self.mix_month_common = False   # イベント日にも月共通画像を表示するか
+        self.prestage_minutes = 0       # 翌日の画像を準備し始める時刻（日付変更の何分前か。0の場合は準備しない）
+        self.watch = ""                 # 外部画像フォルダの監視方式（auto / poll / off）
+        self.watch_interval = 0         # 外部画像フォルダの定期確認間隔[s]
+        self.playlist = ""              # 表示順の作成方式（shuffle: 全画像を保持してシャッフル / stream: 走査しながら一定数ずつ抽出）
+        self.stream_window = 0          # stream 方式で一度に保持する画像数
         self.root_folder = ""           # 外部画像フォルダ
         self.month_common_folders = {}  # 月共通画像フォルダ
         
@@ -95,6 +110,17 @@ class SlideShowConfig(JsonFileConfig):
         '''ファイル設定
         '''
         self.interval = self._get_setting["Interval"]
+        self.prefetch = self._get_setting.get("Prefetch", 3)
+        self.sync_mode = self._get_setting.get("SyncMode", "copy")
+        self.copy_concurrency = self._get_setting.get("CopyConcurrency", 4)
+        self.transcode_workers = self._get_setting.get("TranscodeWorkers", 0)
+        self.event_weight = self._get_setting.get("EventWeight", 3)
+        self.mix_month_common = self._get_setting.get("MixMonthComm", False)
+        self.prestage_minutes = self._get_setting.get("PreStageMinutes", 5)
+        self.watch = self._get_setting.get("Watch", "auto")
+        self.watch_interval = self._get_setting.get("WatchInterval", 5)
+        self.playlist = self._get_setting.get("Playlist", "shuffle")
+        self.stream_window = self._get_setting.get("StreamWindow", 1024)
         if (self._get_setting["BaseFolder"] == "sampleimages"):
             self.root_folder = self.__set_sampleimages_folder()
         else:
@@ -105,6 +131,17 @@ class SlideShowConfig(JsonFileConfig):
         '''デフォルト設定
         '''
         self.interval = 10
+        self.prefetch = 3
+        self.sync_mode = "copy"
+        self.copy_concurrency = 4
+        self.transcode_workers = 0
+        self.event_weight = 3
+        self.mix_month_common = False
+        self.prestage_minutes = 5
+        self.watch = "auto"
+        self.watch_interval = 5
+        self.playlist = "shuffle"
+        self.stream_window = 1024
         self.root_folder = self.__set_sampleimages_folder()
         self.month_common_folders = {"1":"01_Common_Jan",
                                      "2":"02_Common_Feb",
@@ -125,6 +162,190 @@ class SlideShowConfig(JsonFileConfig):
         return self.app_root_folder.replace("TkinterPhotoFrameCalendar/", "") + "sampleimages/"
 
 
+class RenderCacheConfig(JsonFileConfig):
+    '''整形済み画像キャッシュ設定
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        super().__init__(item_name="RenderCache")
+        self.__get_init_values()
+        if self._get_setting is None:
+            self.__get_default_values()
+        else:
+            self.__get_file_values()
+
+    def __get_init_values(self):
+        '''初期設定
+        '''
+        self.memory_bytes = 0           # メモリキャッシュ上限[byte]
+        self.disk_folder = ""           # ディスクキャッシュフォルダ（imagesフォルダ内）
+        self.disk_bytes = 0             # ディスクキャッシュ上限[byte]
+
+    def __get_file_values(self):
+        '''ファイル設定
+        '''
+        self.memory_bytes = self._get_setting["MemoryBytes"]
+        self.disk_folder = self._get_setting["DiskFolder"]
+        self.disk_bytes = self._get_setting["DiskBytes"]
+
+    def __get_default_values(self):
+        '''デフォルト設定
+        '''
+        self.memory_bytes = 32 * 1024 * 1024
+        self.disk_folder = "RenderCache"
+        self.disk_bytes = 256 * 1024 * 1024
+
+
+class DecodeConfig(JsonFileConfig):
+    '''画像読み込み設定
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        super().__init__(item_name="ImageDecode")
+        self.__get_init_values()
+        if self._get_setting is None:
+            self.__get_default_values()
+        else:
+            self.__get_file_values()
+
+    def __get_init_values(self):
+        '''初期設定
+        '''
+        self.use_draft = False          # JPEGの縮小読み込みを使用するか
+        self.max_pixels = 0             # 読み込み可能な最大画素数
+        self.backend = ""               # 読み込み方式（thread: 表示側プロセス内 / process: 別プロセス）
+        self.workers = 0                # 別プロセス読み込みのワーカープロセス数（0の場合はCPUコア数-1）
+
+    def __get_file_values(self):
+        '''ファイル設定
+        '''
+        self.use_draft = self._get_setting["Draft"]
+        self.max_pixels = self._get_setting["MaxPixels"]
+        self.backend = self._get_setting.get("Backend", "thread")
+        self.workers = self._get_setting.get("Workers", 0)
+
+    def __get_default_values(self):
+        '''デフォルト設定
+        '''
+        self.use_draft = True
+        self.max_pixels = 64000000
+        self.backend = "thread"
+        self.workers = 0
+
+
+class PhotoIndexConfig(JsonFileConfig):
+    '''画像メタデータ索引設定
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        super().__init__(item_name="PhotoIndex")
+        self.__get_init_values()
+        if self._get_setting is None:
+            self.__get_default_values()
+        else:
+            self.__get_file_values()
+
+    def __get_init_values(self):
+        '''初期設定
+        '''
+        self.enabled = False            # 索引を使用するか
+        self.db_file = ""               # 索引データベースファイル（imagesフォルダ内）
+        self.on_this_day = False        # 表示日と同じ月日に撮影された画像（年は問わない）を優先して表示するか
+
+    def __get_file_values(self):
+        '''ファイル設定
+        '''
+        self.enabled = self._get_setting["Enabled"]
+        self.db_file = self._get_setting["DBFile"]
+        self.on_this_day = self._get_setting["OnThisDay"]
+
+    def __get_default_values(self):
+        '''デフォルト設定
+        '''
+        self.enabled = False
+        self.db_file = "PhotoIndex.db"
+        self.on_this_day = False
+
+
+class DuplicateConfig(JsonFileConfig):
+    '''類似画像の重複表示抑制設定
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        super().__init__(item_name="Duplicate")
+        self.__get_init_values()
+        if self._get_setting is None:
+            self.__get_default_values()
+        else:
+            self.__get_file_values()
+
+    def __get_init_values(self):
+        '''初期設定
+        '''
+        self.enabled = False            # 類似画像をまとめて1枚だけ表示するか
+        self.distance = 0               # 類似とみなす知覚ハッシュのハミング距離
+        self.workers = 0                # 知覚ハッシュ計算のワーカープロセス数（0の場合はCPUコア数）
+        self.db_file = ""               # 知覚ハッシュのキャッシュファイル（imagesフォルダ内）
+
+    def __get_file_values(self):
+        '''ファイル設定
+        '''
+        self.enabled = self._get_setting["Enabled"]
+        self.distance = self._get_setting["Distance"]
+        self.workers = self._get_setting["Workers"]
+        self.db_file = self._get_setting["DBFile"]
+
+    def __get_default_values(self):
+        '''デフォルト設定
+        '''
+        self.enabled = False
+        self.distance = 6
+        self.workers = 0
+        self.db_file = "PhotoHash.db"
+
+
+class MetricsConfig(JsonFileConfig):
+    '''周期処理の処理時間計測設定
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        super().__init__(item_name="Metrics")
+        self.__get_init_values()
+        if self._get_setting is None:
+            self.__get_default_values()
+        else:
+            self.__get_file_values()
+
+    def __get_init_values(self):
+        '''初期設定
+        '''
+        self.enabled = False            # 処理時間を計測するか
+        self.export_file = ""           # 出力ファイル（相対パスの場合はアプリ実行フォルダ内）
+        self.format = ""                # 出力形式（prometheus: textfile形式, json: JSON形式）
+        self.interval = 0               # 出力周期[s]
+
+    def __get_file_values(self):
+        '''ファイル設定
+        '''
+        self.enabled = self._get_setting["Enabled"]
+        self.export_file = os.path.join(self.app_root_folder, self._get_setting["ExportFile"])
+        self.format = self._get_setting["Format"]
+        self.interval = self._get_setting["Interval"]
+
+    def __get_default_values(self):
+        '''デフォルト設定
+        '''
+        self.enabled = False
+        self.export_file = os.path.join(self.app_root_folder, "HotPath.prom")
+        self.format = "prometheus"
+        self.interval = 60
+
+
 class EventConfig(FileConfig):
     '''日毎イベントの設定基幹クラス
     ※CSV形式のデータベース読み込み
@@ -176,8 +397,20 @@ class EventFolderConfig(EventConfig):
         super().__init__()
         self.__config = SlideShowConfig()
         self.interval = self.__config.interval
+        self.prefetch = self.__config.prefetch
+        self.sync_mode = self.__config.sync_mode
+        self.copy_concurrency = self.__config.copy_concurrency
+        self.transcode_workers = self.__config.transcode_workers
+        self.prestage_minutes = self.__config.prestage_minutes
+        self.watch = self.__config.watch
+        self.watch_interval = self.__config.watch_interval
+        self.playlist = self.__config.playlist
+        self.stream_window = self.__config.stream_window
         self.__outside_image_folder = self.__config.root_folder             # 外部画像フォルダ
         self.__month_common_folders = self.__config.month_common_folders    # 月共通画像フォルダ
+        self.event_weight = self.__config.event_weight
+        self.__mix_month_common = self.__config.mix_month_common
+        self.root_folder = self.__outside_image_folder
 
     def get_event_folder(self, month:int, day:int) -> list:
         '''指定月日に設定されたイベントの画像格納フォルダを全て取得
@@ -191,12 +424,21 @@ class EventFolderConfig(EventConfig):
                 if (event_row['ImageFolder'] != ""):
                     folder_path = self.__outside_image_folder + event_row['ImageFolder']
                     folders.append(folder_path)
-        # 指定月日にイベントが設定されていない場合、月共通イベントを設定
-        if (len(folders) < 1):
+        # 指定月日にイベントが設定されていない場合（または設定で指定した場合）、月共通イベントを設定
+        if ((len(folders) < 1) or self.__mix_month_common):
             folder_path = self.__outside_image_folder + self.__month_common_folders[str(month)]
             folders.append(folder_path)
         return folders
 
+    def get_folder_weights(self, folders:list) -> dict:
+        '''画像格納フォルダ毎の表示重みを取得
+        Param:  画像格納フォルダ
+        Return: 表示重み（key: フォルダパス）
+        ※月共通画像フォルダを1とし、イベントの画像格納フォルダは設定した重みとする
+        '''
+        month_common_folders = [self.__outside_image_folder + folder for folder in self.__month_common_folders.values()]
+        return {folder: (1 if folder in month_common_folders else self.event_weight) for folder in folders}
+
 
 class CalendarConfig:
     '''カレンダー表示設定クラス
@@ -206,6 +448,7 @@ class CalendarConfig:
         '''コンストラクタ
         '''
         cal.setfirstweekday(cal.SUNDAY)   # 曜日の始まりを日曜日に設定
+        self.__jp_days_conf = JapanDaysConfig()
 
     def get_week_texts(self):
         return [cal.day_abbr[6]] + [cal.day_abbr[w] for w in range(6)]
@@ -221,7 +464,7 @@ class CalendarConfig:
     def get_holiday_list(self, year:int, month:int):
         '''指定年月の祝日リストを取得
         '''
-        return JapanDaysConfig().get_japan_holiday_list(year, month)
+        return self.__jp_days_conf.get_japan_holiday_list(year, month)
 
 
 class JapanDaysConfig:
@@ -262,6 +505,7 @@ class JapanDaysConfig:
                            {'name':'小雪', 'month':11, 'd':23.1189, 'a':0.242592, 'deltaYear':0},
                            {'name':'大雪', 'month':12, 'd':7.9152, 'a':0.242689, 'deltaYear':0},
                            {'name':'冬至', 'month':12, 'd':22.6587, 'a':0.242752, 'deltaYear':0}]
+        self.__solar_terms = {}     # 算出済みの二十四節季（key: 年）
             
     def convert_to_wareki(self, era_date:dt.date) -> str:
         '''西暦の年月日を和暦の年に変換
@@ -301,7 +545,10 @@ class JapanDaysConfig:
     def get_solar_terms_in_year(self, year:int) -> dict:
         '''入力年の二十四節季を算出
         from : http://addinbox.sakura.ne.jp/sekki24_topic.htm
+        ※年毎に1回だけ算出（返した辞書は変更しないこと）
         '''
+        if year in self.__solar_terms:
+            return self.__solar_terms[year]
         terms = {}
         for term in self.terms_data:
             name = term['name']
@@ -311,6 +558,7 @@ class JapanDaysConfig:
             delta_year = term['deltaYear']
             day = int(d + (a * (year + delta_year - 1900))) - int((year + delta_year - 1900) / 4)
             terms[name] = dt.date(year, month, day)
+        self.__solar_terms[year] = terms
         return terms
         
     def check_solar_terms_in_date(self, enter_date:dt.date) -> str:
@@ -343,6 +591,25 @@ class JapanDaysConfig:
 
     def get_japan_holiday_list(self, year:int, month:int) -> dict:
         '''入力年月の、日本における祝日リストを取得
+        Return: 祝日名（key: 日）
+        ※対応範囲（1900～2100年）は祝日表から取得し、範囲外の年のみその場で算出
+        '''
+        holiday_table = get_holiday_table()
+        if holiday_table.covers(year):
+            return holiday_table.month_holidays(year, month)
+        return self._calc_japan_holiday_list(year, month)
+
+    def get_holiday_name(self, enter_date:dt.date) -> str:
+        '''入力した日付の祝日名を取得
+        Return: 祝日名（祝日でない場合は空文字）
+        '''
+        holiday_table = get_holiday_table()
+        if holiday_table.covers(enter_date.year):
+            return holiday_table.holiday_name(enter_date)
+        return self._calc_japan_holiday_list(enter_date.year, enter_date.month).get(enter_date.day, "")
+
+    def _calc_japan_holiday_list(self, year:int, month:int) -> dict:
+        '''入力年月の、日本における祝日リストを算出（祝日表の生成に使用）
         '''
         solar_terms = self.get_solar_terms_in_year(year)    # 入力年の二十四節季を取得
         self._holiday_list = {}                             # 入力月の休日リスト
@@ -491,4 +758,79 @@ class JapanDaysConfig:
             week = week + 1
         days = lines[week-1]
         self._holiday_list[days[weekday]] = holiday_name
-        
\ No newline at end of file
+        
+
+
+class HolidayTable:
+    ''' 日本の祝日表クラス
+    ※対応範囲の祝日を1回だけ算出し、日付の序数（date.toordinal()）の昇順の配列と、序数から配列位置への辞書で保持
+    '''
+    ### 定数
+    FIRST_YEAR = 1900   # 対応範囲（年選択ボックスと同じ）
+    LAST_YEAR = 2100
+
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        # ハッピーマンデーの算出が週の始まりに依存するため、カレンダー表示と同じ日曜始まりで算出
+        cal.setfirstweekday(cal.SUNDAY)
+        jp_days_conf = JapanDaysConfig()
+        holidays = []
+        for year in range(self.FIRST_YEAR, self.LAST_YEAR + 1):
+            for month in range(1, 13):
+                for day, name in jp_days_conf._calc_japan_holiday_list(year, month).items():
+                    holidays.append((dt.date(year, month, day).toordinal(), name))
+        holidays.sort()
+        self.__ordinals = array('l', [ordinal for ordinal, name in holidays])   # 祝日の序数（昇順）
+        self.__names = [name for ordinal, name in holidays]                     # 祝日名（序数と同じ順）
+        self.__index = {ordinal: i for i, ordinal in enumerate(self.__ordinals)}
+
+    def __len__(self) -> int:
+        return len(self.__ordinals)
+
+    def covers(self, year:int) -> bool:
+        '''対応範囲の年か
+        '''
+        return self.FIRST_YEAR <= year <= self.LAST_YEAR
+
+    def is_holiday(self, date:dt.date) -> bool:
+        '''祝日（振替休日、国民の休日を含む）か
+        '''
+        return date.toordinal() in self.__index
+
+    def holiday_name(self, date:dt.date) -> str:
+        '''祝日名を取得
+        Return: 祝日名（祝日でない場合は空文字）
+        '''
+        i = self.__index.get(date.toordinal())
+        return "" if i is None else self.__names[i]
+
+    def holidays_between(self, start:dt.date, end:dt.date) -> list:
+        '''期間内（開始日、終了日を含む）の祝日を取得
+        Return: (日付, 祝日名) のリスト（日付の昇順）
+        '''
+        first = bisect_left(self.__ordinals, start.toordinal())
+        last = bisect_right(self.__ordinals, end.toordinal())
+        return [(dt.date.fromordinal(self.__ordinals[i]), self.__names[i]) for i in range(first, last)]
+
+    def month_holidays(self, year:int, month:int) -> dict:
+        '''指定年月の祝日を取得
+        Return: 祝日名（key: 日）
+        '''
+        first = bisect_left(self.__ordinals, dt.date(year, month, 1).toordinal())
+        last = bisect_left(self.__ordinals, (dt.date(year + 1, 1, 1) if month == 12 else dt.date(year, month + 1, 1)).toordinal())
+        return {dt.date.fromordinal(self.__ordinals[i]).day: self.__names[i] for i in range(first, last)}
+
+
+_holiday_table = None
+_holiday_table_lock = threading.Lock()
+
+
+def get_holiday_table() -> HolidayTable:
+    '''アプリ全体で共有する祝日表を取得（初回のみ生成）
+    '''
+    global _holiday_table
+    with _holiday_table_lock:
+        if _holiday_table is None:
+            _holiday_table = HolidayTable()
+        return _holiday_table
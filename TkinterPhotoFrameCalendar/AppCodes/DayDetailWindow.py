@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 from AppCodes.BaseLibrary import BaseWindow, BaseFrame, BaseButton, ButtonConfig, ShowDateCanvas
 from AppCodes.Configuration import EventNameConfig, JapanDaysConfig, Kyureki
+from AppCodes.EventBus import DATE_SELECTED, EventBus
+from AppCodes.HotPathMetrics import METRICS
 from AppCodes.ImportCommon import *
 from AppCodes.OutputMedia import ImageView
 
@@ -9,9 +11,9 @@ from AppCodes.OutputMedia import ImageView
 class Window2(BaseWindow):
     ''' アナログ時計／日付詳細画面設計クラス
     '''
-    def __init__(self, master, init_date:dt.datetime):
+    def __init__(self, master, init_date:dt.datetime, event_bus:EventBus):
         '''コンストラクタ
-        Param: 画面生成日時
+        Param: 画面生成日時、画面間イベント通知
         '''
         super().__init__(master=master)
         # 日付詳細情報の表示
@@ -21,6 +23,8 @@ class Window2(BaseWindow):
         # 面生成時の日時を設定
         self.select_date_callback(select_date=init_date.date())
         self.current_time_callback(now=init_date.time())
+        # カレンダーで日付を選択した場合、日付詳細情報を選択した年月日のものに変更
+        event_bus.subscribe(DATE_SELECTED, self.select_date_callback)
         
     def __del__(self):
         '''デストラクタ
@@ -85,8 +89,34 @@ class Window2(BaseWindow):
         if (self._is_window == True):
             # アナログ時計更新
             self._a_clock.clock_update(now)
+
+    def _catch_up(self, now:dt.datetime):
+        '''隠れていた画面が表示された場合、アナログ時計を現在時刻に合わせて更新
+        '''
+        self.current_time_callback(now.time())
             
 
+def build_day_detail_text(jp_days_conf:JapanDaysConfig, event_config:EventNameConfig, show_date:dt.date) -> str:
+    '''日付詳細情報の表示テキストを作成
+    Param: 日本の祝日などの設定、日毎イベント名の設定、詳細表示年月日
+    '''
+    show_date_label = ShowDateCanvas._show_date_label(show_date.year, show_date.month, show_date.day)
+    holiday = jp_days_conf.get_holiday_name(show_date)
+    kanshi = "年干支：" + jp_days_conf.get_zodiac(show_date.year)
+    getsumei = "月和暦：" + jp_days_conf.get_tsukiwamei(show_date.month)
+    wareki = "　和暦：" + jp_days_conf.convert_to_wareki(show_date) + str(show_date.month) + "月" + str(show_date.day) + "日"
+    lunar_date = Kyureki.from_ymd(show_date.year, show_date.month, show_date.day)
+    kyureki = "　旧暦：" + str(lunar_date)
+    rokuyo = "　六曜：" + lunar_date.rokuyou
+    term = "　　　　" + jp_days_conf.check_solar_terms_in_date(show_date)
+    day_text = show_date_label + "\n" + holiday + "\n" + kanshi + "\n" + getsumei + "\n" + wareki + "\n" + kyureki + "\n" + rokuyo + "\n" + term
+    day_events = event_config.get_event_name(show_date.month, show_date.day)
+    if (len(day_events) > 0):
+        for event_name in day_events:
+            day_text = day_text + "\n" + event_name
+    return day_text
+
+
 class DayDetailInfo(ShowDateCanvas):
     ''' 日付詳細説明設計クラス
     '''
@@ -100,23 +130,7 @@ class DayDetailInfo(ShowDateCanvas):
     def update_show_date(self, show_date:dt.date):
         '''詳細表示年月日を更新
         '''
-        show_date_label = self._show_date_label(show_date.year, show_date.month, show_date.day)
-        holiday = ""
-        holiday_list = self._jp_days_conf.get_japan_holiday_list(show_date.year, show_date.month)
-        if (show_date.day in holiday_list.keys()):
-            holiday = holiday_list[show_date.day]
-        kanshi = "年干支：" + self._jp_days_conf.get_zodiac(show_date.year)
-        getsumei = "月和暦：" + self._jp_days_conf.get_tsukiwamei(show_date.month)
-        wareki = "　和暦：" + self._jp_days_conf.convert_to_wareki(show_date) + str(show_date.month) + "月" + str(show_date.day) + "日"
-        lunar_date = Kyureki.from_ymd(show_date.year, show_date.month, show_date.day)
-        kyureki = "　旧暦：" + str(lunar_date)
-        rokuyo = "　六曜：" + lunar_date.rokuyou
-        term = "　　　　" + self._jp_days_conf.check_solar_terms_in_date(show_date)
-        day_text = show_date_label + "\n" + holiday + "\n" + kanshi + "\n" + getsumei + "\n" + wareki + "\n" + kyureki + "\n" + rokuyo + "\n" + term
-        day_events = self.__event_config.get_event_name(show_date.month, show_date.day)
-        if (len(day_events) > 0):
-            for event_name in day_events:
-                day_text = day_text + "\n" + event_name
+        day_text = build_day_detail_text(self._jp_days_conf, self.__event_config, show_date)
         self.itemconfig(detail, text=day_text)
         
 
@@ -144,34 +158,48 @@ class AnalogClock(ImageView):
         self._set_folder_path("AnalogClock")
         self._set_image_plot_to_all_canvas("clock_oval.jpg")
         self.create_image(self.__C[0], self.__C[1], image=self._show_image)
-        self.__create_clock_oval(self.__OVAL_RAD_S)
-        self.__create_clock_oval(self.__OVAL_RAD_M)
-        self.__create_clock_oval(self.__OVAL_RAD_H)
-        self.__create_clock_oval(self.__OVAL_RAD)
+        for rad in self.oval_radii():
+            self.__create_clock_oval(rad)
+        # 針は1回だけ生成し、更新時は座標のみ変更する
+        self.__needles = [self.create_line(x0, y0, x1, y1, width=width, tags=self.__W_TAG)
+                          for x0, y0, x1, y1, width in self.needle_lines(self.__C, dt.time())]
         
     def __create_clock_oval(self, rad:int):
         '''アナログ時計の文字盤の外周を描画
         '''
         self.create_oval((self.__C[0]-rad), (self.__C[1]-rad), (self.__C[0]+rad), (self.__C[1]+rad), width=1.5, fill=None)
 
-    def clock_update(self, now:dt.time):
-        '''アナログ時計の針を描画
+    @classmethod
+    def oval_radii(cls) -> list:
+        '''文字盤の外周の半径（外側から）
+        '''
+        return [cls.__OVAL_RAD_S, cls.__OVAL_RAD_M, cls.__OVAL_RAD_H, cls.__OVAL_RAD]
+
+    @classmethod
+    def needle_lines(cls, center:list, now:dt.time) -> list:
+        '''アナログ時計の針の座標を算出
+        Param:  アナログ時計中心、時刻
+        Return: 時・分・秒の針の (x0, y0, x1, y1, 線幅) のリスト
         '''
-        # 針を初期化
-        self.delete(self.__W_TAG)
         # 各針の角度算出
         angle_h = math.radians(float(90 - 30 * now.hour - (now.minute / 2)))    # 時
         angle_m = math.radians(float(90 - 6 * now.minute))                      # 分
         angle_s = math.radians(float(90 - 6 * now.second))                      # 秒
         # 針の終端位置
-        pos_hx = [self.__C[0]+round(math.cos(angle_h)*self.__EDGE_H), self.__C[0]+round(math.cos(angle_h)*self.__OVAL_RAD_H)] # 時のX座標
-        pos_hy = [self.__C[1]-round(math.sin(angle_h)*self.__EDGE_H), self.__C[1]-round(math.sin(angle_h)*self.__OVAL_RAD_H)] # 時のY座標
-        pos_mx = [self.__C[0]+round(math.cos(angle_m)*self.__EDGE_M), self.__C[0]+round(math.cos(angle_m)*self.__OVAL_RAD_M)] # 分のX座標
-        pos_my = [self.__C[1]-round(math.sin(angle_m)*self.__EDGE_M), self.__C[1]-round(math.sin(angle_m)*self.__OVAL_RAD_M)] # 分のY座標
-        pos_sx = [self.__C[0]+round(math.cos(angle_s)*self.__EDGE_S), self.__C[0]+round(math.cos(angle_s)*self.__OVAL_RAD_S)] # 秒のX座標
-        pos_sy = [self.__C[1]-round(math.sin(angle_s)*self.__EDGE_S), self.__C[1]-round(math.sin(angle_s)*self.__OVAL_RAD_S)] # 秒のY座標
-        # 針を描画（外側から針を向けるイメージ）
-        self.create_line(pos_hx[0], pos_hy[0], pos_hx[1], pos_hy[1], width=10, tags=self.__W_TAG)
-        self.create_line(pos_mx[0], pos_my[0], pos_mx[1], pos_my[1], width=5, tags=self.__W_TAG)
-        self.create_line(pos_sx[0], pos_sy[0], pos_sx[1], pos_sy[1], width=2, tags=self.__W_TAG)
-        
\ No newline at end of file
+        pos_hx = [center[0]+round(math.cos(angle_h)*cls.__EDGE_H), center[0]+round(math.cos(angle_h)*cls.__OVAL_RAD_H)] # 時のX座標
+        pos_hy = [center[1]-round(math.sin(angle_h)*cls.__EDGE_H), center[1]-round(math.sin(angle_h)*cls.__OVAL_RAD_H)] # 時のY座標
+        pos_mx = [center[0]+round(math.cos(angle_m)*cls.__EDGE_M), center[0]+round(math.cos(angle_m)*cls.__OVAL_RAD_M)] # 分のX座標
+        pos_my = [center[1]-round(math.sin(angle_m)*cls.__EDGE_M), center[1]-round(math.sin(angle_m)*cls.__OVAL_RAD_M)] # 分のY座標
+        pos_sx = [center[0]+round(math.cos(angle_s)*cls.__EDGE_S), center[0]+round(math.cos(angle_s)*cls.__OVAL_RAD_S)] # 秒のX座標
+        pos_sy = [center[1]-round(math.sin(angle_s)*cls.__EDGE_S), center[1]-round(math.sin(angle_s)*cls.__OVAL_RAD_S)] # 秒のY座標
+        # 外側から針を向けるイメージ
+        return [(pos_hx[0], pos_hy[0], pos_hx[1], pos_hy[1], 10),
+                (pos_mx[0], pos_my[0], pos_mx[1], pos_my[1], 5),
+                (pos_sx[0], pos_sy[0], pos_sx[1], pos_sy[1], 2)]
+
+    @METRICS.timed("analog_clock")
+    def clock_update(self, now:dt.time):
+        '''アナログ時計の針を描画
+        '''
+        for needle, line in zip(self.__needles, self.needle_lines(self.__C, now)):
+            self.coords(needle, line[0], line[1], line[2], line[3])
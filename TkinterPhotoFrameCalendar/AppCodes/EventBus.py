@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+
+### イベント種別
+DATE_SELECTED = "date_selected"     # カレンダーで日付を選択（引数: 選択した dt.date）
+MONTH_CHANGED = "month_changed"     # カレンダーの表示年月を変更（引数: (年, 月)）
+DATE_CHANGED = "date_changed"       # 日付が進んだ（引数: 新しい dt.date）
+
+
+class EventBus:
+    ''' 画面間イベント通知クラス
+    ※発行したイベントは、購読登録順に購読者へその場で通知する（次の周期処理を待たない）
+    ※購読者はウィジェットを操作するため、Tkのメインループ上で発行すること
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        self.__subscribers = {}     # key: イベント種別, value: 購読者（関数）のリスト
+
+    def subscribe(self, event:str, callback):
+        '''イベントを購読
+        Param: イベント種別、購読者（引数: イベントの引数）
+        '''
+        self.__subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event:str, callback):
+        '''イベントの購読を解除
+        '''
+        callbacks = self.__subscribers.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, event:str, payload=None):
+        '''イベントを発行
+        Param: イベント種別、イベントの引数
+        '''
+        for callback in list(self.__subscribers.get(event, [])):
+            callback(payload)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## フォルダ監視用ライブラリ
+import ctypes
+import ctypes.util
+import queue
+import select
+from stat import S_ISREG
+import struct
+
+
+### 定数
+EVENT_ADD = "add"           # 画像追加（リネーム後の名前を含む）
+EVENT_REMOVE = "remove"     # 画像削除（リネーム前の名前を含む）
+EVENT_REMOVE_FOLDER = "remove_folder"   # サブフォルダ削除（フォルダ以下の全画像。リネーム前の名前を含む）
+EVENT_RESCAN = "rescan"     # 取りこぼしがあるため全体を同期し直す（ファイルパスは空文字）
+
+
+class FolderWatcher:
+    ''' フォルダ監視基底クラス
+    ※監視スレッドで検知した画像の追加／削除を (イベント種別, ファイルパス) としてキューに積み、
+      表示側は get_events() で取り出して反映する
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._is_running = True
+        self._watch_thread = threading.Thread(target=self._watch_worker, daemon=True)
+        self._watch_thread.start()
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.stop_thread()
+
+    def watch(self, folders:list):
+        '''監視対象フォルダを変更（サブフォルダを含む）
+        '''
+        raise NotImplementedError
+
+    def get_events(self) -> list:
+        '''検知したイベントを全て取り出す
+        Return: (イベント種別, ファイルパス) のリスト
+        '''
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stop_thread(self):
+        '''スレッド停止
+        '''
+        self._is_running = False
+
+    def _watch_worker(self):
+        '''フォルダ監視処理
+        '''
+        raise NotImplementedError
+
+    def _list_dirs(self, folder:str) -> list:
+        '''フォルダとそのサブフォルダを全て取得
+        '''
+        return [dirpath for dirpath, dirnames, files in os.walk(folder)]
+
+
+class InotifyWatcher(FolderWatcher):
+    ''' inotify によるフォルダ監視クラス（Linuxのみ）
+    '''
+    ### 定数
+    __IN_CLOSE_WRITE = 0x00000008
+    __IN_MOVED_FROM = 0x00000040
+    __IN_MOVED_TO = 0x00000080
+    __IN_CREATE = 0x00000100
+    __IN_DELETE = 0x00000200
+    __IN_Q_OVERFLOW = 0x00004000
+    __IN_IGNORED = 0x00008000
+    __IN_ISDIR = 0x40000000
+    __IN_NONBLOCK = 0x00000800
+    __WATCH_MASK = __IN_CLOSE_WRITE | __IN_MOVED_FROM | __IN_MOVED_TO | __IN_CREATE | __IN_DELETE
+    __EVENT_HEADER = struct.Struct("iIII")      # wd, mask, cookie, len
+
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        self.__libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.__fd = self.__libc.inotify_init1(self.__IN_NONBLOCK)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.__watches = {}     # key: 監視ディスクリプタ, value: フォルダパス
+        super().__init__()
+
+    @staticmethod
+    def is_available() -> bool:
+        '''inotify が使用可能か
+        '''
+        libc_name = ctypes.util.find_library("c")
+        return (libc_name is not None) and hasattr(ctypes.CDLL(libc_name), "inotify_init1")
+
+    def watch(self, folders:list):
+        '''監視対象フォルダを変更（サブフォルダを含む）
+        '''
+        with self._lock:
+            for wd in list(self.__watches.keys()):
+                self.__libc.inotify_rm_watch(self.__fd, wd)
+            self.__watches.clear()
+            for folder in folders:
+                for dirpath in self._list_dirs(folder):
+                    self.__add_watch(dirpath)
+
+    def stop_thread(self):
+        '''スレッド停止
+        '''
+        super().stop_thread()
+        self._watch_thread.join()
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def __add_watch(self, dirpath:str):
+        '''フォルダを監視対象に追加
+        '''
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(dirpath), self.__WATCH_MASK)
+        if wd >= 0:
+            self.__watches[wd] = dirpath
+
+    def _watch_worker(self):
+        '''フォルダ監視処理
+        '''
+        while self._is_running:
+            readable, writable, errors = select.select([self.__fd], [], [], 1.0)
+            if not readable:
+                continue    # タイムアウト時は停止要求の確認のみ
+            try:
+                data = os.read(self.__fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, name_len = self.__EVENT_HEADER.unpack_from(data, offset)
+                offset += self.__EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+                offset += name_len
+                self.__handle_event(wd, mask, name)
+
+    def __handle_event(self, wd:int, mask:int, name:str):
+        '''inotify イベントを追加／削除イベントへ変換
+        '''
+        if mask & self.__IN_Q_OVERFLOW:
+            # イベントキューが溢れて取りこぼしたため、全体を同期し直す
+            self._events.put((EVENT_RESCAN, ""))
+            return
+        with self._lock:
+            dirpath = self.__watches.get(wd)
+            if mask & self.__IN_IGNORED:
+                self.__watches.pop(wd, None)    # 監視フォルダ自体が削除された
+                return
+            if (dirpath is None) or (name == ""):
+                return
+            path = dirpath + "/" + name
+            if mask & self.__IN_ISDIR:
+                if mask & (self.__IN_CREATE | self.__IN_MOVED_TO):
+                    # 新しいサブフォルダを監視対象に追加し、既に入っている画像を追加イベントとして通知
+                    for sub_dirpath, sub_dirnames, files in os.walk(path):
+                        self.__add_watch(sub_dirpath)
+                        for file_name in files:
+                            self._events.put((EVENT_ADD, sub_dirpath + "/" + file_name))
+                elif mask & (self.__IN_DELETE | self.__IN_MOVED_FROM):
+                    # 移動前のフォルダパスの監視を外し、フォルダ以下の画像を削除として通知
+                    # （監視対象内での移動の場合は、続く MOVED_TO で移動後のパスとして監視し直す）
+                    self.__remove_watches(path)
+                    self._events.put((EVENT_REMOVE_FOLDER, path))
+                return
+        if mask & (self.__IN_CLOSE_WRITE | self.__IN_MOVED_TO):
+            self._events.put((EVENT_ADD, path))     # 書き込み完了後のみ追加
+        elif mask & self.__IN_CREATE:
+            if self.__is_complete_on_create(path):
+                self._events.put((EVENT_ADD, path))
+        elif mask & (self.__IN_DELETE | self.__IN_MOVED_FROM):
+            self._events.put((EVENT_REMOVE, path))
+
+    def __remove_watches(self, dirpath:str):
+        '''フォルダとそのサブフォルダの監視を外す（ロック中に呼び出すこと）
+        '''
+        for wd, watched in list(self.__watches.items()):
+            if (watched == dirpath) or watched.startswith(dirpath + "/"):
+                self.__libc.inotify_rm_watch(self.__fd, wd)
+                del self.__watches[wd]
+
+    def __is_complete_on_create(self, path:str) -> bool:
+        '''作成時点で内容が揃っているか（CLOSE_WRITE が発生しないファイル）
+        ※シンボリックリンク、ハードリンク、通常ファイル以外は書き込みを伴わずに作成される
+        '''
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            return False
+        return (not S_ISREG(stat.st_mode)) or (stat.st_nlink > 1)
+
+
+class PollingWatcher(FolderWatcher):
+    ''' 定期確認によるフォルダ監視クラス
+    ※フォルダの更新日時が変わった場合のみ、そのフォルダの中身を読み直す
+    ※追加された画像は書き込み中の場合があるため、サイズと更新日時が2回の確認で変わらなくなってから通知
+    '''
+    def __init__(self, interval:float):
+        '''コンストラクタ
+        Param: 確認間隔[s]
+        '''
+        self.__interval = interval
+        self.__snapshots = {}   # key: フォルダパス, value: (更新日時, ファイル名集合, サブフォルダ名集合)
+        self.__pending = {}     # 追加を通知していない画像（key: ファイルパス, value: (サイズ, 更新日時)）
+        super().__init__()
+
+    def watch(self, folders:list):
+        '''監視対象フォルダを変更（サブフォルダを含む）
+        '''
+        with self._lock:
+            self.__snapshots = {}
+            self.__pending = {}
+            for folder in folders:
+                for dirpath in self._list_dirs(folder):
+                    self.__snapshots[dirpath] = self.__take_snapshot(dirpath)
+
+    def _watch_worker(self):
+        '''フォルダ監視処理
+        '''
+        while self._is_running:
+            time.sleep(self.__interval)
+            with self._lock:
+                self.__check_pending()      # 今回の確認で見つかった画像は次回の確認で判定
+                for dirpath in list(self.__snapshots.keys()):
+                    self.__check_folder(dirpath)
+
+    def __check_folder(self, dirpath:str):
+        '''フォルダの変更を確認し、追加／削除イベントを通知
+        '''
+        old_mtime, old_files, old_dirs = self.__snapshots[dirpath]
+        try:
+            if os.stat(dirpath).st_mtime_ns == old_mtime:
+                return
+        except FileNotFoundError:
+            del self.__snapshots[dirpath]
+            for name in old_files:
+                self.__remove_file(dirpath + "/" + name)
+            return
+        new_snapshot = self.__take_snapshot(dirpath)
+        self.__snapshots[dirpath] = new_snapshot
+        new_mtime, new_files, new_dirs = new_snapshot
+        for name in new_files - old_files:
+            # 書き込み中の可能性があるため、次回以降の確認で変化がなければ通知
+            self.__pending[dirpath + "/" + name] = self.__file_signature(dirpath + "/" + name)
+        for name in old_files - new_files:
+            self.__remove_file(dirpath + "/" + name)
+        for name in new_dirs - old_dirs:
+            # 新しいサブフォルダ内の画像は次回以降の確認で追加として検知される
+            self.__snapshots[dirpath + "/" + name] = (None, set(), set())
+
+    def __check_pending(self):
+        '''追加を通知していない画像のうち、サイズと更新日時が前回の確認から変わらないものを通知
+        '''
+        for path, old_signature in list(self.__pending.items()):
+            signature = self.__file_signature(path)
+            if signature is None:
+                del self.__pending[path]    # 通知前に削除された
+            elif signature == old_signature:
+                del self.__pending[path]
+                self._events.put((EVENT_ADD, path))
+            else:
+                self.__pending[path] = signature
+
+    def __remove_file(self, path:str):
+        '''削除イベントを通知（追加を通知していない画像は通知しない）
+        '''
+        if self.__pending.pop(path, False) is False:
+            self._events.put((EVENT_REMOVE, path))
+
+    def __file_signature(self, path:str) -> tuple:
+        '''ファイルのサイズと更新日時（ファイルがない場合はNone）
+        '''
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def __take_snapshot(self, dirpath:str) -> tuple:
+        '''フォルダの中身を記録
+        '''
+        files = set()
+        dirs = set()
+        try:
+            mtime = os.stat(dirpath).st_mtime_ns
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        dirs.add(entry.name)
+                    elif entry.is_file():
+                        files.add(entry.name)
+        except FileNotFoundError:
+            mtime = None
+        return (mtime, files, dirs)
+
+
+def create_folder_watcher(method:str, interval:float) -> FolderWatcher:
+    '''フォルダ監視オブジェクトを生成
+    Param:  監視方式（auto: inotify が使えない場合は定期確認 / poll: 定期確認 / off: 監視しない）、定期確認間隔[s]
+    Return: フォルダ監視オブジェクト（監視しない場合はNone）
+    '''
+    if method == "off":
+        return None
+    if (method == "auto") and InotifyWatcher.is_available():
+        try:
+            return InotifyWatcher()
+        except OSError:
+            pass    # inotify の上限数超過など
+    return PollingWatcher(interval)
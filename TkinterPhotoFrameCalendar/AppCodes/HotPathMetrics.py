@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## 処理時間集計用ライブラリ
+from bisect import bisect_left
+import functools
+
+
+### 定数
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)   # ヒストグラムの上限[s]（最後に+Infを追加）
+METRIC_NAME = "photoframe_hotpath_seconds"
+
+
+class Histogram:
+    ''' 固定バケットの処理時間ヒストグラムクラス
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        self.counts = [0] * (len(BUCKETS) + 1)  # バケット毎の回数（累積ではない、最後は+Inf）
+        self.count = 0
+        self.sum = 0.0                          # 合計処理時間[s]
+        self.max = 0.0                          # 最大処理時間[s]
+
+    def observe(self, seconds:float):
+        '''処理時間を追加
+        '''
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _NullTimer:
+    ''' 計測しない場合の計測区間（何もしない）
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class _Timer:
+    ''' 計測区間
+    '''
+    __slots__ = ("__metrics", "__name", "__start")
+
+    def __init__(self, metrics, name:str):
+        self.__metrics = metrics
+        self.__name = name
+        self.__start = 0.0
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__metrics.observe(self.__name, time.perf_counter() - self.__start)
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class HotPathMetrics:
+    ''' 周期処理の処理時間計測クラス
+    ※計測区間毎の処理時間を固定バケットのヒストグラムに集計し、一定周期でファイルへ出力
+      （Prometheus の textfile 形式または JSON 形式）
+    ※無効時は計測区間が何もしないため、周期処理への影響はほぼない
+    ※画像読み込みスレッドからも計測されるため、集計はロックして行う
+    '''
+    def __init__(self):
+        '''コンストラクタ（無効の状態で生成し、configure() で有効化）
+        '''
+        self.enabled = False
+        self.__lock = threading.Lock()
+        self.__histograms = {}          # key: 計測区間名
+        self.__export_path = ""
+        self.__export_format = "prometheus"
+        self.__export_interval = 60
+        self.__next_export = 0.0        # 次の出力時刻（エポック秒）
+        self.__export_thread = None
+
+    def configure(self, enabled:bool, export_path:str, export_format:str="prometheus", export_interval:int=60):
+        '''計測の有効／無効と出力先を設定
+        Param: 計測するか、出力ファイルパス、出力形式（prometheus / json）、出力周期[s]
+        '''
+        self.__export_path = export_path
+        self.__export_format = export_format
+        self.__export_interval = max(1, export_interval)
+        self.__next_export = time.time() + self.__export_interval
+        self.enabled = enabled
+
+    def timer(self, name:str):
+        '''計測区間を取得（with 文で使用）
+        Param: 計測区間名
+        '''
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name:str):
+        '''関数全体を計測区間とするデコレータ
+        Param: 計測区間名
+        ※クラス定義時には設定前のため、有効／無効は呼び出し毎に判定
+        '''
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, name:str, seconds:float):
+        '''処理時間を集計
+        '''
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        '''集計結果を取得
+        Return: key: 計測区間名, value: 回数、合計／最大処理時間[ms]、バケット毎の回数
+        '''
+        with self.__lock:
+            return {name: {"count": histogram.count, "sum_ms": 1000 * histogram.sum, "max_ms": 1000 * histogram.max,
+                           "buckets": list(histogram.counts)}
+                    for name, histogram in sorted(self.__histograms.items())}
+
+    def export_if_due(self, now:float=None):
+        '''出力周期を過ぎていれば、集計結果をバックグラウンドでファイルへ出力
+        Param: 現在時刻（エポック秒）
+        '''
+        if (not self.enabled) or (self.__export_path == ""):
+            return
+        now = time.time() if now is None else now
+        if now < self.__next_export:
+            return
+        self.__next_export = now + self.__export_interval
+        if (self.__export_thread is not None) and self.__export_thread.is_alive():
+            return      # 前回の出力が終わっていない場合は今回を見送る
+        self.__export_thread = threading.Thread(target=self.export, daemon=True)
+        self.__export_thread.start()
+
+    def export(self):
+        '''集計結果をファイルへ出力
+        ※読み取り側が書き込み途中のファイルを読まないよう、一時ファイルに書き込んでから置き換え
+        '''
+        if self.__export_path == "":
+            return
+        snapshot = self.snapshot()
+        if self.__export_format == "json":
+            text = json.dumps({"timestamp": time.time(), "buckets_ms": [1000 * bound for bound in BUCKETS],
+                               "paths": snapshot}, indent=2)
+        else:
+            text = self.__format_prometheus(snapshot)
+        tmp_path = self.__export_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.__export_path)
+        except OSError:
+            pass    # 次の出力周期で再試行
+
+    def __format_prometheus(self, snapshot:dict) -> str:
+        '''Prometheus のテキスト形式へ変換（バケットは累積回数）
+        '''
+        lines = ["# HELP {} Time spent in per-tick hot paths.".format(METRIC_NAME),
+                 "# TYPE {} histogram".format(METRIC_NAME)]
+        for name, values in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), values["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append('{}_bucket{{path="{}",le="{}"}} {}'.format(METRIC_NAME, name, le, cumulative))
+            lines.append('{}_sum{{path="{}"}} {}'.format(METRIC_NAME, name, values["sum_ms"] / 1000))
+            lines.append('{}_count{{path="{}"}} {}'.format(METRIC_NAME, name, values["count"]))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = HotPathMetrics()      # アプリ全体で共有する計測（ApplicationMain で設定）
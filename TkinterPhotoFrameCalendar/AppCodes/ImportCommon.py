@@ -3,8 +3,10 @@
 import calendar as cal
 import csv
 import datetime as dt
+import hashlib
 import json
 import math
+import multiprocessing
 import os
 import random
 import re
@@ -14,6 +16,7 @@ import time
 import tkinter as tk
 import tkinter.ttk as ttk
 
+from collections import OrderedDict
 from dataclasses import dataclass
 
 
@@ -23,3 +26,5 @@ WIDTH = 980         # 画面出力幅
 BROWN = "#512007"   # ブラウン（主に文字色で使用）
 BEIGE = "#f5f5dc"   # ベージュ（主に背景色で使用）
 FONT = "Times"      # 文字フォント
+# ワーカープロセスの起動方式（Tkや各種スレッドを抱えたプロセスを fork しない）
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.Configuration import CalendarConfig
+from AppCodes.ImportCommon import *
+
+## 前後の月の事前計算用ライブラリ
+from concurrent.futures import ThreadPoolExecutor
+
+
+### 定数
+CELL_COUNT = 42             # カレンダーのマス数（6週 x 7日）
+DAY_NORMAL = 0              # 平日
+DAY_SATURDAY = 1            # 所定休日（主に土曜）
+DAY_HOLIDAY = 2             # 法定休日（主に日曜、祝日）
+
+
+@dataclass
+class MonthGrid:
+    ''' 1か月分のカレンダー表示内容（ウィジェットを持たないデータのみ）
+    ※今日の日付は日を跨ぐと変わるため含めず、表示時に cells() で指定する
+    '''
+    year: int
+    month: int
+    days: tuple             # 42マス分の日（日付がないマスは0）
+    day_classes: tuple      # 42マス分の日の種類（DAY_NORMAL / DAY_SATURDAY / DAY_HOLIDAY）
+    holiday_names: dict     # 祝日名（key: 日）
+
+    def cells(self, current_date:dt.date) -> list:
+        '''42マス分の表示内容を取得
+        Param:  現在の年月日
+        Return: (日付テキスト, 文字色番号, 背景色番号) のリスト（色番号は DayButton の色定義に対応）
+        '''
+        today = current_date.day if (current_date.year == self.year) and (current_date.month == self.month) else 0
+        return [("", DAY_NORMAL, 0) if day == 0 else (str(day), day_class, 1 if day == today else 0)
+                for day, day_class in zip(self.days, self.day_classes)]
+
+
+def build_month_grid(config:CalendarConfig, year:int, month:int) -> MonthGrid:
+    '''指定年月のカレンダー表示内容を生成
+    Param: カレンダー表示設定、指定年月
+    '''
+    weeks = config.get_monthcalendar(year, month)
+    holiday_names = config.get_holiday_list(year, month)    # 祝日リストを取得
+    # 月によっては42マス目まで日付がないため、日付がないマスは0
+    days = tuple(day for week in weeks for day in week) + (0,) * (CELL_COUNT - 7 * len(weeks))
+    day_classes = []
+    for index, day in enumerate(days):
+        col = index % 7
+        if (day != 0) and ((col == 0) or (day in holiday_names)):
+            day_classes.append(DAY_HOLIDAY)     # 日曜日、祝日
+        elif (day != 0) and (col == 6):
+            day_classes.append(DAY_SATURDAY)    # 通常の土曜日
+        else:
+            day_classes.append(DAY_NORMAL)      # 平日、日付がないマス
+    return MonthGrid(year=year, month=month, days=days, day_classes=tuple(day_classes),
+                     holiday_names=dict(holiday_names))
+
+
+class MonthGridCache:
+    ''' カレンダー表示内容のキャッシュクラス
+    ※年月毎に1回だけ生成し、表示した月の前後の月はバックグラウンドで生成しておく
+    '''
+    def __init__(self, max_months:int=120):
+        '''コンストラクタ
+        Param: 保持する月数（超えた場合は最も長く使われていない月から破棄）
+        '''
+        self.__config = CalendarConfig()
+        self.__max_months = max_months
+        self.__grids = OrderedDict()        # key: (年, 月)
+        self.__lock = threading.Lock()      # 祝日計算は同じ設定オブジェクトを使うため、生成は1つずつ行う
+        self.__worker = ThreadPoolExecutor(max_workers=1)
+        self.hits = 0
+        self.misses = 0
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.__worker.shutdown(wait=False, cancel_futures=True)
+
+    def get(self, year:int, month:int) -> MonthGrid:
+        '''指定年月のカレンダー表示内容を取得（未生成の場合はその場で生成）
+        '''
+        key = (year, month)
+        with self.__lock:
+            grid = self.__grids.get(key)
+            if grid is not None:
+                self.__grids.move_to_end(key)
+                self.hits += 1
+                return grid
+            self.misses += 1
+            return self.__build(key)
+
+    def prefetch_neighbors(self, year:int, month:int):
+        '''指定年月の前後の月をバックグラウンドで生成
+        '''
+        prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        self.prefetch_months([next_month, prev_month])
+
+    def prefetch_months(self, keys:list):
+        '''指定した年月をバックグラウンドで生成（生成済みの年月は除く）
+        Param: (年, 月) のリスト
+        '''
+        for key in keys:
+            if key not in self.__grids:
+                self.__worker.submit(self.__prefetch_worker, key)
+
+    def __prefetch_worker(self, key:tuple):
+        '''前後の月の生成処理
+        '''
+        with self.__lock:
+            if key not in self.__grids:
+                self.__build(key)
+
+    def __build(self, key:tuple) -> MonthGrid:
+        '''カレンダー表示内容を生成してキャッシュへ追加（ロック中に呼び出すこと）
+        '''
+        grid = build_month_grid(self.__config, key[0], key[1])
+        self.__grids[key] = grid
+        while len(self.__grids) > self.__max_months:
+            self.__grids.popitem(last=False)
+        return grid
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.BaseLibrary import ShowDateCanvas
+from AppCodes.CalendarWindow import DayButton
+from AppCodes.Configuration import CalendarConfig, DecodeConfig, EventNameConfig, FileConfig, JapanDaysConfig
+from AppCodes.DayDetailWindow import AnalogClock, build_day_detail_text
+from AppCodes.ImportCommon import *
+from AppCodes.MonthGrid import MonthGridCache
+from AppCodes.OutputMedia import decode_image
+
+## オフスクリーン描画用ライブラリ
+from PIL import Image, ImageDraw, ImageFont
+
+
+class RenderBackend:
+    ''' 描画先基底クラス
+    ※Tkのキャンバス以外（オフスクリーン画像、フレームバッファ、電子ペーパーなど）へ同じ内容を描画するための描画命令
+    '''
+    def begin_frame(self):
+        '''1画面分の描画開始（背景で塗りつぶす）
+        '''
+        raise NotImplementedError
+
+    def end_frame(self):
+        '''1画面分の描画終了
+        Return: 描画結果
+        '''
+        raise NotImplementedError
+
+    def rectangle(self, box:tuple, fill:str, outline:str=None):
+        raise NotImplementedError
+
+    def oval(self, box:tuple, outline:str, width:int):
+        raise NotImplementedError
+
+    def line(self, points:tuple, fill:str, width:int):
+        raise NotImplementedError
+
+    def text(self, pos:tuple, text:str, font_size:int, fill:str, anchor:str="la"):
+        '''テキスト描画
+        Param: 位置、テキスト、フォントサイズ、文字色、基準位置（Pillowのアンカー指定: la=左上, mm=中央）
+        '''
+        raise NotImplementedError
+
+    def paste(self, img:Image.Image, pos:tuple):
+        raise NotImplementedError
+
+
+class PillowBackend(RenderBackend):
+    ''' Pillowによるオフスクリーン描画クラス
+    ※描画結果はPIL画像として返し、PNG保存やフレームバッファへの転送は呼び出し側で行う
+    '''
+    def __init__(self, width:int, height:int, bg_color:str=BEIGE, font_path:str=None):
+        '''コンストラクタ
+        Param: 描画幅、高さ、背景色、フォントファイル（省略時は FONT、見つからない場合はPillowの標準フォント）
+        '''
+        self.__size = (width, height)
+        self.__bg_color = bg_color
+        self.__font_path = font_path if font_path is not None else FONT
+        self.__fonts = {}       # key: フォントサイズ
+        self.__img = None
+        self.__draw = None
+
+    def begin_frame(self):
+        self.__img = Image.new("RGB", self.__size, self.__bg_color)
+        self.__draw = ImageDraw.Draw(self.__img)
+
+    def end_frame(self) -> Image.Image:
+        img = self.__img
+        self.__img = None
+        self.__draw = None
+        return img
+
+    def rectangle(self, box:tuple, fill:str, outline:str=None):
+        self.__draw.rectangle(box, fill=fill, outline=outline)
+
+    def oval(self, box:tuple, outline:str, width:int):
+        self.__draw.ellipse(box, outline=outline, width=width)
+
+    def line(self, points:tuple, fill:str, width:int):
+        self.__draw.line(points, fill=fill, width=width)
+
+    def text(self, pos:tuple, text:str, font_size:int, fill:str, anchor:str="la"):
+        if "\n" in text:
+            self.__draw.multiline_text(pos, text, font=self.__get_font(font_size), fill=fill, anchor=anchor)
+        else:
+            self.__draw.text(pos, text, font=self.__get_font(font_size), fill=fill, anchor=anchor)
+
+    def paste(self, img:Image.Image, pos:tuple):
+        self.__img.paste(img, pos)
+
+    def __get_font(self, font_size:int):
+        '''フォントを取得（サイズ毎に1回だけ読み込み）
+        '''
+        font = self.__fonts.get(font_size)
+        if font is None:
+            try:
+                font = ImageFont.truetype(self.__font_path, font_size)
+            except OSError:
+                font = ImageFont.load_default(font_size)    # フォントファイルがない環境
+            self.__fonts[font_size] = font
+        return font
+
+
+class OffscreenRenderer:
+    ''' オフスクリーン画面描画クラス
+    ※Tk（tk.Tk()）や画面サイズの取得（pyautogui）を使わずに、
+      画面1（カレンダー／デジタル時計／スライドショー）と画面2（日付詳細／アナログ時計）と同じ内容を描画
+    '''
+    ### 定数
+    __SELECT_H = 60             # 年月選択部分の高さ
+    __WEEK_H = 40               # 曜日部分の高さ
+    __DAY_H = 50                # 日付1マスの高さ
+    __DETAIL_MARGIN = 20        # 日付詳細情報の表示位置
+
+    def __init__(self, backend:RenderBackend=None):
+        '''コンストラクタ
+        Param: 描画先（省略時は画面サイズのPillow描画）
+        '''
+        self.__backend = backend if backend is not None else PillowBackend(WIDTH, HEIGHT)
+        self.__cal_config = CalendarConfig()
+        self.__week_texts = self.__cal_config.get_week_texts()
+        self.__month_texts = self.__cal_config.get_month_texts()
+        self.__month_grids = MonthGridCache()
+        self.__jp_days_conf = JapanDaysConfig()
+        self.__event_config = EventNameConfig()
+        self.__decode_config = DecodeConfig()
+        self.__images_root_folder = FileConfig().app_root_folder + "images/"
+        self.__slides = OrderedDict()       # 整形済みスライドショー画像（直近の数枚のみ保持）
+        self.__dial = None                  # 整形済みアナログ時計文字盤
+
+    def render_window1(self, now:dt.datetime, show_month:tuple=None, slide_path:str=None):
+        '''画面1（カレンダー／デジタル時計／スライドショー）を描画
+        Param:  現在日時、カレンダーの表示年月（省略時は現在の年月）、スライドショー画像（省略時は初期画像）
+        Return: 描画結果
+        '''
+        year, month = show_month if show_month is not None else (now.year, now.month)
+        panel_w = WIDTH - HEIGHT
+        self.__backend.begin_frame()
+        # カレンダー
+        self.__backend.text((panel_w / 2, self.__SELECT_H / 2), "{} {}".format(self.__month_texts[month], year), 24, BROWN, "mm")
+        cell_w = panel_w / 7
+        top = self.__SELECT_H
+        for index, week_text in enumerate(self.__week_texts):
+            f_color = 2 if index == 0 else (1 if index == 6 else 0)
+            self.__draw_cell(index * cell_w, top, cell_w, self.__WEEK_H, week_text, f_color, 0)
+        top += self.__WEEK_H
+        cells = self.__month_grids.get(year, month).cells(now.date())
+        for index, (day_text, f_color, b_color) in enumerate(cells):
+            self.__draw_cell((index % 7) * cell_w, top + (index // 7) * self.__DAY_H, cell_w, self.__DAY_H,
+                             day_text, f_color, b_color)
+        # デジタル時計
+        clock_top = top + 6 * self.__DAY_H
+        clock_text = (ShowDateCanvas._show_date_label(now.year, now.month, now.day) + " "
+                      + ShowDateCanvas._show_time_label(now.hour, now.minute, now.second))
+        self.__backend.text((panel_w / 2, (clock_top + HEIGHT) / 2), clock_text, 28, BROWN, "mm")
+        # スライドショー
+        if slide_path is None:
+            slide_path = self.__images_root_folder + "top_sample.jpg"
+        self.__backend.paste(self.__get_slide(slide_path), (panel_w, 0))
+        return self.__backend.end_frame()
+
+    def render_window2(self, now:dt.datetime, select_date:dt.date=None):
+        '''画面2（日付詳細／アナログ時計）を描画
+        Param:  現在日時、日付詳細の表示日（省略時は今日）
+        Return: 描画結果
+        '''
+        if select_date is None:
+            select_date = now.date()
+        half_w = int(WIDTH / 2)
+        self.__backend.begin_frame()
+        # 日付詳細情報
+        day_text = build_day_detail_text(self.__jp_days_conf, self.__event_config, select_date)
+        self.__backend.text((self.__DETAIL_MARGIN, self.__DETAIL_MARGIN), day_text, 18, BROWN)
+        # アナログ時計
+        if self.__dial is None:
+            self.__dial = self.__decode(self.__images_root_folder + "AnalogClock/clock_oval.jpg", (half_w, HEIGHT))
+        self.__backend.paste(self.__dial, (half_w, 0))
+        center = [half_w + int(half_w / 2), int(HEIGHT / 2)]
+        for rad in AnalogClock.oval_radii():
+            self.__backend.oval((center[0] - rad, center[1] - rad, center[0] + rad, center[1] + rad), "black", 1)
+        for x0, y0, x1, y1, width in AnalogClock.needle_lines(center, now.time()):
+            self.__backend.line((x0, y0, x1, y1), "black", width)
+        return self.__backend.end_frame()
+
+    def __draw_cell(self, x:float, y:float, w:float, h:float, text:str, f_color:int, b_color:int):
+        '''カレンダーの1マスを描画（DayButton と同じ配色）
+        '''
+        self.__backend.rectangle((x, y, x + w - 1, y + h - 1), DayButton._bg_color[b_color], BROWN)
+        if text != "":
+            self.__backend.text((x + w / 2, y + h / 2), text, 14, DayButton._fg_color[f_color], "mm")
+
+    def __get_slide(self, image_path:str) -> Image.Image:
+        '''スライドショー画像を整形して取得（直近の数枚は整形済みのものを再利用）
+        '''
+        img = self.__slides.get(image_path)
+        if img is None:
+            img = self.__decode(image_path, (HEIGHT, HEIGHT))
+            self.__slides[image_path] = img
+            if len(self.__slides) > 4:
+                self.__slides.popitem(last=False)
+        else:
+            self.__slides.move_to_end(image_path)
+        return img
+
+    def __decode(self, image_path:str, size:tuple) -> Image.Image:
+        return decode_image(image_path, size, BEIGE, self.__decode_config.use_draft, self.__decode_config.max_pixels)
@@ -1,20 +1,345 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from AppCodes.BaseLibrary import BaseCanvas
-from AppCodes.Configuration import FileConfig
+from AppCodes.Configuration import DecodeConfig, FileConfig, RenderCacheConfig
+from AppCodes.HotPathMetrics import METRICS
 from AppCodes.ImportCommon import *
 
 ## 画像出力用ライブラリ
 from PIL import Image, ImageTk, ImageOps
 
+## キャッシュ記録の終了時保存用ライブラリ
+import atexit
+
+## 画像コピー／変換並列化用ライブラリ
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import queue
+
 ## 音声出力用ライブラリ
 import pyaudio
 import wave
 
+## ログ出力用ライブラリ
+import logging
+
+
+### 定数
+LOGGER = logging.getLogger(__name__)
+
+
+def decode_image(image_path:str, size:tuple, color:str, use_draft:bool, max_pixels:int) -> Image.Image:
+    '''画像を読み込み、縦横比を崩さずに指定サイズへ整形（余白を追加）
+    Param:  画像ファイルパス、出力サイズ(幅, 高さ)、余白色、JPEG縮小読み込みの有無、最大画素数
+    Return: 整形済み画像
+    ※JPEGは縮小読み込み（1/2～1/8）で出力サイズ以上の最小解像度のみ展開し、最大画素数を超える画像は読み込まない
+    '''
+    with METRICS.timer("slideshow_decode"):
+        try:
+            open_img = Image.open(image_path)
+        except Image.DecompressionBombError as e:
+            raise ValueError(str(e))
+        if use_draft and (open_img.format == "JPEG"):
+            open_img.draft("RGB", size)     # 画素の展開前に縮小率を決定（ヘッダのみ読み込み済み）
+        if (open_img.width * open_img.height) > max_pixels:
+            raise ValueError("too many pixels: {} ({}x{})".format(image_path, open_img.width, open_img.height))
+        open_img.load()                 # 展開と整形の処理時間を分けて計測するため、ここで展開
+    with METRICS.timer("slideshow_pad"):
+        return ImageOps.pad(open_img, size, color=color)
+
+
+def decode_to_shared_memory(image_path:str, size:tuple, color:str, use_draft:bool, max_pixels:int) -> tuple:
+    '''画像を読み込んで整形し、RGB画素を共有メモリへ書き込む
+    Param:  decode_image() と同じ
+    Return: (共有メモリ名, 画像サイズ)
+    ※プロセスプールのワーカーで実行するため、モジュール直下の関数とする
+    ※共有メモリの解放は受け取った側が行う
+    '''
+    frame = decode_image(image_path, size, color, use_draft, max_pixels).convert("RGB")
+    frame_bytes = frame.width * frame.height * 3
+    shm = shared_memory.SharedMemory(create=True, size=frame_bytes)
+    shm.buf[:frame_bytes] = frame.tobytes()
+    # 解放は受け取った側で行うため、このプロセスの終了時に削除されないよう登録を外す
+    resource_tracker.unregister(shm._name, "shared_memory")
+    shm.close()
+    return (shm.name, frame.size)
+
+
+class ProcessDecoder:
+    ''' 別プロセスでの画像読み込みクラス
+    ※GILを表示側と取り合わないよう、読み込みと整形をワーカープロセスで行い、
+      整形済みの画素は pickle を介さず共有メモリで受け取る
+    '''
+    def __init__(self, workers:int):
+        '''コンストラクタ
+        Param: ワーカープロセス数（0の場合はCPUコア数-1）
+        '''
+        if workers <= 0:
+            workers = max(1, (os.cpu_count() or 2) - 1)     # 表示側に1コア残す
+        self.__executor = ProcessPoolExecutor(max_workers=workers,
+                                              mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+    @METRICS.timed("slideshow_decode_process")
+    def decode(self, image_path:str, size:tuple, color:str, use_draft:bool, max_pixels:int) -> Image.Image:
+        '''画像を読み込み、整形済み画像を取得
+        Param:  decode_image() と同じ
+        Return: 整形済み画像
+        ※共有メモリ上の画素を表示側の画像バッファへ1回だけ写す（画像キャッシュに保持するため）
+        ※展開と整形はワーカープロセス側のため分けて計測せず、受け取りまでをまとめて計測する
+        '''
+        shm_name, frame_size = self.__executor.submit(decode_to_shared_memory, image_path, size, color,
+                                                      use_draft, max_pixels).result()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            view = Image.frombuffer("RGB", frame_size, shm.buf, "raw", "RGB", 0, 1)
+            frame = view.copy()
+            del view    # 共有メモリを閉じる前にバッファの参照を外す
+        finally:
+            shm.close()
+            shm.unlink()
+        return frame
+
+
+class RenderCache:
+    ''' 整形済み画像のメモリキャッシュクラス
+    ※上限サイズを超えた場合、最も長く使われていない画像から破棄（LRU）
+    '''
+    def __init__(self, max_bytes:int):
+        '''コンストラクタ
+        Param: キャッシュ上限[byte]
+        '''
+        self.__max_bytes = max_bytes
+        self.__images = OrderedDict()   # 整形済み画像（key: (ファイルパス, 更新日時, 幅, 高さ)）
+        self.__lock = threading.Lock()
+        self.size_bytes = 0             # キャッシュ中の画像の合計サイズ[byte]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image_path:str, width:int, height:int) -> tuple:
+        '''キャッシュのキーを生成
+        '''
+        return (image_path, os.stat(image_path).st_mtime_ns, width, height)
+
+    def get(self, key:tuple) -> Image.Image:
+        '''キャッシュから画像を取得
+        Return: 整形済み画像（キャッシュにない場合はNone）
+        '''
+        with self.__lock:
+            img = self.__images.get(key)
+            if img is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.__images.move_to_end(key)
+            return img
+
+    def put(self, key:tuple, img:Image.Image):
+        '''キャッシュへ画像を登録
+        '''
+        img_bytes = self.__image_bytes(img)
+        if img_bytes > self.__max_bytes:
+            return      # 上限を超える画像はキャッシュしない
+        with self.__lock:
+            if key in self.__images:
+                self.size_bytes -= self.__image_bytes(self.__images.pop(key))
+            self.__images[key] = img
+            self.size_bytes += img_bytes
+            while self.size_bytes > self.__max_bytes:
+                old_key, old_img = self.__images.popitem(last=False)
+                self.size_bytes -= self.__image_bytes(old_img)
+
+    def hit_ratio(self) -> float:
+        '''キャッシュのヒット率を取得
+        '''
+        total = self.hits + self.misses
+        return (self.hits / total) if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        '''キャッシュの使用状況を取得
+        '''
+        return {"count": len(self.__images), "size_bytes": self.size_bytes, "max_bytes": self.__max_bytes,
+                "hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio()}
+
+    def __image_bytes(self, img:Image.Image) -> int:
+        '''画像のメモリ使用量を概算
+        '''
+        return img.width * img.height * len(img.getbands())
+
+
+class DiskRenderCache:
+    ''' 整形済み画像のディスクキャッシュクラス
+    ※元画像（外部側フォルダの画像）のパス・サイズ・更新日時・出力サイズ・余白色をキーとし、アプリ再起動後も再利用する
+      （内部側フォルダのコピーは再起動や日付変更で作り直されるため、キーに含めない。元画像の内容も読まない）
+    ※上限サイズを超えた場合、最も長く使われていない画像から削除
+    ※元画像毎の記録は変更時に印を付けるだけにし、一定周期と終了時にまとめて保存する
+    '''
+    ### 定数
+    __INDEX_FILE = "index.json"     # 元画像毎のキャッシュ記録ファイル
+    __FLUSH_INTERVAL = 30           # キャッシュ記録の保存周期[s]
+
+    def __init__(self, cache_folder:str, max_bytes:int):
+        '''コンストラクタ
+        Param: キャッシュフォルダ、キャッシュ上限[byte]
+        '''
+        self.__cache_folder = cache_folder
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        os.makedirs(self.__cache_folder, exist_ok=True)
+        self.__sources = self.__load_index()    # key: 元画像パス, value: [サイズ, 更新日時, キー（出力サイズ等を除く）]
+        self.__is_dirty = False                 # 未保存のキャッシュ記録の変更があるか
+        self.__flushed_at = time.monotonic()    # 最後にキャッシュ記録を保存した時刻
+        self.__files = self.__scan_cache_files()    # key: キャッシュファイル名, value: サイズ（使用順）
+        self.size_bytes = sum(self.__files.values())
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.flush)             # 終了時に未保存の記録を保存
+
+    def make_key(self, source:tuple, width:int, height:int, color:str) -> str:
+        '''キャッシュのキー（キャッシュファイル名）を生成
+        Param: 元画像の (ファイルパス, サイズ, 更新日時)、出力サイズ、余白色
+        ※元画像の (パス, サイズ, 更新日時) から生成し、元画像の内容は読まない
+        ※元画像が変更された場合、変更前の画像のキャッシュファイルを削除
+        '''
+        source_path, size, mtime = source
+        source_key = hashlib.sha1("{}\0{}\0{}".format(source_path, size, mtime).encode()).hexdigest()
+        with self.__lock:
+            entry = self.__sources.get(source_path)
+            if (entry is None) or (entry[2] != source_key):
+                if entry is not None:
+                    self.__remove_source_files(entry[2])
+                self.__sources[source_path] = [size, mtime, source_key]
+                self.__is_dirty = True
+            should_flush = self.__is_dirty and ((time.monotonic() - self.__flushed_at) >= self.__FLUSH_INTERVAL)
+        if should_flush:
+            self.flush()
+        return "{}_{}x{}_{}.jpg".format(source_key, width, height, color.lstrip("#"))
+
+    def flush(self):
+        '''未保存のキャッシュ記録を保存
+        '''
+        with self.__lock:
+            if not self.__is_dirty:
+                return
+            sources = dict(self.__sources)
+            self.__is_dirty = False
+            self.__flushed_at = time.monotonic()
+        self.__save_index(sources)
+
+    def get(self, key:str) -> Image.Image:
+        '''キャッシュから画像を取得
+        Return: 整形済み画像（キャッシュにない場合はNone）
+        '''
+        cache_path = self.__cache_folder + "/" + key
+        with self.__lock:
+            is_cached = key in self.__files
+            if is_cached:
+                self.__files.move_to_end(key)
+        if is_cached:
+            try:
+                img = Image.open(cache_path)
+                img.load()
+                os.utime(cache_path)    # 使用順を再起動後も保持するため更新日時を更新
+                self.hits += 1
+                return img
+            except OSError:
+                with self.__lock:
+                    self.size_bytes -= self.__files.pop(key, 0)
+        self.misses += 1
+        return None
+
+    def put(self, key:str, img:Image.Image):
+        '''キャッシュへ画像を登録
+        '''
+        cache_path = self.__cache_folder + "/" + key
+        tmp_path = cache_path + ".tmp"
+        try:
+            img.convert("RGB").save(tmp_path, "JPEG", quality=95)
+            os.replace(tmp_path, cache_path)
+            file_bytes = os.path.getsize(cache_path)
+        except OSError:
+            return      # 書き込めない場合はキャッシュしない
+        with self.__lock:
+            self.size_bytes += file_bytes - self.__files.pop(key, 0)
+            self.__files[key] = file_bytes
+            while (self.size_bytes > self.__max_bytes) and (len(self.__files) > 1):
+                old_key, old_bytes = self.__files.popitem(last=False)
+                self.size_bytes -= old_bytes
+                try:
+                    os.remove(self.__cache_folder + "/" + old_key)
+                except FileNotFoundError:
+                    pass
+
+    def hit_ratio(self) -> float:
+        '''キャッシュのヒット率を取得
+        '''
+        total = self.hits + self.misses
+        return (self.hits / total) if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        '''キャッシュの使用状況を取得
+        '''
+        return {"count": len(self.__files), "size_bytes": self.size_bytes, "max_bytes": self.__max_bytes,
+                "hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio()}
+
+    def __remove_source_files(self, source_key:str):
+        '''元画像の変更前のキャッシュファイルを全ての出力サイズ分削除（ロック中に呼び出すこと）
+        '''
+        for key in [key for key in self.__files.keys() if key.startswith(source_key + "_")]:
+            self.size_bytes -= self.__files.pop(key)
+            try:
+                os.remove(self.__cache_folder + "/" + key)
+            except FileNotFoundError:
+                pass
+
+    def __load_index(self) -> dict:
+        '''キャッシュ記録を読み込み（既に存在しない元画像の記録は破棄）
+        '''
+        try:
+            with open(self.__cache_folder + "/" + self.__INDEX_FILE, 'r') as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {path: entry for path, entry in index.items() if os.path.isfile(path)}
+
+    def __save_index(self, sources:dict):
+        '''キャッシュ記録を保存
+        '''
+        index_path = self.__cache_folder + "/" + self.__INDEX_FILE
+        try:
+            with open(index_path + ".tmp", 'w') as f:
+                json.dump(sources, f)
+            os.replace(index_path + ".tmp", index_path)
+        except OSError:
+            pass
+
+    def __scan_cache_files(self) -> OrderedDict:
+        '''キャッシュファイルを使用順（更新日時順）に取得
+        '''
+        entries = []
+        with os.scandir(self.__cache_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        entries.sort()
+        return OrderedDict((name, size) for mtime, name, size in entries)
+
 
 class ImageView(BaseCanvas):
     ''' 画像表示クラス
     '''
+    ### 全画像表示キャンバスで共有する整形済み画像キャッシュ
+    _render_cache = None        # メモリキャッシュ
+    _disk_cache = None          # ディスクキャッシュ
+    _decode_config = None       # 画像読み込み設定
+    _process_decoder = None     # 別プロセスでの画像読み込み（読み込み方式が process の場合のみ）
+
     def __init__(self, master, height:int, width:int):
         '''コンストラクタ
         Param: マスター、表示用キャンバス長
@@ -23,6 +348,14 @@ class ImageView(BaseCanvas):
         self._images_root_folder = FileConfig().app_root_folder + "images/"
         self._inside_folder = ""
         self._show_image = None
+        if ImageView._render_cache is None:
+            cache_config = RenderCacheConfig()
+            ImageView._render_cache = RenderCache(cache_config.memory_bytes)
+            ImageView._disk_cache = DiskRenderCache(self._images_root_folder + cache_config.disk_folder,
+                                                    cache_config.disk_bytes)
+            ImageView._decode_config = DecodeConfig()
+            if ImageView._decode_config.backend == "process":
+                ImageView._process_decoder = ProcessDecoder(ImageView._decode_config.workers)
         
     def _set_folder_path(self, folder_name:str):
         '''表示画像を格納するフォルダのパスを設定
@@ -30,80 +363,787 @@ class ImageView(BaseCanvas):
         '''
         self._inside_folder = self._images_root_folder + folder_name
         
+    def _get_image_path(self, image_name:str) -> str:
+        '''表示画像のファイルパスを取得
+        Param:  画像ファイル名
+        Return: 画像ファイルパス
+        '''
+        return self._inside_folder + "/" + image_name
+
+    def _load_image(self, image_path:str) -> Image.Image:
+        '''画像を読み込み、キャンバスのサイズに合わせて整形
+        Param:  画像ファイルパス
+        Return: 整形済み画像
+        ※別スレッドからも呼び出されるため、ウィジェットを操作しないこと
+        '''
+        cache_key = RenderCache.make_key(image_path, self._width, self._height)
+        pad_img = self._render_cache.get(cache_key)
+        if pad_img is None:
+            disk_key = self._disk_cache.make_key(self._source_record(image_path), self._width, self._height,
+                                                 self._bg_color)
+            pad_img = self._disk_cache.get(disk_key)
+            if pad_img is None:
+                # 画像の縦横比を崩さずにcanvasのサイズ全体に画像をリサイズ（余白を追加）
+                decode = decode_image if self._process_decoder is None else self._process_decoder.decode
+                pad_img = decode(image_path, (self._width, self._height), self._bg_color,
+                                 self._decode_config.use_draft, self._decode_config.max_pixels)
+                self._disk_cache.put(disk_key, pad_img)
+            self._render_cache.put(cache_key, pad_img)
+        return pad_img
+
+    def _source_record(self, image_path:str) -> tuple:
+        '''表示画像の元画像の (ファイルパス, サイズ, 更新日時) を取得（ディスクキャッシュのキーに使用）
+        ※外部側フォルダからコピーした画像の場合は派生クラスでコピー元を返す
+        '''
+        stat = os.stat(image_path)
+        return (image_path, stat.st_size, stat.st_mtime_ns)
+
+    def render_cache_stats(self) -> dict:
+        '''整形済み画像キャッシュの使用状況を取得
+        '''
+        return {"memory": self._render_cache.stats(), "disk": self._disk_cache.stats()}
+
     def _set_image_plot_to_all_canvas(self, image_name:str):
         '''画像をキャンバス全体へプロット
         Param: 画像ファイル名
         '''
-        open_img = Image.open(self._inside_folder + "/" + image_name)
-        # 画像の縦横比を崩さずにcanvasのサイズ全体に画像をリサイズ（余白を追加）
-        open_img = ImageOps.pad(open_img, (self._width, self._height), color=self._bg_color)
-        self._show_image = ImageTk.PhotoImage(open_img, master=self)
-        
-    def _change_to_jpeg(self, src_image:str):
-        '''画像をJPEG形式へ変換
-        '''
-        src_path = self._inside_folder + "/" + src_image
-        img_name = os.path.splitext(os.path.basename(src_image))
-        dst_path = self._inside_folder + "/" + img_name + '.jpg'
-        img = Image.open(src_path)
-        img = img.convert('RGB')
-        img.save(dst_path, "JPEG", quality=95)
-        os.remove(src_path)
+        self._set_image_path_plot_to_all_canvas(self._get_image_path(image_name))
+
+    def _set_image_path_plot_to_all_canvas(self, image_path:str, loaded_img:Image.Image=None):
+        '''画像をキャンバス全体へプロット
+        Param: 画像ファイルパス、整形済み画像（先読み済みの場合のみ）
+        '''
+        if loaded_img is None:
+            loaded_img = self._load_image(image_path)
+        with METRICS.timer("slideshow_photoimage"):
+            self._show_image = ImageTk.PhotoImage(loaded_img, master=self)
         
+
+def transcode_to_jpeg(src_path:str, dst_path:str) -> str:
+    '''画像をJPEG形式へ変換
+    Param:  変換元／変換先画像ファイルパス
+    Return: 変換先画像ファイルパス
+    ※プロセスプールのワーカーで実行するため、モジュール直下の関数とする
+    '''
+    tmp_path = dst_path + ".part"
+    with Image.open(src_path) as img:
+        img.convert('RGB').save(tmp_path, "JPEG", quality=95)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+class ImageTranscoder:
+    ''' JPEG以外の画像のJPEG変換クラス
+    ※変換はプロセスプールで全コアを使って行い、変換済みの画像は変換先フォルダに保持して再利用する
+    ※ワーカープロセスは変換の依頼時に起動されるため、依頼は受付スレッドから行い表示側では待たない
+    '''
+    ### 定数
+    __JPEG_PATTERN = re.compile(r'.+\.(jpe?g)$', re.IGNORECASE)
+
+    def __init__(self, output_folder:str, workers:int):
+        '''コンストラクタ
+        Param: 変換先フォルダ、ワーカープロセス数（0の場合はCPUコア数）
+        '''
+        self.__output_folder = output_folder
+        self.__workers = workers if workers > 0 else None
+        self.__executor = ProcessPoolExecutor(max_workers=self.__workers,
+                                              mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+        self.__dispatcher = ThreadPoolExecutor(max_workers=1)   # 変換の依頼受付
+        self.__lock = threading.Lock()
+        self.__in_flight = set()        # 変換中の変換先画像ファイルパス
+        self.__done = {}                # 変換済み画像（key: 変換元パス, value: 変換先パス）
+        self.__done_queue = queue.Queue()   # 変換が完了した (変換元, 変換先) 画像ファイルパス
+        os.makedirs(self.__output_folder, exist_ok=True)
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.stop()
+
+    def needs_transcode(self, image_path:str) -> bool:
+        '''JPEG変換が必要か
+        '''
+        return self.__JPEG_PATTERN.match(os.path.basename(image_path)) is None
+
+    def request(self, src_path:str, source:tuple=None) -> str:
+        '''JPEG変換を依頼
+        Param:  変換元画像ファイルパス、元画像の (ファイルパス, サイズ, 更新日時)（省略時は変換元画像）
+        Return: 変換先画像ファイルパス（変換中の場合はNone。完了後に take_transcoded_images() で渡す）
+        ※元画像のパス・サイズ・更新日時が同じ画像は再変換しない
+          （内部側フォルダのコピーは再起動や日付変更で作り直されるため、外部側フォルダの画像を元画像とする）
+        '''
+        if source is None:
+            stat = os.stat(src_path)
+            source = (src_path, stat.st_size, stat.st_mtime_ns)
+        dst_path = self.__output_folder + "/" + self.__make_key(source) + ".jpg"
+        with self.__lock:
+            if os.path.isfile(dst_path):
+                self.__done[src_path] = dst_path
+                return dst_path
+            if dst_path in self.__in_flight:
+                return None
+            if self.__executor is None:
+                return None     # 停止済み
+            self.__in_flight.add(dst_path)
+        self.__dispatcher.submit(self.__submit_worker, src_path, dst_path)
+        return None
+
+    def prune(self, sources:list) -> int:
+        '''どの表示画像からも参照されなくなった変換済み画像を削除
+        Param:  表示画像の元画像の (ファイルパス, サイズ, 更新日時) のリスト
+        Return: 削除した画像数
+        '''
+        keep_names = set(self.__make_key(source) + ".jpg" for source in sources)
+        removed = 0
+        with self.__lock:
+            for name in os.listdir(self.__output_folder):
+                dst_path = self.__output_folder + "/" + name
+                if (name in keep_names) or (dst_path.removesuffix(".part") in self.__in_flight):
+                    continue    # 変換中の一時ファイルを含む
+                try:
+                    os.remove(dst_path)
+                    removed += 1
+                except OSError:
+                    pass
+            self.__done = {src: dst for src, dst in self.__done.items() if os.path.basename(dst) in keep_names}
+        return removed
+
+    def __make_key(self, source:tuple) -> str:
+        '''元画像の (ファイルパス, サイズ, 更新日時) から変換先画像ファイル名（拡張子なし）を作成
+        '''
+        return hashlib.sha1("{}:{}:{}".format(*source).encode()).hexdigest()
+
+    def take_transcoded_images(self) -> list:
+        '''前回の呼び出し以降に変換が完了した画像の (変換元, 変換先) ファイルパスを取得
+        '''
+        transcoded = []
+        while True:
+            try:
+                transcoded.append(self.__done_queue.get_nowait())
+            except queue.Empty:
+                return transcoded
+
+    def transcoded_path(self, src_path:str) -> str:
+        '''変換元画像に対応する変換先画像ファイルパスを取得（未変換の場合はNone）
+        '''
+        with self.__lock:
+            return self.__done.get(src_path)
+
+    def stop(self):
+        '''ワーカープロセス停止
+        '''
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+        if executor is not None:
+            self.__dispatcher.shutdown(wait=False, cancel_futures=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __submit_worker(self, src_path:str, dst_path:str):
+        '''変換をプロセスプールへ依頼（受付スレッドで実行）
+        '''
+        with self.__lock:
+            executor = self.__executor
+        try:
+            if executor is None:
+                raise RuntimeError("transcoder stopped")
+            future = executor.submit(transcode_to_jpeg, src_path, dst_path)
+        except RuntimeError:
+            with self.__lock:
+                self.__in_flight.discard(dst_path)  # 停止済み
+            return
+        future.add_done_callback(lambda f: self.__on_done(src_path, dst_path, f))
+
+    def __on_done(self, src_path:str, dst_path:str, future):
+        '''変換完了時の処理
+        '''
+        with self.__lock:
+            self.__in_flight.discard(dst_path)
+            if (not future.cancelled()) and (future.exception() is None):
+                self.__done[src_path] = dst_path
+                self.__done_queue.put((src_path, dst_path))
+
+
+class ImagePrefetcher:
+    ''' 表示予定画像の先読みクラス
+    ※画像の読み込みと整形をワーカースレッドで行い、表示時には整形済み画像を渡すのみとする
+    '''
+    def __init__(self, loader, depth:int):
+        '''コンストラクタ
+        Param: 画像読み込み関数（ファイルパス -> 整形済み画像）、先読み枚数
+        '''
+        self.__loader = loader
+        self.__depth = depth
+        self.__targets = []         # 先読み対象の画像ファイルパス（表示予定順）
+        self.__requests = []        # 未読み込みの画像ファイルパス
+        self.__ready = {}           # 読み込み済み画像（key: 画像ファイルパス）
+        self.__cond = threading.Condition()
+        self.__is_running = True
+        self.hits = 0               # 先読み済み画像を渡せた回数
+        self.misses = 0             # 先読みが間に合わなかった回数
+        self.__prefetch_thread = threading.Thread(target=self.__prefetch_worker, daemon=True)
+        self.__prefetch_thread.start()
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.stop_thread()
+
+    def request(self, image_paths:list):
+        '''先読み対象を設定
+        Param: 表示予定順の画像ファイルパスリスト（先頭から先読み枚数分を対象とする）
+        '''
+        with self.__cond:
+            self.__targets = image_paths[:self.__depth]
+            # 先読み対象から外れた画像は破棄
+            self.__ready = {path: img for path, img in self.__ready.items() if path in self.__targets}
+            self.__requests = [path for path in self.__targets if path not in self.__ready]
+            self.__cond.notify()
+
+    def take(self, image_path:str) -> Image.Image:
+        '''先読み済み画像を取得
+        Param:  画像ファイルパス
+        Return: 整形済み画像（先読みが間に合っていない場合はNone）
+        '''
+        with self.__cond:
+            img = self.__ready.pop(image_path, None)
+            if img is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return img
+
+    def poll(self, image_path:str) -> Image.Image:
+        '''読み込みを待っている画像が読み込み済みであれば取得（ヒット／ミス回数には含めない）
+        Param:  画像ファイルパス
+        Return: 整形済み画像（読み込み中の場合はNone）
+        '''
+        with self.__cond:
+            return self.__ready.pop(image_path, None)
+
+    def hit_ratio(self) -> float:
+        '''先読みのヒット率を取得
+        '''
+        total = self.hits + self.misses
+        return (self.hits / total) if total > 0 else 0.0
+
+    def stop_thread(self):
+        '''スレッド停止
+        '''
+        with self.__cond:
+            self.__is_running = False
+            self.__cond.notify()
+
+    def __prefetch_worker(self):
+        '''先読み処理
+        '''
+        while True:
+            with self.__cond:
+                while self.__is_running and (len(self.__requests) < 1):
+                    self.__cond.wait()
+                if not self.__is_running:
+                    return
+                image_path = self.__requests.pop(0)
+            try:
+                img = self.__loader(image_path)
+            except Exception:
+                # 壊れた画像などで先読みスレッドを止めない（読み込めない画像は表示されず、次の表示周期で次の画像へ進む）
+                LOGGER.exception("failed to prefetch %s", image_path)
+                continue
+            with self.__cond:
+                if image_path in self.__targets:
+                    self.__ready[image_path] = img
+
+
+class ParallelCopier:
+    ''' 画像ファイルの並列コピークラス
+    ※カーネルがサポートする場合は copy_file_range / sendfile でコピーし、コピー後にサイズを検証する
+    '''
+    ### 定数
+    __CHUNK = 8 * 1024 * 1024       # 1回のシステムコールでコピーする最大サイズ[byte]
+
+    def __init__(self, concurrency:int):
+        '''コンストラクタ
+        Param: 同時コピー数
+        '''
+        self.__executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="ImageCopy")
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.__executor.shutdown(wait=False)
+
+    def submit(self, src_path:str, dst_path:str, on_done):
+        '''コピーを依頼
+        Param: コピー元／コピー先ファイルパス、完了時コールバック（コピー先ファイルパス、例外（成功時はNone））
+        ※コールバックはコピースレッドから呼び出される
+        '''
+        future = self.__executor.submit(self.copy_file, src_path, dst_path)
+        future.add_done_callback(lambda f: on_done(dst_path, f.exception()))
+
+    def copy_file(self, src_path:str, dst_path:str) -> str:
+        '''ファイルをコピー
+        ※一時ファイルへ書き込んだ後に置き換えるため、コピー途中のファイルが表示されることはない
+        '''
+        tmp_path = dst_path + ".part"
+        try:
+            with open(src_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                self.__copy_data(src, dst, size)
+            if os.path.getsize(tmp_path) != size:
+                raise OSError("size mismatch: " + src_path)
+            shutil.copystat(src_path, tmp_path)    # 更新日時もコピー元に合わせる
+            os.replace(tmp_path, dst_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return dst_path
+
+    def __copy_data(self, src, dst, size:int):
+        '''ファイルの中身をコピー（カーネル内コピーが使えない場合は通常のコピー）
+        '''
+        src_fd = src.fileno()
+        dst_fd = dst.fileno()
+        for kernel_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+            if kernel_copy is None:
+                continue
+            offset = 0
+            try:
+                while offset < size:
+                    if kernel_copy is os.sendfile:
+                        sent = os.sendfile(dst_fd, src_fd, offset, min(self.__CHUNK, size - offset))
+                    else:
+                        sent = os.copy_file_range(src_fd, dst_fd, min(self.__CHUNK, size - offset), offset, offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                # 未対応のファイルシステムの場合は次の方式で最初からやり直す
+                dst.seek(0)
+                dst.truncate()
+        src.seek(0)
+        shutil.copyfileobj(src, dst, self.__CHUNK)
+
+
+@dataclass
+class SyncSummary:
+    copied: list        # コピーした（またはコピーを依頼した）画像ファイル名
+    removed: list       # 削除した画像ファイル名
+    unchanged: int      # 変更のなかった画像数
+    scanned_dirs: int   # 再読み込みした外部側フォルダ数（更新のなかったフォルダは記録を再利用）
+
+
 class ImageSynchronize:
     ''' フォルダ間画像同期クラス
+    ※外部側フォルダの内容（ファイル名、サイズ、更新日時）を記録ファイルに保持し、
+      更新日時が変わったフォルダのみ一覧を読み直して差分だけをコピー／削除する
+      （一覧を再利用するフォルダも、上書きされた画像を検出するため各ファイルの stat は行う）
+    ※記録ファイルのパスは外部側フォルダからの相対パス（マウント先が変わっても再コピーしない）
+    ※内部側フォルダの画像ファイル名は相対パスのハッシュ値＋元のファイル名（別フォルダの同名画像も同期する）
+    ※同期方式
+        copy:   内部側フォルダへコピー
+        link:   内部側フォルダへハードリンク（不可の場合はシンボリックリンク、それも不可の場合はコピー）
+        direct: 内部側フォルダを使用せず、外部側フォルダの画像を直接表示
     '''
-    def __init__(self, inside_folder:str):
+    ### 定数
+    MODE_COPY = "copy"
+    MODE_LINK = "link"
+    MODE_DIRECT = "direct"
+    __MAX_RETRIES = 3           # コピー失敗時の再試行回数（超えた場合は次回の同期で再度コピー）
+    __RETRY_DELAY = 5.0         # コピー失敗時の再試行間隔[s]（回数に比例して延ばす）
+    __NAME_HASH_LEN = 12        # 内部側画像ファイル名に付ける相対パスのハッシュ値の長さ
+
+    def __init__(self, inside_folder:str, mode:str=MODE_COPY, concurrency:int=1):
         '''コンストラクタ
-        Param: 内部側フォルダ
+        Param: 内部側フォルダ、同期方式、同時コピー数
         '''
         self._inside_folder = inside_folder
+        self.__mode = mode
+        self.__outside_images = {}      # 直近の同期時の外部側フォルダの画像
+        self.__outside_folders = []     # 直近の同期時の外部側フォルダ
+        self.__manifest_file = inside_folder + ".manifest.json"     # 同期記録ファイル
+        self.__manifest = self.__load_manifest()
+        # 並列コピー
+        self.__copier = None if self.is_direct() else ParallelCopier(concurrency)
+        self.__lock = threading.RLock()     # コピー完了コールバックが依頼元スレッドで呼ばれる場合があるため再入可能
+        self.__pending = set()          # コピー中の画像ファイル名
+        self.__copied_queue = queue.Queue()     # コピーが完了した画像ファイルパス
+        self.__copy_done = 0            # コピー完了数
+        self.__copy_failed = 0          # コピー失敗数
     
-    def synchronize(self, outside_folders:list):
+    @METRICS.timed("image_synchronize")
+    def synchronize(self, outside_folders:list, indexed_images:list=None) -> SyncSummary:
         '''外部側フォルダと内部側フォルダの画像を同期
-        Param: 外部側フォルダリスト
+        Param:  外部側フォルダリスト、索引から取得した (画像ファイルパス, サイズ, 更新日時) のリスト
+                （指定した場合はフォルダを走査せず、索引の画像を同期する）
+        Return: 同期結果
         ※外部Web APIを使用しない場合
         '''
-        # 外部側フォルダの画像を取得
-        outside_list = []
-        for outside_folder in outside_folders:
-            for dirpath, dirnames, images in os.walk(outside_folder):
-                for image in images:
-                    name = os.path.basename(image)
-                    outside_list.append(self.ImageName(outside_folder, name))
+        # 外部側フォルダの画像を取得（key: 内部側画像ファイル名, value: (コピー元パス, サイズ, 更新日時)）
+        scanned_dirs = [0]
+        roots = self.__manifest["roots"]
+        outside_images = {}
+        if indexed_images is None:
+            roots = {}
+            for outside_folder in outside_folders:
+                dirs = roots.setdefault(outside_folder, {})
+                self.__scan_outside_folder(outside_folders, outside_folder, "", dirs, outside_images, scanned_dirs)
+        else:
+            for src_path, size, mtime in indexed_images:
+                outside_images.setdefault(self.__inside_name(src_path, outside_folders), (src_path, size, mtime))
+        with self.__lock:
+            self.__outside_folders = list(outside_folders)
+            self.__outside_images = outside_images
+        if self.is_direct():
+            # 直接表示の場合、内部側フォルダは操作しない
+            with self.__lock:
+                self.__manifest["roots"] = roots
+                self.__save_manifest()
+            return SyncSummary(copied=[], removed=[], unchanged=len(outside_images), scanned_dirs=scanned_dirs[0])
         # 内部側フォルダの画像を取得
-        inside_list = []
-        for dirpath, dirnames, images in os.walk(self._inside_folder):
-            for image in images:
-                name = os.path.basename(image)
-                inside_list.append(self.ImageName(self._inside_folder, name))
-        # 両者を比較
-        for inside_img in inside_list:
-            for outside_img in outside_list:
-                if (inside_img.name == outside_img.name):
-                    inside_img.flag = True
-                    outside_img.flag = True
-        # 外部側フォルダにない画像を削除
-        for inside_img in inside_list:
-            if inside_img.flag == False:
-                os.remove(self._inside_folder + "/" + inside_img.name)
-        # 内部側フォルダにない画像をコピー
-        for outside_img in outside_list:
-            if outside_img.flag == False:
-                copy_image = os.path.basename(self.move_image(outside_img.folder + "/" + outside_img.name))
+        inside_names = set(os.listdir(self._inside_folder)) if os.path.isdir(self._inside_folder) else set()
+        copied_images = self.__manifest["copied"]
+        summary = SyncSummary(copied=[], removed=[], unchanged=0, scanned_dirs=scanned_dirs[0])
+        with self.__lock:
+            # 外部側フォルダにない画像を削除
+            for name in inside_names - outside_images.keys():
+                if name.endswith(".part"):
+                    continue    # コピー中の一時ファイル
+                os.remove(self._inside_folder + "/" + name)
+                copied_images.pop(name, None)
+                summary.removed.append(name)
+            # 内部側フォルダにない画像、またはコピー後に更新された画像をコピー
+            for name, (src_path, size, mtime) in outside_images.items():
+                if (name in self.__pending) or ((name in inside_names) and (copied_images.get(name) == self.__copy_record(src_path, size, mtime))):
+                    summary.unchanged += 1
+                    continue
+                self.__materialize(name, src_path, size, mtime)
+                summary.copied.append(name)
+            # 内部側フォルダから消えた画像の記録を破棄
+            for name in list(copied_images.keys()):
+                if name not in outside_images:
+                    del copied_images[name]
+            self.__manifest["roots"] = roots
+            self.__save_manifest()
+        return summary
                 
+    def is_direct(self) -> bool:
+        '''外部側フォルダの画像を直接表示するか
+        '''
+        return self.__mode == self.MODE_DIRECT
+
+    def image_paths(self) -> list:
+        '''直近の同期結果から表示画像のファイルパスを取得
+        '''
+        if self.is_direct():
+            return [src_path for src_path, size, mtime in self.__outside_images.values()]
+        with self.__lock:
+            # コピー完了済みの画像はここで渡すため、完了通知は破棄
+            # コピー中の画像はコピー完了後に take_copied_images() で渡す
+            self.take_copied_images()
+            return [self._inside_folder + "/" + name for name in self.__outside_images.keys() if name not in self.__pending]
+
+    def image_folders(self, outside_folders:list) -> list:
+        '''表示画像を格納しているフォルダを取得
+        Param: 外部側フォルダリスト
+        '''
+        return list(outside_folders) if self.is_direct() else [self._inside_folder]
+
+    def outside_images(self) -> list:
+        '''直近の同期結果の外部側フォルダの画像を取得（コピー中の画像を含む）
+        Return: (外部側画像ファイルパス, サイズ, 更新日時) のリスト
+        '''
+        return list(self.__outside_images.values())
+
+    def image_path(self, src_path:str) -> str:
+        '''外部側フォルダの画像の表示画像のファイルパスを取得（同期対象でない場合はNone）
+        '''
+        name = self.__inside_name(src_path, self.__outside_folders)
+        outside_image = self.__outside_images.get(name)
+        if (outside_image is None) or (outside_image[0] != src_path):
+            return None
+        return src_path if self.is_direct() else (self._inside_folder + "/" + name)
+
+    def source_path(self, image_path:str) -> str:
+        '''表示画像の外部側フォルダのファイルパスを取得（同期対象でない場合はNone）
+        '''
+        outside_image = self.__outside_images.get(self.__image_name(image_path))
+        return outside_image[0] if outside_image is not None else None
+
+    def source_record(self, image_path:str) -> tuple:
+        '''表示画像の外部側フォルダの画像の (ファイルパス, サイズ, 更新日時) を取得（同期対象でない場合はNone）
+        '''
+        with self.__lock:
+            if not self.owns_image(image_path):
+                return None
+            return self.__outside_images.get(self.__image_name(image_path))
+
+    def owns_image(self, image_path:str) -> bool:
+        '''直近の同期結果の表示画像か
+        '''
+        if self.is_direct():
+            return self.source_path(image_path) == image_path
+        name = os.path.basename(image_path)
+        return (name in self.__outside_images) and (image_path == self._inside_folder + "/" + name)
+
+    def __inside_name(self, src_path:str, outside_folders:list) -> str:
+        '''外部側フォルダの画像の内部側画像ファイル名を作成（外部側フォルダからの相対パスのハッシュ値＋ファイル名）
+        '''
+        rel_path = self.__relative_path(src_path, outside_folders)
+        return hashlib.sha1(rel_path.encode()).hexdigest()[:self.__NAME_HASH_LEN] + "_" + os.path.basename(src_path)
+
+    def __image_name(self, image_path:str) -> str:
+        '''表示画像の内部側画像ファイル名（直接表示の場合は外部側フォルダの画像から作成）
+        '''
+        if self.is_direct():
+            return self.__inside_name(image_path, self.__outside_folders)
+        return os.path.basename(image_path)
+
+    def take_copied_images(self) -> list:
+        '''前回の呼び出し以降にコピーが完了した画像のファイルパスを取得
+        '''
+        copied = []
+        while True:
+            try:
+                copied.append(self.__copied_queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(copied) > 0:
+            with self.__lock:
+                self.__save_manifest()
+        return copied
+
+    def is_copying(self) -> bool:
+        '''コピー中の画像があるか
+        '''
+        with self.__lock:
+            return len(self.__pending) > 0
+
+    def copy_progress(self) -> dict:
+        '''コピーの進捗を取得
+        '''
+        with self.__lock:
+            return {"pending": len(self.__pending), "done": self.__copy_done, "failed": self.__copy_failed}
+
+    def __materialize(self, name:str, src_path:str, size:int, mtime:int, attempt:int=0) -> str:
+        '''画像を内部側フォルダへ反映（リンクできない場合はコピーを依頼）
+        Param:  内部側画像ファイル名、コピー元の (ファイルパス, サイズ, 更新日時)、コピーの再試行回数
+        Return: リンク先ファイルパス（コピーを依頼した場合はNone）
+        ※呼び出し元で self.__lock を取得していること
+        '''
+        record = self.__copy_record(src_path, size, mtime)
+        if self.__mode == self.MODE_LINK:
+            dst_path = self.__link_image(src_path, self._inside_folder + "/" + name)
+            if dst_path is not None:
+                self.__manifest["copied"][name] = record
+                return dst_path
+        self.__pending.add(name)
+        source = (src_path, size, mtime)
+        self.__copier.submit(src_path, self._inside_folder + "/" + name,
+                             lambda dst_path, error: self.__on_copy_done(name, source, record, dst_path, error, attempt))
+        return None
+
+    def __copy_record(self, src_path:str, size:int, mtime:int) -> list:
+        '''コピー済み画像の記録（コピー元は外部側フォルダからの相対パス）
+        '''
+        return [self.__relative_path(src_path, self.__outside_folders), size, mtime]
+
+    def __relative_path(self, src_path:str, outside_folders:list) -> str:
+        '''外部側フォルダからの相対パスを取得（外部側フォルダ外の画像はそのまま）
+        '''
+        for outside_folder in outside_folders:
+            prefix = outside_folder.rstrip("/") + "/"
+            if src_path.startswith(prefix):
+                return src_path[len(prefix):]
+        return src_path
+
+    def __on_copy_done(self, name:str, source:tuple, record:list, dst_path:str, error:Exception, attempt:int):
+        '''コピー完了時の処理（コピースレッドから呼び出される）
+        ※コピー中に同期し直して対象外になった（または外部側の画像が更新された）画像は破棄し、
+          更新された画像はコピーし直す
+        '''
+        with self.__lock:
+            self.__pending.discard(name)
+            current = self.__outside_images.get(name)
+            if current != source:
+                self.__manifest["copied"].pop(name, None)
+                if error is None:
+                    self.__remove_file(dst_path)
+                if current is not None:
+                    self.__materialize(name, *current)
+                return
+            if error is None:
+                self.__manifest["copied"][name] = record
+                self.__copy_done += 1
+                self.__copied_queue.put(dst_path)
+                return
+            self.__manifest["copied"].pop(name, None)
+            self.__copy_failed += 1
+            if attempt < self.__MAX_RETRIES:
+                retry = threading.Timer(self.__RETRY_DELAY * (attempt + 1), self.__retry_copy,
+                                        args=(name, source, attempt + 1))
+                retry.daemon = True
+                retry.start()
+
+    def __retry_copy(self, name:str, source:tuple, attempt:int):
+        '''コピーに失敗した画像を再度コピー（同期し直して対象外になった場合は何もしない）
+        '''
+        with self.__lock:
+            if (self.__outside_images.get(name) != source) or (name in self.__pending):
+                return
+            self.__materialize(name, *source, attempt=attempt)
+
+    def __remove_file(self, path:str):
+        '''ファイルを削除（既にない場合は何もしない）
+        '''
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def add_image(self, src_path:str) -> str:
+        '''外部側フォルダに追加された画像を1枚だけ同期
+        Param:  追加された画像ファイルパス
+        Return: 表示画像のファイルパス（コピー中の場合はNone）
+        '''
+        stat = os.stat(src_path)
+        with self.__lock:
+            name = self.__inside_name(src_path, self.__outside_folders)
+            self.__outside_images[name] = (src_path, stat.st_size, stat.st_mtime_ns)
+            if self.is_direct():
+                return src_path
+            if name in self.__pending:
+                return None
+            # コピーの場合は完了後に take_copied_images() で渡す
+            return self.__materialize(name, src_path, stat.st_size, stat.st_mtime_ns)
+
+    def remove_image(self, src_path:str) -> str:
+        '''外部側フォルダから削除された画像を1枚だけ同期
+        Param:  削除された画像ファイルパス
+        Return: 表示画像のファイルパス（同期対象でない場合はNone）
+        '''
+        with self.__lock:
+            name = self.__inside_name(src_path, self.__outside_folders)
+            if (name not in self.__outside_images) or (self.__outside_images[name][0] != src_path):
+                return None
+            del self.__outside_images[name]
+            if self.is_direct():
+                return src_path
+            self.__manifest["copied"].pop(name, None)
+        dst_path = self._inside_folder + "/" + name
+        try:
+            os.remove(dst_path)
+        except FileNotFoundError:
+            pass
+        return dst_path
+
+    def remove_folder(self, src_folder:str) -> list:
+        '''外部側フォルダから削除（移動）されたサブフォルダ以下の画像を同期
+        Param:  削除されたフォルダパス
+        Return: 削除した表示画像のファイルパスのリスト
+        '''
+        prefix = src_folder.rstrip("/") + "/"
+        with self.__lock:
+            src_paths = [record[0] for record in self.__outside_images.values() if record[0].startswith(prefix)]
+        image_paths = []
+        for src_path in src_paths:
+            image_path = self.remove_image(src_path)
+            if image_path is not None:
+                image_paths.append(image_path)
+        return image_paths
+
     def move_image(self, src_path:str) -> str:
-        '''表示画像を内部側フォルダへコピー
+        '''表示画像を内部側フォルダへコピー（同期方式に応じてリンク）
         Param:  コピー元画像ファイルパス
         Return: コピー先画像ファイルパス
         '''
+        if self.__mode == self.MODE_LINK:
+            dst_path = self.__link_image(src_path, self._inside_folder + "/" + os.path.basename(src_path))
+            if dst_path is not None:
+                return dst_path
         return shutil.copy(src_path, self._inside_folder)
 
-    class ImageName:
-        def __init__(self, folder:str, name:str):
-            self.flag = False
-            self.folder = folder
-            self.name = name
+    def __link_image(self, src_path:str, dst_path:str) -> str:
+        '''表示画像を内部側フォルダへリンク
+        Param:  リンク元／リンク先ファイルパス
+        Return: リンク先ファイルパス（リンクできない場合はNone）
+        '''
+        if os.path.lexists(dst_path):
+            os.remove(dst_path)
+        try:
+            os.link(src_path, dst_path)
+            return dst_path
+        except OSError:
+            pass    # 別ファイルシステムなどでハードリンク不可
+        try:
+            os.symlink(os.path.abspath(src_path), dst_path)
+            return dst_path
+        except OSError:
+            return None     # シンボリックリンク非対応のファイルシステム
+
+    def __scan_outside_folder(self, outside_folders:list, root:str, rel_dir:str, dirs:dict, outside_images:dict,
+                              scanned_dirs:list):
+        '''外部側フォルダ（サブフォルダを含む）の画像を取得
+        Param: 外部側フォルダリスト、外部側フォルダ、外部側フォルダからの相対パス（直下は空文字）、同期記録（key: 相対パス）
+        ※フォルダの更新日時が記録と同じ場合、フォルダの一覧は読み直さず記録を再利用
+          （上書きではフォルダの更新日時が変わらないため、ファイル毎のサイズ、更新日時は取り直す）
+        '''
+        folder = root if rel_dir == "" else root + "/" + rel_dir
+        try:
+            dir_mtime = os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            return
+        record = self.__manifest["roots"].get(root, {}).get(rel_dir)
+        if (record is None) or (record["mtime"] != dir_mtime):
+            record = {"mtime": dir_mtime, "files": {}, "subdirs": []}
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        record["subdirs"].append(entry.name if rel_dir == "" else rel_dir + "/" + entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        record["files"][entry.name] = [stat.st_size, stat.st_mtime_ns]
+            scanned_dirs[0] += 1
+        else:
+            files = {}
+            for name in record["files"]:
+                try:
+                    stat = os.stat(folder + "/" + name)
+                except FileNotFoundError:
+                    continue
+                files[name] = [stat.st_size, stat.st_mtime_ns]
+            record = {"mtime": dir_mtime, "files": files, "subdirs": record["subdirs"]}
+        dirs[rel_dir] = record
+        for file_name, (size, mtime) in record["files"].items():
+            src_path = folder + "/" + file_name
+            # 入れ子の外部側フォルダで同じ画像を重複して同期しない
+            outside_images.setdefault(self.__inside_name(src_path, outside_folders), (src_path, size, mtime))
+        for subdir in record["subdirs"]:
+            self.__scan_outside_folder(outside_folders, root, subdir, dirs, outside_images, scanned_dirs)
+
+    def __load_manifest(self) -> dict:
+        '''同期記録を読み込み
+        '''
+        try:
+            with open(self.__manifest_file, 'r') as f:
+                manifest = json.load(f)
+            if ("roots" in manifest) and ("copied" in manifest):
+                return manifest
+        except (FileNotFoundError, ValueError):
+            pass
+        return {"roots": {}, "copied": {}}
+
+    def __save_manifest(self):
+        '''同期記録を保存
+        '''
+        try:
+            with open(self.__manifest_file + ".tmp", 'w') as f:
+                json.dump(self.__manifest, f)
+            os.replace(self.__manifest_file + ".tmp", self.__manifest_file)
+        except OSError:
+            pass
             
 
 class SoundSpeaker:
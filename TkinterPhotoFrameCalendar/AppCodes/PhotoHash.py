@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## 知覚ハッシュ計算用ライブラリ
+from PIL import Image
+import numpy as np
+
+## 並列計算・キャッシュ用ライブラリ
+from concurrent.futures import ProcessPoolExecutor
+import sqlite3
+
+## ログ出力用ライブラリ
+import logging
+
+
+### 定数
+HASH_SIZE = 8               # dHash の縦横サイズ（8x8 = 64bit）
+BATCH_SIZE = 64             # ワーカープロセスへ1回に渡す画像数
+BLOCK_SIZE = 256            # 距離行列を一度に計算する行数
+POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)    # 8bit毎の立っているビット数
+LOGGER = logging.getLogger(__name__)
+
+
+def compute_dhashes(image_paths:list) -> list:
+    '''複数画像の dHash をまとめて計算（ワーカープロセスで実行）
+    Param:  画像ファイルパスのリスト
+    Return: 64bit の dHash のリスト（読み込めない画像はNone）
+    ※縮小読み込みしたグレースケールのサムネイルを積み重ね、隣接画素の大小比較を一括で行う
+    '''
+    thumbs = np.zeros((len(image_paths), HASH_SIZE, HASH_SIZE + 1), dtype=np.int16)
+    loaded = np.zeros(len(image_paths), dtype=bool)
+    for i, image_path in enumerate(image_paths):
+        try:
+            with Image.open(image_path) as img:
+                img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))     # JPEGの場合はDCT段階で縮小
+                thumb = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+            thumbs[i] = np.asarray(thumb, dtype=np.int16)
+            loaded[i] = True
+        except (OSError, ValueError):
+            continue
+    bits = (thumbs[:, :, 1:] > thumbs[:, :, :-1]).reshape(len(image_paths), -1)
+    hashes = np.packbits(bits, axis=1).view(">u8").ravel()
+    return [int(hashes[i]) if loaded[i] else None for i in range(len(image_paths))]
+
+
+def find_duplicate_clusters(hashes:np.ndarray, max_distance:int) -> list:
+    '''ハミング距離が指定値以下の画像をまとめる
+    Param:  dHash の配列（uint64）、類似とみなすハミング距離
+    Return: 2枚以上の類似画像のインデックスのリストのリスト
+    ※64bitを (距離+1) 個の帯に分けると、距離以下の組は少なくとも1つの帯が一致するため、
+      帯が一致する組のみ距離を計算する（全組の比較を行わない）
+    '''
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    max_distance = min(max(max_distance, 0), 31)
+    parent = list(range(len(hashes)))
+
+    def find(i:int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bands = max_distance + 1
+    shift = 0
+    for band in range(bands):
+        width = (64 - shift) // (bands - band)
+        keys = (hashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        shift += width
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            if (end - start) < 2:
+                continue
+            group = order[start:end]
+            group_hashes = hashes[group]
+            for row in range(0, len(group), BLOCK_SIZE):
+                # 帯が一致した画像同士の距離を行列でまとめて計算
+                block = group_hashes[row:row + BLOCK_SIZE, None] ^ group_hashes[None, :]
+                distances = popcount64(block.ravel()).reshape(block.shape)
+                rows, cols = np.nonzero(distances <= max_distance)
+                for i, j in zip(group[rows + row], group[cols]):
+                    root_a, root_b = find(int(i)), find(int(j))
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+    clusters = {}
+    for i in range(len(hashes)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def popcount64(values:np.ndarray) -> np.ndarray:
+    '''64bit値毎の立っているビット数
+    '''
+    return POPCOUNT8[np.ascontiguousarray(values).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class DuplicateFilter:
+    ''' 類似画像の重複表示抑制クラス
+    ※外部側フォルダの画像の dHash をワーカープロセスで計算してSQLiteにキャッシュし、
+      類似画像の中からファイルサイズが最大の1枚だけを表示対象に残す
+    ※計算はバックグラウンドで行い、判定結果が更新されるたびに generation を進める
+    '''
+    ### 定数
+    __SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            dhash INTEGER
+        );
+    '''
+
+    def __init__(self, db_path:str, max_distance:int, workers:int):
+        '''コンストラクタ
+        Param: キャッシュファイルパス、類似とみなすハミング距離、ワーカープロセス数（0の場合はCPUコア数）
+        '''
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.__conn.executescript(self.__SCHEMA)
+        self.__max_distance = max_distance
+        self.__workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.__duplicates = frozenset()     # 表示しない画像の外部側ファイルパス
+        self.generation = 0                 # 判定結果の更新回数
+        self.__request = None               # 未処理の依頼（最新のみ）
+        self.__request_event = threading.Event()
+        self.__is_running = True
+        self.__filter_thread = threading.Thread(target=self.__filter_worker, daemon=True)
+        self.__filter_thread.start()
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.stop_thread()
+        self.__conn.close()
+
+    def request(self, images:list):
+        '''重複判定をバックグラウンドで依頼（処理中の依頼より新しいもののみ保持）
+        Param: (外部側画像ファイルパス, サイズ, 更新日時) のリスト
+        '''
+        with self.__lock:
+            self.__request = images
+        self.__request_event.set()
+
+    def is_duplicate(self, src_path:str) -> bool:
+        '''表示しない画像か
+        '''
+        return src_path in self.__duplicates
+
+    def duplicates(self) -> frozenset:
+        '''表示しない画像の外部側ファイルパスを取得（直近の判定結果）
+        '''
+        return self.__duplicates
+
+    def update(self, images:list) -> frozenset:
+        '''重複判定を行い、表示しない画像を更新
+        Param:  (外部側画像ファイルパス, サイズ, 更新日時) のリスト
+        Return: 表示しない画像の外部側ファイルパス
+        '''
+        hashes = self.__load_hashes(images)
+        hashed = [(src_path, size) for src_path, size, mtime in images if hashes.get(src_path) is not None]
+        values = np.array([hashes[src_path] for src_path, size in hashed], dtype=np.uint64)
+        duplicates = set()
+        for members in find_duplicate_clusters(values, self.__max_distance):
+            # ファイルサイズが最大（同じ場合はパス順）の画像を残す
+            members.sort(key=lambda i: (-hashed[i][1], hashed[i][0]))
+            duplicates.update(hashed[i][0] for i in members[1:])
+        self.__duplicates = frozenset(duplicates)
+        self.generation += 1
+        return self.__duplicates
+
+    def stop_thread(self):
+        '''スレッド停止
+        '''
+        self.__is_running = False
+        self.__request_event.set()
+
+    def __filter_worker(self):
+        '''重複判定処理
+        '''
+        while self.__is_running:
+            self.__request_event.wait()
+            self.__request_event.clear()
+            with self.__lock:
+                images = self.__request
+                self.__request = None
+            if (images is None) or (not self.__is_running):
+                continue
+            try:
+                self.update(images)
+            except Exception:
+                # 壊れた画像やキャッシュの異常で判定スレッドを止めない（次回の依頼で再試行）
+                LOGGER.exception("failed to update duplicate photos")
+
+    def __load_hashes(self, images:list) -> dict:
+        '''dHash をキャッシュから取得し、未計算またはサイズ／更新日時が変わった画像のみ計算
+        Return: key: 外部側画像ファイルパス, value: dHash（読み込めない画像はNone）
+        '''
+        cached = {}
+        for path, size, mtime, dhash in self.__conn.execute("SELECT path, size, mtime, dhash FROM hashes"):
+            cached[path] = (size, mtime, dhash)
+        self.__prune(cached, images)
+        hashes = {}
+        missing = []
+        for src_path, size, mtime in images:
+            record = cached.get(src_path)
+            if (record is not None) and (record[0] == size) and (record[1] == mtime):
+                hashes[src_path] = None if record[2] is None else (record[2] & 0xFFFFFFFFFFFFFFFF)
+            else:
+                missing.append((src_path, size, mtime))
+        if len(missing) < 1:
+            return hashes
+        batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+        with ProcessPoolExecutor(max_workers=self.__workers,
+                                 mp_context=multiprocessing.get_context(PROCESS_START_METHOD)) as executor:
+            results = executor.map(compute_dhashes, [[src_path for src_path, size, mtime in batch] for batch in batches])
+            for batch, batch_hashes in zip(batches, results):
+                rows = []
+                for (src_path, size, mtime), dhash in zip(batch, batch_hashes):
+                    hashes[src_path] = dhash
+                    # SQLiteのINTEGERは符号付き64bitのため、符号付きに変換して保存
+                    rows.append((src_path, size, mtime, None if dhash is None else dhash - ((dhash >> 63) << 64)))
+                self.__conn.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)", rows)
+                self.__conn.commit()
+        return hashes
+
+    def __prune(self, cached:dict, images:list):
+        '''削除された画像の記録をキャッシュから削除
+        ※他の日付のフォルダの画像は残すため、今回の対象外かつファイルが存在しない画像のみ削除
+        '''
+        current = set(src_path for src_path, size, mtime in images)
+        removed = [(path,) for path in cached.keys() if (path not in current) and (not os.path.exists(path))]
+        if len(removed) < 1:
+            return
+        self.__conn.executemany("DELETE FROM hashes WHERE path = ?", removed)
+        self.__conn.commit()
+        for (path,) in removed:
+            del cached[path]
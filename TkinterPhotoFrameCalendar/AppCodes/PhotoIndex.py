@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## 画像メタデータ読み込み用ライブラリ
+from PIL import Image
+
+## 索引データベース用ライブラリ
+import sqlite3
+
+
+@dataclass
+class IndexSummary:
+    added: int          # 追加した画像数
+    updated: int        # 更新した画像数
+    removed: int        # 削除した画像数
+    unchanged: int      # 変更のなかった画像数
+
+
+class PhotoIndex:
+    ''' 画像メタデータ索引クラス
+    ※外部画像フォルダ以下の画像のサイズ・更新日時・画素数・EXIF（向き、撮影日時）・内容ハッシュを
+      SQLiteに保持し、再走査時はサイズか更新日時が変わった画像のみ読み直す
+    '''
+    ### 定数
+    __IMAGE_PATTERN = re.compile(r'.+\.(jpe?g|png|bmp|gif|webp|tiff?)$', re.IGNORECASE)
+    __EXIF_ORIENTATION = 0x0112         # 向き
+    __EXIF_DATETIME = 0x0132            # 更新日時
+    __EXIF_IFD = 0x8769                 # Exif IFD
+    __EXIF_DATETIME_ORIGINAL = 0x9003   # 撮影日時
+    __HASH_CHUNK = 1024 * 1024
+    __WRITE_CHUNK = 500                 # 1回のロック中に書き込む行数（表示側の検索を長く待たせない）
+    __SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS photos (
+            path TEXT PRIMARY KEY,
+            folder TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            orientation INTEGER,
+            taken TEXT,
+            taken_month INTEGER,
+            taken_day INTEGER,
+            content_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS photos_folder ON photos (folder);
+        CREATE INDEX IF NOT EXISTS photos_taken_md ON photos (taken_month, taken_day);
+    '''
+
+    def __init__(self, db_path:str):
+        '''コンストラクタ
+        Param: 索引データベースファイルパス
+        '''
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.__conn.executescript(self.__SCHEMA)
+        self.is_ready = False       # 1回以上走査済みか
+        self.__scan_thread = None
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        self.__conn.close()
+
+    def start_rescan(self, root_folder:str):
+        '''外部画像フォルダの再走査をバックグラウンドで開始（走査中の場合は何もしない）
+        '''
+        if (self.__scan_thread is not None) and self.__scan_thread.is_alive():
+            return
+        self.__scan_thread = threading.Thread(target=self.rescan, args=(root_folder,), daemon=True)
+        self.__scan_thread.start()
+
+    def rescan(self, root_folder:str) -> IndexSummary:
+        '''外部画像フォルダを走査し、索引を更新
+        Param:  外部画像フォルダ
+        Return: 更新結果
+        '''
+        root_folder = root_folder.rstrip("/")
+        with self.__lock:
+            known = {row[0]: (row[1], row[2]) for row in self.__conn.execute(
+                "SELECT path, size, mtime FROM photos WHERE path >= ? AND path < ?", self.__path_range(root_folder))}
+        summary = IndexSummary(added=0, updated=0, removed=0, unchanged=0)
+        rows = []
+        for path, folder, stat in self.__scan_images(root_folder):
+            record = known.pop(path, None)
+            if record == (stat.st_size, stat.st_mtime_ns):
+                summary.unchanged += 1
+                continue
+            try:
+                rows.append((path, folder, stat.st_size, stat.st_mtime_ns) + self.__read_metadata(path))
+            except (OSError, ValueError):
+                continue    # 読み込めない画像は索引に含めない
+            if record is None:
+                summary.added += 1
+            else:
+                summary.updated += 1
+            if len(rows) >= self.__WRITE_CHUNK:
+                self.__write_rows("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                rows = []
+        self.__write_rows("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.__write_rows("DELETE FROM photos WHERE path = ?", [(path,) for path in known.keys()])
+        summary.removed = len(known)
+        self.is_ready = True
+        return summary
+
+    def query_on_this_day(self, month:int, day:int) -> list:
+        '''指定月日（年は問わない）に撮影された画像を取得
+        Return: (画像ファイルパス, サイズ, 更新日時) のリスト
+        '''
+        with self.__lock:
+            return self.__conn.execute(
+                "SELECT path, size, mtime FROM photos WHERE taken_month = ? AND taken_day = ?", (month, day)).fetchall()
+
+    def query_folders(self, folders:list) -> list:
+        '''指定フォルダ以下（サブフォルダを含む）の画像を取得
+        Return: (画像ファイルパス, サイズ, 更新日時) のリスト
+        '''
+        images = []
+        with self.__lock:
+            for folder in folders:
+                images.extend(self.__conn.execute(
+                    "SELECT path, size, mtime FROM photos WHERE path >= ? AND path < ?",
+                    self.__path_range(folder.rstrip("/"))).fetchall())
+        return images
+
+    def __path_range(self, folder:str) -> tuple:
+        '''フォルダ以下のパスの範囲 [フォルダ + "/", フォルダ + "0") を生成
+        ※"0" は "/" の次の文字のため、主キーの索引で範囲検索できる（LIKE は大文字小文字を区別せず索引も使えない）
+        '''
+        return (folder + "/", folder + "0")
+
+    def __write_rows(self, sql:str, rows:list):
+        '''一定行数ずつロックを取り直して書き込み
+        '''
+        for start in range(0, len(rows), self.__WRITE_CHUNK):
+            with self.__lock:
+                self.__conn.executemany(sql, rows[start:start + self.__WRITE_CHUNK])
+                self.__conn.commit()
+
+    def __scan_images(self, folder:str):
+        '''フォルダ以下の画像を走査
+        Return: (画像ファイルパス, フォルダ, stat) のジェネレータ
+        '''
+        try:
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir():
+                yield from self.__scan_images(entry.path)
+            elif entry.is_file() and self.__IMAGE_PATTERN.match(entry.name):
+                yield (folder + "/" + entry.name, folder, entry.stat())
+
+    def __read_metadata(self, path:str) -> tuple:
+        '''画像のメタデータを読み込み（画素の展開は行わない）
+        Return: (幅, 高さ, 向き, 撮影日時, 撮影月, 撮影日, 内容ハッシュ)
+        '''
+        with Image.open(path) as img:
+            width, height = img.size
+            exif = img.getexif()
+            orientation = exif.get(self.__EXIF_ORIENTATION, 1)
+            taken = exif.get_ifd(self.__EXIF_IFD).get(self.__EXIF_DATETIME_ORIGINAL) or exif.get(self.__EXIF_DATETIME)
+        taken_date = None
+        if taken:
+            try:
+                taken_date = dt.datetime.strptime(str(taken).strip("\0 "), "%Y:%m:%d %H:%M:%S")
+            except ValueError:
+                taken_date = None   # 日時の形式が不正
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.__HASH_CHUNK), b''):
+                sha.update(chunk)
+        if taken_date is None:
+            return (width, height, orientation, None, None, None, sha.hexdigest())
+        return (width, height, orientation, taken_date.isoformat(), taken_date.month, taken_date.day, sha.hexdigest())
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## 表示順抽出用ライブラリ
+from concurrent.futures import ThreadPoolExecutor, wait
+import struct
+import tempfile
+
+## ログ出力用ライブラリ
+import logging
+
+
+### 定数
+LOGGER = logging.getLogger(__name__)
+
+
+class ShufflePlaylist:
+    ''' スライドショー表示順管理クラス
+    ※1周ごとに表示順をその場でシャッフルし（ディスクの再走査は行わない）、
+      周の切り替わりを含めて同じ画像が連続しないようにする
+    ※重み（整数）の分だけ1周の中で同じ画像を表示する
+    '''
+    def __init__(self):
+        '''コンストラクタ
+        '''
+        self.__order = []       # 表示順（重みの分だけ同じ画像を含む）
+        self.__weights = {}     # key: 画像ファイルパス, value: 重み
+        self.__position = 0     # 次に表示する位置
+        self.__last = None      # 直前に表示した画像
+        self.cycles = 0         # 表示し終えた周回数
+
+    def __len__(self) -> int:
+        '''登録画像数
+        '''
+        return len(self.__weights)
+
+    def __contains__(self, image_path:str) -> bool:
+        return image_path in self.__weights
+
+    def reset(self, entries:list):
+        '''表示画像を入れ替えてシャッフル
+        Param: (画像ファイルパス, 重み) のリスト
+        ※直前に表示した画像は保持し、入れ替え直後に同じ画像が連続しないようにする
+        '''
+        self.__weights = {}
+        for image_path, weight in entries:
+            self.__weights[image_path] = max(1, int(weight))
+        self.__order = [image_path for image_path, weight in self.__weights.items() for i in range(weight)]
+        self.__reshuffle()
+
+    def next(self) -> str:
+        '''次に表示する画像を取得
+        Return: 画像ファイルパス（画像が登録されていない場合はNone）
+        '''
+        if len(self.__order) < 1:
+            return None
+        if self.__position >= len(self.__order):
+            self.__reshuffle()
+            self.cycles += 1
+        self.__avoid_repeat(self.__position)
+        image_path = self.__order[self.__position]
+        self.__position += 1
+        self.__last = image_path
+        return image_path
+
+    def upcoming(self, count:int) -> list:
+        '''次以降に表示する予定の画像を取得（表示位置は進めない）
+        '''
+        return self.__order[self.__position:self.__position + count]
+
+    def is_cycle_end(self) -> bool:
+        '''1周分を表示し終えたか
+        '''
+        return self.__position >= len(self.__order)
+
+    def last_image(self) -> str:
+        '''直前に表示した画像（まだ表示していない場合はNone）
+        '''
+        return self.__last
+
+    def continue_from(self, previous):
+        '''それまで表示していた表示順から、直前に表示した画像を引き継ぐ
+        Param: それまで表示していた表示順
+        ※同期し直して作り直した表示順へ切り替えた直後も、同じ画像が連続しないようにする
+        '''
+        self.__last = previous.last_image()
+
+    def add(self, image_path:str, weight:int=1):
+        '''画像を未表示の範囲のランダムな位置へ追加
+        '''
+        if image_path in self.__weights:
+            return
+        weight = max(1, int(weight))
+        self.__weights[image_path] = weight
+        for i in range(weight):
+            # 末尾に追加し、未表示の範囲のランダムな位置と入れ替え
+            self.__order.append(image_path)
+            swap = random.randint(self.__position, len(self.__order) - 1)
+            self.__order[swap], self.__order[-1] = self.__order[-1], self.__order[swap]
+
+    def remove(self, image_path:str):
+        '''画像を削除
+        '''
+        if self.__weights.pop(image_path, None) is None:
+            return
+        played = sum(1 for path in self.__order[:self.__position] if path == image_path)
+        self.__order = [path for path in self.__order if path != image_path]
+        self.__position -= played
+
+    def remove_all(self, image_paths:set):
+        '''複数の画像をまとめて削除
+        '''
+        image_paths = {image_path for image_path in image_paths if image_path in self.__weights}
+        if len(image_paths) < 1:
+            return
+        for image_path in image_paths:
+            del self.__weights[image_path]
+        played = sum(1 for path in self.__order[:self.__position] if path in image_paths)
+        self.__order = [path for path in self.__order if path not in image_paths]
+        self.__position -= played
+
+    def __reshuffle(self):
+        '''表示順をその場でシャッフルして先頭に戻る
+        '''
+        random.shuffle(self.__order)
+        self.__position = 0
+
+    def __avoid_repeat(self, position:int):
+        '''指定位置の画像が直前の画像と同じ場合、それ以降の別の画像と入れ替え
+        '''
+        if (self.__order[position] != self.__last) or (len(self.__weights) < 2):
+            return
+        remain = len(self.__order) - position - 1
+        # 乱択で数回試し、見つからない場合のみ順に探す
+        for i in range(min(remain, 8)):
+            swap = random.randint(position + 1, len(self.__order) - 1)
+            if self.__order[swap] != self.__last:
+                self.__order[position], self.__order[swap] = self.__order[swap], self.__order[position]
+                return
+        for swap in range(position + 1, len(self.__order)):
+            if self.__order[swap] != self.__last:
+                self.__order[position], self.__order[swap] = self.__order[swap], self.__order[position]
+                return
+
+
+class StreamingPlaylist:
+    ''' 大量画像向けスライドショー表示順管理クラス
+    ※フォルダを os.scandir で1周につき1回だけ走査し、画像ファイルパスを一時ファイル（バケット）へランダムに振り分ける
+    ※表示順はバケットを1つずつ読み出してシャッフルしたもの（一定数より多いバケットは読み出す前にさらに振り分ける）
+      メモリには一定数の画像とバケットの一覧のみ保持し、画像数が増えても増えない
+    ※走査・読み出しはバックグラウンドで1つずつ行い、取り出した分の半分を表示した時点で次の一定数を準備する
+      （準備が完了するまでは取り出し済みの表示順で表示し、表示側では待たない）
+    ※画像毎に重みの数だけ振り分けるため、1周の中で同じ画像を重みの回数より多く表示しない
+    ※表示側スレッドと同期スレッドの両方から呼び出すため、公開メソッドはロックを取得して処理する
+    '''
+    ### 定数
+    __RECORD_HEADER = struct.Struct("<H")   # 一時ファイルの画像ファイルパスの長さ
+    __MAX_BUCKETS = 256                     # 1回に振り分けるバケット数の上限（同時に開く一時ファイル数）
+
+    def __init__(self, window:int, pattern):
+        '''コンストラクタ
+        Param: 一度に保持する画像数、表示対象の画像ファイル名パターン
+        '''
+        self.__window_size = max(1, window)
+        self.__pattern = pattern
+        self.__folders = None       # 走査するフォルダ（未設定の場合はNone）
+        self.__weight_of = None     # 画像ファイルパスから重みを求める関数
+        self.__resolver = None      # 画像ファイルパスから表示する画像を求める関数（表示しない場合はNone）
+        self.__work_dir = tempfile.TemporaryDirectory(prefix="photoframe-playlist-")
+        self.__preparer = ThreadPoolExecutor(max_workers=1)    # 走査・読み出し（依頼順に1つずつ実行）
+        self.__lock = threading.Lock()
+        self.__cycle = None         # 表示中の周回 (一時フォルダ, 未読み出しの (バケット, 画像数) のタプル, 画像数)
+        self.__window = []          # 取り出した表示順
+        self.__position = 0         # 次に表示する位置
+        self.__last = None          # 直前に表示した画像
+        self.__count = 0            # 直近の走査での画像数
+        self.__prefill = None       # 次の一定数の準備（Future）
+        self.__restart = False      # フォルダを変更したため、準備が完了した時点で最初から表示し直すか
+        self.cycles = 0             # 表示し終えた周回数
+
+    def __len__(self) -> int:
+        '''直近の走査での画像数
+        '''
+        with self.__lock:
+            return self.__count
+
+    def __contains__(self, image_path:str) -> bool:
+        with self.__lock:
+            return image_path in self.__window
+
+    def set_source(self, folders:list, weight_of=None, resolver=None):
+        '''走査するフォルダを設定（フォルダが変わった場合は最初から表示し直す）
+        Param: フォルダリスト（サブフォルダを含む）、画像毎の重みを求める関数（省略時は全て1）、
+               表示する画像を求める関数（省略時は走査した画像をそのまま表示）
+        ※フォルダが同じ場合は準備済みの周回を続け、以降の読み出しから重み・表示する画像を求める関数を切り替える
+        ※走査はバックグラウンドで行い、最初の一定数の準備が完了するまでは現在の表示順で表示する
+        '''
+        with self.__lock:
+            self.__weight_of = weight_of if weight_of is not None else (lambda image_path: 1)
+            self.__resolver = resolver if resolver is not None else (lambda image_path: image_path)
+            if list(folders) == self.__folders:
+                return
+            self.__folders = list(folders)
+            # 準備中の一定数は変更前のフォルダのため破棄（一時ファイルは準備の完了後に削除）
+            self.__prefill = None
+            self.__cycle = None
+            self.__restart = True
+            self.__preparer.submit(self.__clear_work_dir)
+            self.__start_prefill()
+
+    def wait_ready(self, timeout:float=None) -> bool:
+        '''次の一定数の準備完了を待つ（表示側スレッドからは呼び出さない）
+        Param:  最大待ち時間[s]（省略時は完了まで待つ）
+        Return: 表示できる画像があるか
+        '''
+        with self.__lock:
+            prefill = self.__prefill
+        if prefill is not None:
+            wait([prefill], timeout)
+        with self.__lock:
+            self.__take_prefill()
+            return self.__position < len(self.__window)
+
+    def next(self) -> str:
+        '''次に表示する画像を取得
+        Return: 画像ファイルパス（画像がない、または次の一定数を準備中の場合はNone）
+        '''
+        with self.__lock:
+            self.__take_prefill()
+            if self.__position >= len(self.__window):
+                self.__start_prefill()
+                return None     # 準備が完了した後の周期で表示
+            self.__avoid_repeat(self.__position)
+            image_path = self.__window[self.__position]
+            self.__position += 1
+            self.__last = image_path
+            if (self.__position * 2 >= len(self.__window)):
+                self.__start_prefill()
+            return image_path
+
+    def upcoming(self, count:int) -> list:
+        '''次以降に表示する予定の画像を取得（取り出し済みの範囲のみ。表示位置は進めない）
+        '''
+        with self.__lock:
+            self.__take_prefill()
+            return self.__window[self.__position:self.__position + count]
+
+    def is_cycle_end(self) -> bool:
+        '''1周分を表示し終えたか
+        '''
+        with self.__lock:
+            return ((self.__cycle is not None) and (len(self.__cycle[1]) < 1) and (not self.__restart)
+                    and (self.__position >= len(self.__window)))
+
+    def last_image(self) -> str:
+        '''直前に表示した画像（まだ表示していない場合はNone）
+        '''
+        with self.__lock:
+            return self.__last
+
+    def continue_from(self, previous):
+        '''それまで表示していた表示順から、直前に表示した画像を引き継ぐ
+        Param: それまで表示していた表示順
+        ※同期し直して作り直した表示順へ切り替えた直後も、同じ画像が連続しないようにする
+        '''
+        last = previous.last_image()
+        with self.__lock:
+            self.__last = last
+
+    def add(self, image_path:str, weight:int=1):
+        '''画像を取り出し済みの未表示の範囲のランダムな位置へ追加
+        ※同じ周回の以降の取り出しで再度表示される場合がある
+        '''
+        with self.__lock:
+            if image_path in self.__window[self.__position:]:
+                return
+            for i in range(max(1, int(weight))):
+                self.__window.append(image_path)
+                swap = random.randint(self.__position, len(self.__window) - 1)
+                self.__window[swap], self.__window[-1] = self.__window[-1], self.__window[swap]
+
+    def remove(self, image_path:str):
+        '''画像を削除
+        '''
+        self.remove_all({image_path})
+
+    def remove_all(self, image_paths:set):
+        '''複数の画像をまとめて削除
+        ※削除した画像は取り出し済みの範囲から除くのみ（以降の取り出しでは表示する画像を求める関数で除く）
+        '''
+        with self.__lock:
+            played = sum(1 for path in self.__window[:self.__position] if path in image_paths)
+            self.__window = [path for path in self.__window if path not in image_paths]
+            self.__position -= played
+
+    def __start_prefill(self):
+        '''次の一定数の準備をバックグラウンドで開始（準備中の場合は何もしない）
+        '''
+        if (self.__prefill is not None) or (self.__folders is None):
+            return
+        self.__prefill = self.__preparer.submit(self.__prefill_worker, self.__cycle, self.__folders,
+                                                self.__weight_of, self.__resolver, self.__count)
+
+    def __take_prefill(self):
+        '''準備が完了した一定数へ表示を切り替え
+        ※準備中、または取り出し済みの表示順が残っている場合（フォルダの変更直後を除く）は何もしない
+        '''
+        if (self.__prefill is None) or (not self.__prefill.done()):
+            return
+        if (not self.__restart) and (self.__position < len(self.__window)):
+            return
+        prepared = self.__prefill.result()
+        self.__prefill = None
+        if prepared is None:
+            if self.__cycle is not None:
+                # 読み出しに失敗した周回は打ち切り、次の準備で走査し直す
+                self.__cycle = (self.__cycle[0], (), self.__cycle[2])
+            return
+        cycle, window, count = prepared
+        if (self.__cycle is not None) and (cycle[0] != self.__cycle[0]):
+            self.cycles += 1
+        self.__cycle = cycle
+        self.__count = count
+        self.__window, self.__position = window, 0
+        self.__restart = False
+
+    def __prefill_worker(self, cycle:tuple, folders:list, weight_of, resolver, expected:int) -> tuple:
+        '''次の一定数の準備処理（準備スレッドで実行）
+        Return: (周回, 表示順, 画像数)（失敗した場合はNone）
+        '''
+        try:
+            return self.__prepare(cycle, folders, weight_of, resolver, expected)
+        except Exception:
+            LOGGER.exception("playlist prefill failed")
+            return None
+
+    def __prepare(self, cycle:tuple, folders:list, weight_of, resolver, expected:int) -> tuple:
+        '''次の一定数を準備（周回の全バケットを読み出し終えた場合は次の周回を走査）
+        Param:  周回、フォルダリスト、重み・表示する画像を求める関数、前回の走査での画像数
+        Return: (周回, 表示順, 画像数)
+        '''
+        if (cycle is None) or (len(cycle[1]) < 1):
+            if cycle is not None:
+                shutil.rmtree(cycle[0], ignore_errors=True)
+            cycle = self.__scan_cycle(folders, weight_of, expected)
+        cycle_dir, buckets, count = cycle
+        buckets = list(buckets)
+        window = []
+        while (len(window) < 1) and (len(buckets) > 0):
+            bucket_path, records = buckets.pop(0)
+            if records > self.__window_size:
+                # 一定数より多いバケットは、さらに振り分けてから読み出す
+                buckets[0:0] = self.__distribute(cycle_dir, self.__bucket_count(records), self.__read_bucket(bucket_path))
+                os.remove(bucket_path)
+                continue
+            image_paths = list(self.__read_bucket(bucket_path))
+            os.remove(bucket_path)
+            random.shuffle(image_paths)
+            window = [show_image for show_image in map(resolver, image_paths) if show_image is not None]
+        return ((cycle_dir, tuple(buckets), count), window, count)
+
+    def __scan_cycle(self, folders:list, weight_of, expected:int) -> tuple:
+        '''フォルダを1回走査し、新しい周回の画像をバケットへ振り分ける
+        Param:  フォルダリスト、重みを求める関数、前回の走査での画像数（バケット数の見積もりに使用）
+        Return: (一時フォルダ, (バケット, 画像数) のタプル, 画像数)
+        '''
+        cycle_dir = tempfile.mkdtemp(dir=self.__work_dir.name)
+        count = [0]
+        buckets = self.__distribute(cycle_dir, self.__bucket_count(expected),
+                                    self.__weighted_images(folders, weight_of, count))
+        return (cycle_dir, tuple(buckets), count[0])
+
+    def __weighted_images(self, folders:list, weight_of, count:list):
+        '''フォルダ以下の画像を重みの数だけ繰り返して走査
+        Param:  フォルダリスト、重みを求める関数、画像数（走査した画像数を count[0] に加算）
+        Return: 画像ファイルパスのジェネレータ
+        '''
+        for image_path in self.__scan_images(folders):
+            count[0] += 1
+            for copy in range(max(1, int(weight_of(image_path)))):
+                yield image_path
+
+    def __bucket_count(self, records:int) -> int:
+        '''バケットあたりの画像数が一定数以下となるバケット数
+        '''
+        return min(self.__MAX_BUCKETS, max(1, -(-records // self.__window_size)))
+
+    def __distribute(self, cycle_dir:str, bucket_count:int, image_paths) -> list:
+        '''画像ファイルパスをランダムなバケットへ振り分けて書き出す
+        Return: (バケット, 画像数) のリスト（画像のないバケットは除く）
+        '''
+        files = []
+        counts = [0] * bucket_count
+        try:
+            for i in range(bucket_count):
+                fd, bucket_path = tempfile.mkstemp(suffix=".bin", dir=cycle_dir)
+                files.append((bucket_path, os.fdopen(fd, 'wb')))
+            for image_path in image_paths:
+                data = os.fsencode(image_path)
+                bucket = random.randrange(bucket_count)
+                files[bucket][1].write(self.__RECORD_HEADER.pack(len(data)) + data)
+                counts[bucket] += 1
+        finally:
+            for bucket_path, f in files:
+                f.close()
+        buckets = []
+        for (bucket_path, f), records in zip(files, counts):
+            if records > 0:
+                buckets.append((bucket_path, records))
+            else:
+                os.remove(bucket_path)
+        return buckets
+
+    def __read_bucket(self, bucket_path:str):
+        '''バケットの画像ファイルパスを順に読み出す
+        Return: 画像ファイルパスのジェネレータ
+        '''
+        with open(bucket_path, 'rb') as f:
+            while True:
+                header = f.read(self.__RECORD_HEADER.size)
+                if len(header) < self.__RECORD_HEADER.size:
+                    return
+                length, = self.__RECORD_HEADER.unpack(header)
+                yield os.fsdecode(f.read(length))
+
+    def __clear_work_dir(self):
+        '''破棄した周回の一時ファイルを削除（準備スレッドで実行）
+        '''
+        for name in os.listdir(self.__work_dir.name):
+            shutil.rmtree(os.path.join(self.__work_dir.name, name), ignore_errors=True)
+
+    def __scan_images(self, folders:list):
+        '''フォルダ以下の表示対象の画像を走査（stat は行わない）
+        Return: 画像ファイルパスのジェネレータ
+        '''
+        stack = list(reversed(folders))
+        while len(stack) > 0:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        elif self.__pattern.match(entry.name):
+                            yield entry.path
+            except OSError:
+                continue    # 走査中に削除されたフォルダ
+
+    def __avoid_repeat(self, position:int):
+        '''指定位置の画像が直前の画像と同じ場合、取り出し済みの範囲の別の画像と入れ替え
+        '''
+        if self.__window[position] != self.__last:
+            return
+        for swap in range(position + 1, len(self.__window)):
+            if self.__window[swap] != self.__last:
+                self.__window[position], self.__window[swap] = self.__window[swap], self.__window[position]
+                return
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.ImportCommon import *
+
+## 周期処理統計用ライブラリ
+from collections import deque
+
+
+class TickScheduler:
+    ''' 秒境界に合わせた周期処理クラス
+    ※Tkのメインループ上で after() により実行するため、周期処理からウィジェットを直接操作できる
+    ※次の予定時刻は前回の予定時刻から求め、処理時間の分だけ周期が後ろにずれていかないようにする
+    ※予定時刻から1周期以上遅れた場合は、遅れた分の周期を飛ばして missed として数える
+    ※周期処理には重い処理を含めず、ワーカースレッド／プロセスへ依頼すること
+    '''
+    def __init__(self, root:tk.Misc, callback, period:int=1, history:int=600):
+        '''コンストラクタ
+        Param: Tkウィジェット、周期処理（引数: 予定時刻の日時）、周期[s]、統計に使用する直近の周期数
+        '''
+        self.__root = root
+        self.__callback = callback
+        self.__period = period
+        self.__next_due = None          # 次の予定時刻（エポック秒）
+        self.__after_id = None
+        self.__jitters = deque(maxlen=history)  # 直近の周期の予定時刻からの遅れ[s]
+        self.ticks = 0                  # 実行した周期数
+        self.missed = 0                 # 飛ばした周期数
+        self.max_jitter = 0.0           # 予定時刻からの最大の遅れ[s]
+
+    def start(self):
+        '''周期処理開始（直後の秒境界から開始）
+        '''
+        if self.__after_id is not None:
+            return
+        self.__next_due = math.floor(time.time() / self.__period) * self.__period + self.__period
+        self.__schedule()
+
+    def stop(self):
+        '''周期処理停止
+        '''
+        if self.__after_id is not None:
+            self.__root.after_cancel(self.__after_id)
+            self.__after_id = None
+
+    def stats(self) -> dict:
+        '''周期処理の遅れの統計を取得
+        Return: 実行周期数、飛ばした周期数、直近の遅れの平均／95パーセンタイル／最大[ms]、起動以降の最大の遅れ[ms]
+        '''
+        jitters = sorted(self.__jitters)
+        if len(jitters) < 1:
+            return {"ticks": self.ticks, "missed": self.missed, "mean_ms": 0.0, "p95_ms": 0.0, "recent_max_ms": 0.0,
+                    "max_ms": 0.0}
+        p95 = jitters[min(len(jitters) - 1, int(len(jitters) * 0.95))]
+        return {"ticks": self.ticks, "missed": self.missed, "mean_ms": 1000 * sum(jitters) / len(jitters),
+                "p95_ms": 1000 * p95, "recent_max_ms": 1000 * jitters[-1], "max_ms": 1000 * self.max_jitter}
+
+    def __schedule(self):
+        '''次の予定時刻に周期処理を予約
+        '''
+        delay_ms = max(0, math.ceil((self.__next_due - time.time()) * 1000))
+        self.__after_id = self.__root.after(delay_ms, self.__on_tick)
+
+    def __on_tick(self):
+        '''周期処理
+        '''
+        now = time.time()
+        due = self.__next_due
+        if now < due - self.__period:
+            # 時刻が戻された場合、現在時刻から予定を組み直す
+            due = math.floor(now / self.__period) * self.__period
+        elif now < due:
+            self.__schedule()   # after() が予定時刻より早く呼ばれた場合
+            return
+        jitter = now - due
+        skipped = int(jitter // self.__period)
+        if skipped > 0:
+            # 遅れた分の周期は飛ばし、最新の周期のみ実行
+            self.missed += skipped
+            due += skipped * self.__period
+            jitter = now - due
+        self.ticks += 1
+        self.__jitters.append(jitter)
+        self.max_jitter = max(self.max_jitter, jitter)
+        # 周期処理で例外が発生しても止まらないよう、先に次の周期を予約
+        self.__next_due = due + self.__period
+        self.__schedule()
+        self.__callback(dt.datetime.fromtimestamp(due))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from AppCodes.BaseLibrary import BaseWindow, BaseFrame, BaseButton, ButtonConfig, BaseCanvas
+from AppCodes.CalendarWindow import DayButton
+from AppCodes.Configuration import CalendarConfig
+from AppCodes.EventBus import DATE_CHANGED, DATE_SELECTED, EventBus
+from AppCodes.HotPathMetrics import METRICS
+from AppCodes.ImportCommon import *
+from AppCodes.MonthGrid import CELL_COUNT, MonthGridCache
+
+
+class Window3(BaseWindow):
+    ''' 年間カレンダー画面設計クラス
+    '''
+    ### 定数
+    __SELECT_H = 60     # 年選択部分の高さ
+
+    def __init__(self, master, init_date:dt.datetime, event_bus:EventBus):
+        '''コンストラクタ
+        Param: 画面生成日時、画面間イベント通知
+        '''
+        super().__init__(master=master)
+        self.__create_select_frame()
+        # 年間カレンダー表示部分
+        self._year_view = YearView(self, self._MAIN_L - self.__SELECT_H, WIDTH, init_date.date(), event_bus)
+        self._year_view.pack()
+        self.__update_year_label()
+        # 日付が進んだ場合、今日の日付の表示を更新
+        event_bus.subscribe(DATE_CHANGED, self.__date_changed_callback)
+
+    def __del__(self):
+        '''デストラクタ
+        '''
+        super().__del__()
+
+    def __create_select_frame(self):
+        '''年選択フレームを生成
+        '''
+        select_frame = BaseFrame(master=self)
+        select_frame.pack()
+        # 今年に戻すボタン
+        today_button = BaseButton(select_frame, ButtonConfig("today", 16, 2, 4))
+        today_button.bind("<1>", self.__show_this_year)
+        today_button.pack(side=tk.LEFT)
+        # 前年表示ボタン
+        prev_year_button = BaseButton(select_frame, ButtonConfig("<", 16, 2, 2))
+        prev_year_button.bind("<1>", self.__change_year)
+        prev_year_button.pack(side=tk.LEFT)
+        # 表示年
+        self.__year_label = tk.Label(select_frame, font=self._set_font(24), width=6, foreground=self._fg_color,
+                                     background=self._bg_color)
+        self.__year_label.pack(side=tk.LEFT)
+        # 次年表示ボタン
+        next_year_button = BaseButton(select_frame, ButtonConfig(">", 16, 2, 2))
+        next_year_button.bind("<1>", self.__change_year)
+        next_year_button.pack(side=tk.LEFT)
+
+    def __update_year_label(self):
+        self.__year_label.configure(text=str(self._year_view.year))
+
+    def __change_year(self, event):
+        '''表示年を変更
+        '''
+        year = self._year_view.year
+        if (event.widget["text"] == "<"):
+            year -= 1           # 前年表示ボタン押下
+        elif (event.widget["text"] == ">"):
+            year += 1           # 次年表示ボタン押下
+        self._year_view.show_year(year)
+        self.__update_year_label()
+
+    def __show_this_year(self, event):
+        '''表示年を今年に戻す
+        '''
+        self._year_view.show_year(self._year_view.current_date.year)
+        self.__update_year_label()
+
+    def __date_changed_callback(self, new_date:dt.date):
+        '''日付が進んだ場合、今日の日付の表示を更新
+        '''
+        self._year_view.set_current_date(new_date)
+
+
+class YearView(BaseCanvas):
+    ''' 年間カレンダー表示クラス
+    ※12か月分（約500日）を日付ボタンではなく1つのキャンバス上のテキストで描画し、
+      クリック位置から日付を求める（ウィジェット数を増やさない）
+    ※キャンバス上のテキストは1回だけ生成し、表示年の変更時は内容が変わったもののみ変更
+    '''
+    ### 定数
+    __COLS = 4          # 横に並べる月数
+    __ROWS = 3          # 縦に並べる月数
+    __MARGIN = 8        # 月毎の余白
+    __TITLE_H = 24      # 月名の高さ
+    __WEEK_H = 18       # 曜日の高さ
+
+    def __init__(self, master, height:int, width:int, init_date:dt.date, event_bus:EventBus):
+        '''コンストラクタ
+        Param: マスター、表示用キャンバス高さ、幅、現在の年月日、画面間イベント通知
+        '''
+        super().__init__(master=master, height=height, width=width)
+        self.__event_bus = event_bus
+        self.__month_grids = MonthGridCache(max_months=48)
+        self.__block_w = width / self.__COLS
+        self.__block_h = height / self.__ROWS
+        self.__cell_w = (self.__block_w - 2 * self.__MARGIN) / 7
+        self.__cell_h = (self.__block_h - self.__TITLE_H - self.__WEEK_H - self.__MARGIN) / 6
+        self.current_date = init_date
+        self.year = None
+        self.__grids = []               # 表示中の月毎の MonthGrid
+        self.__shown_cells = []         # 表示中の月毎の42マス分の (日付テキスト, 文字色番号)
+        self.updated_items = 0          # 直近の表示年変更で内容を変更したテキスト数
+        self.__create_items()
+        self.bind("<Button-1>", self.__select_day)
+        self.show_year(init_date.year)
+
+    def __create_items(self):
+        '''月名、曜日、日付のテキストと今日の日付の背景を生成
+        '''
+        month_texts = CalendarConfig().get_month_texts()
+        week_texts = CalendarConfig().get_week_texts()
+        week_colors = [2, 0, 0, 0, 0, 0, 1]
+        # 今日の日付の背景（日付のテキストより下に表示）
+        self.__today_item = self.create_rectangle(0, 0, 0, 0, fill=DayButton._bg_color[1], width=0, state=tk.HIDDEN)
+        self.__day_items = []
+        for month_index in range(12):
+            left, top = self.__block_origin(month_index)
+            center_x = left + self.__block_w / 2
+            self.create_text(center_x, top + self.__TITLE_H / 2, text=month_texts[month_index + 1],
+                             font=self._set_font(12), fill=self._fg_color)
+            for col in range(7):
+                x = left + self.__MARGIN + (col + 0.5) * self.__cell_w
+                self.create_text(x, top + self.__TITLE_H + self.__WEEK_H / 2, text=week_texts[col],
+                                 font=self._set_font(9), fill=DayButton._fg_color[week_colors[col]])
+            items = []
+            for index in range(CELL_COUNT):
+                x, y = self.__cell_center(left, top, index)
+                items.append(self.create_text(x, y, text="", font=self._set_font(10), fill=self._fg_color))
+            self.__day_items.append(items)
+            self.__shown_cells.append([("", 0)] * CELL_COUNT)
+
+    def __block_origin(self, month_index:int) -> tuple:
+        '''月毎の表示部分の左上の座標
+        '''
+        return ((month_index % self.__COLS) * self.__block_w, (month_index // self.__COLS) * self.__block_h)
+
+    def __cell_center(self, left:float, top:float, index:int) -> tuple:
+        '''日付1マスの中心の座標
+        '''
+        x = left + self.__MARGIN + ((index % 7) + 0.5) * self.__cell_w
+        y = top + self.__TITLE_H + self.__WEEK_H + ((index // 7) + 0.5) * self.__cell_h
+        return (x, y)
+
+    @METRICS.timed("year_view_show")
+    def show_year(self, year:int):
+        '''指定した年の年間カレンダーを表示（内容が変わった日付のテキストのみ変更）
+        '''
+        self.year = year
+        self.__grids = [self.__month_grids.get(year, month) for month in range(1, 13)]
+        today = None
+        updated = 0
+        for month_index, grid in enumerate(self.__grids):
+            items = self.__day_items[month_index]
+            shown = self.__shown_cells[month_index]
+            for index, (day_text, f_color, b_color) in enumerate(grid.cells(self.current_date)):
+                if (day_text, f_color) != shown[index]:
+                    self.itemconfigure(items[index], text=day_text, fill=DayButton._fg_color[f_color])
+                    shown[index] = (day_text, f_color)
+                    updated += 1
+                if b_color == 1:
+                    today = (month_index, index)
+        self.updated_items = updated
+        # 今日の日付の背景を移動（表示年に今日が含まれない場合は非表示）
+        if today is None:
+            self.itemconfigure(self.__today_item, state=tk.HIDDEN)
+        else:
+            x, y = self.__cell_center(*self.__block_origin(today[0]), today[1])
+            self.coords(self.__today_item, x - self.__cell_w / 2, y - self.__cell_h / 2,
+                        x + self.__cell_w / 2, y + self.__cell_h / 2)
+            self.itemconfigure(self.__today_item, state=tk.NORMAL)
+        # 前後の年への移動に備える
+        self.__month_grids.prefetch_months([(year + 1, month) for month in range(1, 13)]
+                                           + [(year - 1, month) for month in range(1, 13)])
+
+    def set_current_date(self, current_date:dt.date):
+        '''現在の年月日を更新
+        '''
+        self.current_date = current_date
+        self.show_year(self.year)
+
+    def __select_day(self, event):
+        '''クリック位置の日付を求め、日付選択イベントを発行
+        '''
+        block_col = int(event.x // self.__block_w)
+        block_row = int(event.y // self.__block_h)
+        if not ((0 <= block_col < self.__COLS) and (0 <= block_row < self.__ROWS)):
+            return
+        left, top = self.__block_origin(block_row * self.__COLS + block_col)
+        col = math.floor((event.x - left - self.__MARGIN) / self.__cell_w)
+        row = math.floor((event.y - top - self.__TITLE_H - self.__WEEK_H) / self.__cell_h)
+        if not ((0 <= col < 7) and (0 <= row < 6)):
+            return      # 月名、曜日、余白
+        grid = self.__grids[block_row * self.__COLS + block_col]
+        day = grid.days[row * 7 + col]
+        if day == 0:
+            return      # 日付がないマス
+        self.__event_bus.publish(DATE_SELECTED, dt.date(grid.year, grid.month, day))
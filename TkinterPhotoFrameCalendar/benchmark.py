@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''性能計測スクリプト
+使い方: python3 benchmark.py decode [画像フォルダ]
+        python3 benchmark.py jitter [画像フォルダ] [計測秒数]
+        python3 benchmark.py dedup [画像フォルダ] [ハミング距離]
+        python3 benchmark.py render [画像フォルダ] [計測秒数]
+        python3 benchmark.py calendar [表示年数]
+        python3 benchmark.py navigate [連打回数] [操作間隔ms]
+        python3 benchmark.py yearview [表示年数]
+        python3 benchmark.py holidays [検索回数]
+'''
+from AppCodes.ImportCommon import *
+from AppCodes.OutputMedia import ProcessDecoder, decode_image
+
+import multiprocessing as mp
+import resource
+import sys
+import tempfile
+
+
+### 定数
+SAMPLE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sampleimages")
+CANVAS_SIZE = (HEIGHT, HEIGHT)      # スライドショー表示キャンバスサイズ
+TICK_PERIOD = 0.1                   # 周期処理の間隔[s]（1Hzループを10倍速で模擬）
+
+
+def list_images(folder:str) -> list:
+    '''計測対象の画像ファイルパスを取得
+    '''
+    paths = []
+    for dirpath, dirnames, images in os.walk(folder):
+        for image in images:
+            if re.search(r'.+\.(jpg|JPG|jpeg|png|PNG)$', image):
+                paths.append(os.path.join(dirpath, image))
+    return sorted(paths)
+
+
+def _decode_worker(paths:list, use_draft:bool, result_queue):
+    '''別プロセスで全画像を読み込み、処理時間とピークRSSを返す
+    '''
+    latencies = []
+    for path in paths:
+        start = time.perf_counter()
+        decode_image(path, CANVAS_SIZE, BEIGE, use_draft, sys.maxsize)
+        latencies.append(time.perf_counter() - start)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result_queue.put((latencies, peak_rss_kb))
+
+
+def benchmark_decode(folder:str):
+    '''通常読み込みとJPEG縮小読み込みの処理時間・ピークRSSを比較
+    ※ピークRSSを独立して計測するため、読み込み方式ごとに新しいプロセスで実行
+    '''
+    paths = list_images(folder)
+    ctx = mp.get_context("spawn")
+    print("images: {}  canvas: {}x{}".format(len(paths), CANVAS_SIZE[0], CANVAS_SIZE[1]))
+    print("{:<8} {:>10} {:>10} {:>10} {:>12}".format("mode", "mean[ms]", "p95[ms]", "max[ms]", "peakRSS[MB]"))
+    for mode, use_draft in (("full", False), ("draft", True)):
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=_decode_worker, args=(paths, use_draft, result_queue))
+        proc.start()
+        latencies, peak_rss_kb = result_queue.get()
+        proc.join()
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print("{:<8} {:>10.2f} {:>10.2f} {:>10.2f} {:>12.1f}".format(
+            mode, 1000 * sum(latencies) / len(latencies), 1000 * p95, 1000 * latencies[-1], peak_rss_kb / 1024))
+
+
+def _tick_work():
+    '''周期処理の代わりに時計描画相当の計算を行う
+    '''
+    now = dt.datetime.now()
+    text = "{:04} / {:02} / {:02} {:02} : {:02} : {:02}".format(now.year, now.month, now.day, now.hour, now.minute, now.second)
+    for deg in range(0, 360 * 20):
+        math.cos(math.radians(deg)) * len(text)
+
+
+def _measure_jitter(decode, paths:list, seconds:float) -> list:
+    '''画像を読み込み続けながら周期処理を実行し、各周期の遅れを計測
+    '''
+    stop = threading.Event()
+    def load_images():
+        while not stop.is_set():
+            for path in paths:
+                if stop.is_set():
+                    break
+                decode(path, CANVAS_SIZE, BEIGE, True, sys.maxsize)
+    load_thread = threading.Thread(target=load_images, daemon=True)
+    load_thread.start()
+    jitters = []
+    next_tick = time.perf_counter() + TICK_PERIOD
+    end = next_tick + seconds
+    while next_tick < end:
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+        jitters.append(time.perf_counter() - next_tick)
+        _tick_work()
+        next_tick += TICK_PERIOD
+    stop.set()
+    load_thread.join()
+    return jitters
+
+
+def benchmark_jitter(folder:str, seconds:float):
+    '''表示側プロセス内（スレッド）と別プロセスでの画像読み込み中の周期処理の遅れを比較
+    '''
+    paths = list_images(folder)
+    print("images: {}  tick: {}s  duration: {}s".format(len(paths), TICK_PERIOD, seconds))
+    print("{:<8} {:>10} {:>10} {:>10}".format("backend", "mean[ms]", "p95[ms]", "max[ms]"))
+    for backend in ("thread", "process"):
+        if backend == "thread":
+            decode = decode_image
+        else:
+            decoder = ProcessDecoder(0)
+            decode = decoder.decode
+        jitters = sorted(_measure_jitter(decode, paths, seconds))
+        p95 = jitters[min(len(jitters) - 1, int(len(jitters) * 0.95))]
+        print("{:<8} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+            backend, 1000 * sum(jitters) / len(jitters), 1000 * p95, 1000 * jitters[-1]))
+
+
+def benchmark_dedup(folder:str, distance:int):
+    '''知覚ハッシュの計算（キャッシュなし／あり）と類似画像判定の処理時間を計測
+    '''
+    from AppCodes.PhotoHash import DuplicateFilter     # NumPy は重複表示抑制を使用する場合のみ必要
+    images = []
+    for path in list_images(folder):
+        stat = os.stat(path)
+        images.append((path, stat.st_size, stat.st_mtime_ns))
+    print("images: {}  distance: {}  workers: {}".format(len(images), distance, os.cpu_count()))
+    print("{:<8} {:>10} {:>12} {:>12}".format("cache", "total[s]", "images/s", "duplicates"))
+    with tempfile.TemporaryDirectory() as cache_folder:
+        dup_filter = DuplicateFilter(os.path.join(cache_folder, "PhotoHash.db"), distance, 0)
+        for cache in ("cold", "warm"):
+            start = time.perf_counter()
+            duplicates = dup_filter.update(images)
+            elapsed = time.perf_counter() - start
+            print("{:<8} {:>10.2f} {:>12.1f} {:>12}".format(cache, elapsed, len(images) / max(elapsed, 1e-9), len(duplicates)))
+        dup_filter.stop_thread()
+
+
+def benchmark_render(folder:str, seconds:float):
+    '''Tkを使わないオフスクリーン描画で、画面1／画面2の描画速度（フレーム/秒）を計測
+    '''
+    from AppCodes.OffscreenRender import OffscreenRenderer     # 画面生成に必要な設定を読み込むため、計測時のみ読み込み
+    paths = list_images(folder)
+    renderer = OffscreenRenderer()
+    print("images: {}  screen: {}x{}  duration: {}s".format(len(paths), WIDTH, HEIGHT, seconds))
+    print("{:<8} {:>8} {:>10} {:>10} {:>10} {:>10}".format("screen", "frames", "fps", "mean[ms]", "p95[ms]", "max[ms]"))
+    start_datetime = dt.datetime.now()
+    for screen in ("window1", "window2"):
+        latencies = []
+        end = time.perf_counter() + seconds / 2
+        while time.perf_counter() < end:
+            frame = len(latencies)
+            now = start_datetime + dt.timedelta(seconds=frame)
+            start = time.perf_counter()
+            if screen == "window1":
+                # 5秒毎にスライドを切り替える（直近の画像は整形済みのものを再利用）
+                slide = paths[(frame // 5) % len(paths)] if len(paths) > 0 else None
+                renderer.render_window1(now, slide_path=slide)
+            else:
+                renderer.render_window2(now)
+            latencies.append(time.perf_counter() - start)
+        total = sum(latencies)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print("{:<8} {:>8} {:>10.1f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+            screen, len(latencies), len(latencies) / max(total, 1e-9), 1000 * total / len(latencies), 1000 * p95,
+            1000 * latencies[-1]))
+
+
+def current_rss_mb() -> float:
+    '''現在の常駐メモリサイズ[MB]（/proc がない環境ではピーク値）
+    '''
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def count_widgets(widget:tk.Misc) -> int:
+    '''子孫ウィジェット数
+    '''
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def benchmark_calendar(years:int):
+    '''カレンダーの表示月を1か月ずつ進め、ウィジェット数と常駐メモリサイズが増え続けないことを確認
+    ※画面表示が必要（Tkを使用）
+    '''
+    from AppCodes.CalendarWindow import Calendar      # 画面生成に必要な設定を読み込むため、計測時のみ読み込み
+    from AppCodes.EventBus import EventBus
+    root = tk.Tk()
+    calendar = Calendar(root, dt.date.today(), EventBus())
+    calendar.pack()
+    root.update()
+    print("months: {}".format(12 * years))
+    print("{:>6} {:>8} {:>10} {:>12}".format("year", "widgets", "RSS[MB]", "month[ms]"))
+    start_year = 2100 - years
+    latencies = []
+    for year in range(start_year, 2100):
+        for month in range(1, 13):
+            start = time.perf_counter()
+            calendar.show_month(year, month)
+            root.update_idletasks()
+            latencies.append(time.perf_counter() - start)
+        if ((year - start_year) % max(1, years // 10)) == 0:
+            print("{:>6} {:>8} {:>10.1f} {:>12.2f}".format(
+                year, count_widgets(root), current_rss_mb(), 1000 * sum(latencies[-12:]) / 12))
+    print("{:>6} {:>8} {:>10.1f} {:>12.2f}".format("end", count_widgets(root), current_rss_mb(),
+                                                   1000 * sum(latencies) / len(latencies)))
+    root.destroy()
+
+
+def run_tk_events(root, until:float):
+    '''指定時刻（perf_counter）までTkのイベントを処理
+    '''
+    while time.perf_counter() < until:
+        root.update()
+        time.sleep(0.001)
+
+
+def benchmark_navigate(clicks:int, interval_ms:float):
+    '''次月表示ボタンの連打を模擬し、最後の操作からカレンダー表示完了までの時間を計測
+    ※1回毎に表示する場合と、依頼をまとめて最後の年月のみ表示する場合を比較（画面表示が必要）
+    ※操作の間もTkのイベントを処理し続ける（年選択ボックスの自動リピートは50ms間隔）
+    '''
+    from AppCodes.CalendarWindow import Calendar      # 画面生成に必要な設定を読み込むため、計測時のみ読み込み
+    from AppCodes.EventBus import EventBus
+    root = tk.Tk()
+    calendar = Calendar(root, dt.date.today(), EventBus())
+    calendar.pack()
+    root.update()
+    print("clicks per burst: {}  interval: {:.0f} ms  delay: {} ms".format(clicks, interval_ms,
+                                                                           Calendar.NAVIGATE_DELAY_MS))
+    print("{:<10} {:>8} {:>14}".format("mode", "renders", "latency[ms]"))
+    for mode in ("immediate", "coalesced"):
+        renders = calendar.renders
+        year, month = (1950 if mode == "immediate" else 2000), 1
+        start = time.perf_counter()
+        for click in range(clicks):
+            month = 1 if month == 12 else month + 1
+            year = year + 1 if month == 1 else year
+            last_click = time.perf_counter()
+            if mode == "immediate":
+                calendar.show_month(year, month)
+            else:
+                calendar.request_month(year, month)
+            if click < clicks - 1:
+                run_tk_events(root, last_click + interval_ms / 1000)
+        if mode == "immediate":
+            root.update()
+            latency = time.perf_counter() - last_click
+        else:
+            run_tk_events(root, last_click + (Calendar.NAVIGATE_DELAY_MS + 500) / 1000)   # 表示完了の記録まで待つ
+            latency = calendar.navigation_latency
+        print("{:<10} {:>8} {:>14.2f}   (burst total {:.2f} ms)".format(
+            mode, calendar.renders - renders, 1000 * latency, 1000 * (time.perf_counter() - start)))
+    root.destroy()
+
+
+def benchmark_yearview(years:int):
+    '''年間カレンダーの生成時間と、表示年の変更1回あたりの処理時間・変更したテキスト数を計測
+    ※画面表示が必要（Tkを使用）
+    '''
+    from AppCodes.EventBus import EventBus             # 画面生成に必要な設定を読み込むため、計測時のみ読み込み
+    from AppCodes.YearWindow import YearView
+    root = tk.Tk()
+    start = time.perf_counter()
+    year_view = YearView(root, HEIGHT - 60, WIDTH, dt.date.today(), EventBus())
+    year_view.pack()
+    root.update()
+    print("build: {:.2f} ms  items: {}".format(1000 * (time.perf_counter() - start), len(year_view.find_all())))
+    latencies = []
+    updated = []
+    for year in range(2100 - years, 2100):
+        start = time.perf_counter()
+        year_view.show_year(year)
+        root.update_idletasks()
+        latencies.append(time.perf_counter() - start)
+        updated.append(year_view.updated_items)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print("{:>8} {:>10} {:>10} {:>10} {:>14}".format("years", "mean[ms]", "p95[ms]", "max[ms]", "updated/year"))
+    print("{:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>14.1f}".format(
+        years, 1000 * sum(latencies) / len(latencies), 1000 * p95, 1000 * latencies[-1], sum(updated) / len(updated)))
+    root.destroy()
+
+
+def benchmark_holidays(lookups:int):
+    '''祝日表と月毎の祝日算出が全ての年月で一致することを確認し、祝日判定の処理速度を比較
+    '''
+    from AppCodes.Configuration import CalendarConfig, HolidayTable, JapanDaysConfig   # qreki は祝日計測時のみ必要
+    CalendarConfig()        # 週の始まりをアプリと同じ日曜日に設定
+    jp_days_conf = JapanDaysConfig()
+    start = time.perf_counter()
+    holiday_table = HolidayTable()
+    print("build: {:.2f} ms  holidays: {}".format(1000 * (time.perf_counter() - start), len(holiday_table)))
+    mismatches = [(year, month) for year in range(HolidayTable.FIRST_YEAR, HolidayTable.LAST_YEAR + 1) for month in range(1, 13)
+                  if holiday_table.month_holidays(year, month) != jp_days_conf._calc_japan_holiday_list(year, month)]
+    print("months checked: {}  mismatches: {}".format(12 * (HolidayTable.LAST_YEAR - HolidayTable.FIRST_YEAR + 1),
+                                                      mismatches if len(mismatches) > 0 else 0))
+    first = dt.date(HolidayTable.FIRST_YEAR, 1, 1).toordinal()
+    last = dt.date(HolidayTable.LAST_YEAR, 12, 31).toordinal()
+    dates = [dt.date.fromordinal(random.randint(first, last)) for i in range(lookups)]
+    print("{:<10} {:>10} {:>14}".format("method", "total[ms]", "lookups/s"))
+    for method in ("calc", "table", "between"):
+        start = time.perf_counter()
+        if method == "calc":
+            for date in dates:
+                date.day in jp_days_conf._calc_japan_holiday_list(date.year, date.month)
+        elif method == "table":
+            for date in dates:
+                holiday_table.is_holiday(date)
+        else:
+            for date in dates:
+                holiday_table.holidays_between(date, date + dt.timedelta(days=30))
+        elapsed = time.perf_counter() - start
+        print("{:<10} {:>10.2f} {:>14.0f}".format(method, 1000 * elapsed, lookups / max(elapsed, 1e-9)))
+
+
+if __name__ == "__main__":
+    if (len(sys.argv) < 2) or (sys.argv[1] == "decode"):
+        benchmark_decode(sys.argv[2] if len(sys.argv) > 2 else SAMPLE_FOLDER)
+    elif sys.argv[1] == "jitter":
+        benchmark_jitter(sys.argv[2] if len(sys.argv) > 2 else SAMPLE_FOLDER,
+                         float(sys.argv[3]) if len(sys.argv) > 3 else 20.0)
+    elif sys.argv[1] == "dedup":
+        benchmark_dedup(sys.argv[2] if len(sys.argv) > 2 else SAMPLE_FOLDER,
+                        int(sys.argv[3]) if len(sys.argv) > 3 else 6)
+    elif sys.argv[1] == "render":
+        benchmark_render(sys.argv[2] if len(sys.argv) > 2 else SAMPLE_FOLDER,
+                         float(sys.argv[3]) if len(sys.argv) > 3 else 10.0)
+    elif sys.argv[1] == "calendar":
+        benchmark_calendar(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+    elif sys.argv[1] == "navigate":
+        benchmark_navigate(int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+                           float(sys.argv[3]) if len(sys.argv) > 3 else 50.0)
+    elif sys.argv[1] == "yearview":
+        benchmark_yearview(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+    elif sys.argv[1] == "holidays":
+        benchmark_holidays(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    else:
+        print(__doc__)
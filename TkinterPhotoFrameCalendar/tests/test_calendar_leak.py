@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import datetime as dt
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip("qreki")        # カレンダーの祝日表示に必要
+pytest.importorskip("pyaudio")      # 画面部品の読み込みに必要
+
+import tkinter as tk
+
+
+### 定数
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XVFB_DISPLAY = ":99"
+START_YEAR = 1900
+YEARS = 200
+WARMUP_YEARS = 10           # 祝日表や月毎の表示内容のキャッシュが埋まるまで
+RSS_TOLERANCE_MB = 4.0      # 常駐メモリサイズの許容増加量
+
+
+@pytest.fixture(scope="module")
+def display():
+    '''画面を用意（DISPLAY がない場合は Xvfb を起動し、Xvfb もない場合はスキップ）
+    '''
+    if os.environ.get("DISPLAY"):
+        yield os.environ["DISPLAY"]
+        return
+    if shutil.which("Xvfb") is None:
+        pytest.skip("no display and Xvfb is not installed")
+    xvfb = subprocess.Popen(["Xvfb", XVFB_DISPLAY, "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    try:
+        for i in range(50):
+            try:
+                tk.Tk().destroy()
+                break
+            except tk.TclError:
+                time.sleep(0.1)     # Xvfb の起動待ち
+        else:
+            pytest.skip("Xvfb did not start")
+        yield XVFB_DISPLAY
+    finally:
+        del os.environ["DISPLAY"]
+        xvfb.terminate()
+        xvfb.wait()
+
+
+def test_paging_200_years_keeps_widgets_and_rss_flat(display, monkeypatch):
+    monkeypatch.chdir(PROJECT_DIR)      # 設定ファイルをアプリと同じ場所から読み込む
+    from AppCodes.CalendarWindow import Calendar
+    from AppCodes.EventBus import EventBus
+    from benchmark import count_widgets, current_rss_mb
+    root = tk.Tk()
+    try:
+        calendar = Calendar(root, dt.date(2000, 1, 1), EventBus())
+        calendar.pack()
+        root.update()
+        widgets = count_widgets(root)
+        baseline_rss = None
+        for year in range(START_YEAR, START_YEAR + YEARS):
+            for month in range(1, 13):
+                calendar.show_month(year, month)
+                root.update_idletasks()
+            assert count_widgets(root) == widgets, "widgets grew at {}".format(year)
+            if year == START_YEAR + WARMUP_YEARS:
+                baseline_rss = current_rss_mb()
+        assert current_rss_mb() - baseline_rss < RSS_TOLERANCE_MB
+    finally:
+        root.destroy()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip("qreki")        # Configuration の読み込みに必要
+
+
+### 定数
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_holiday_table_matches_rule_calculation(monkeypatch):
+    monkeypatch.chdir(PROJECT_DIR)      # 設定ファイルをアプリと同じ場所から読み込む
+    from AppCodes.Configuration import CalendarConfig, HolidayTable, JapanDaysConfig
+    CalendarConfig()        # 週の始まりをアプリと同じ日曜日に設定
+    jp_days_conf = JapanDaysConfig()
+    holiday_table = HolidayTable()
+    months = [(year, month) for year in range(HolidayTable.FIRST_YEAR, HolidayTable.LAST_YEAR + 1)
+              for month in range(1, 13)]
+    assert len(months) == 2412
+    mismatches = [(year, month) for year, month in months
+                  if holiday_table.month_holidays(year, month) != jp_days_conf._calc_japan_holiday_list(year, month)]
+    assert mismatches == []
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from collections import Counter
+import os
+import random
+import re
+
+from AppCodes.Playlist import ShufflePlaylist, StreamingPlaylist
+
+
+### 定数
+ENTRY_COUNT = 100000        # 大量画像を想定した登録画像数
+STREAM_COUNT = 3000         # stream 方式で走査する画像数
+STREAM_WINDOW = 64          # stream 方式で一度に保持する画像数
+IMAGE_PATTERN = re.compile(r'.+\.jpe?g$', re.IGNORECASE)
+
+
+def make_playlist(weights:dict=None) -> ShufflePlaylist:
+    '''ENTRY_COUNT 枚を登録した表示順を生成
+    Param: 重みを1以外にする画像（key: 番号）
+    '''
+    weights = weights if weights is not None else {}
+    playlist = ShufflePlaylist()
+    playlist.reset([("img{:06d}.jpg".format(i), weights.get(i, 1)) for i in range(ENTRY_COUNT)])
+    return playlist
+
+
+def play_cycle(playlist:ShufflePlaylist) -> list:
+    '''1周分を表示
+    '''
+    shown = [playlist.next()]
+    while not playlist.is_cycle_end():
+        shown.append(playlist.next())
+    return shown
+
+
+def test_no_repeats_within_cycle():
+    random.seed(1)
+    playlist = make_playlist()
+    shown = play_cycle(playlist)
+    assert len(shown) == ENTRY_COUNT
+    assert len(set(shown)) == ENTRY_COUNT
+    assert playlist.cycles == 0
+
+
+def test_cycle_boundaries():
+    random.seed(2)
+    playlist = make_playlist()
+    previous = None
+    for cycle in range(3):
+        shown = play_cycle(playlist)
+        assert playlist.cycles == cycle
+        assert len(set(shown)) == ENTRY_COUNT       # 毎周、全画像を1回ずつ表示
+        assert shown[0] != previous                 # 周の切り替わりで同じ画像が連続しない
+        assert all(a != b for a, b in zip(shown, shown[1:]))
+        previous = shown[-1]
+    playlist.next()
+    assert playlist.cycles == 3
+
+
+def test_weighting():
+    random.seed(3)
+    weights = {i: 1 + (i % 5) for i in range(0, ENTRY_COUNT, 97)}
+    playlist = make_playlist(weights)
+    shown = play_cycle(playlist)
+    counts = Counter(shown)
+    assert len(shown) == ENTRY_COUNT + sum(weight - 1 for weight in weights.values())
+    for i in range(ENTRY_COUNT):
+        assert counts["img{:06d}.jpg".format(i)] == weights.get(i, 1)
+    assert all(a != b for a, b in zip(shown, shown[1:]))
+
+
+def test_add_and_remove():
+    random.seed(4)
+    playlist = make_playlist()
+    first_half = [playlist.next() for i in range(ENTRY_COUNT // 2)]
+    # 追加した画像は同じ周の残りで重みの回数だけ表示される
+    playlist.add("added.jpg", 2)
+    playlist.add("added.jpg", 5)        # 登録済みの場合は無視
+    assert "added.jpg" in playlist
+    # 表示済み／未表示の画像を削除
+    removed = set(first_half[:100]) | set(playlist.upcoming(100))
+    playlist.remove(first_half[0])
+    playlist.remove_all(removed)
+    playlist.remove("not-registered.jpg")
+    assert len(playlist) == ENTRY_COUNT + 1 - len(removed)
+    rest = [playlist.next()]
+    while not playlist.is_cycle_end():
+        rest.append(playlist.next())
+    assert rest.count("added.jpg") == 2
+    assert removed.isdisjoint(rest)
+    assert set(first_half).isdisjoint(rest)
+    assert len(rest) == ENTRY_COUNT - len(first_half) - len(removed - set(first_half)) + 2
+    # 次の周は削除後の画像のみ、追加した画像は重みの回数
+    shown = play_cycle(playlist)
+    counts = Counter(shown)
+    assert len(counts) == ENTRY_COUNT + 1 - len(removed)
+    assert counts["added.jpg"] == 2
+    assert removed.isdisjoint(counts)
+
+
+def test_resync_between_cycles():
+    random.seed(5)
+    entries = [("a.jpg", 1), ("b.jpg", 1)]
+    playlist = ShufflePlaylist()
+    playlist.reset(entries)
+    for cycle in range(50):
+        shown = play_cycle(playlist)
+        # 1周ごとの同期で作り直した表示順へ切り替えても、同じ画像が連続しない
+        resynced = ShufflePlaylist()
+        resynced.reset(entries)
+        resynced.continue_from(playlist)
+        assert resynced.next() != shown[-1]
+        playlist = resynced
+
+
+def make_stream_folder(folder) -> list:
+    '''STREAM_COUNT 枚の空の画像ファイルをサブフォルダに分けて作成
+    '''
+    image_paths = []
+    for i in range(STREAM_COUNT):
+        sub_folder = folder / "sub{:02d}".format(i % 10)
+        sub_folder.mkdir(exist_ok=True)
+        image_path = sub_folder / "img{:06d}.jpg".format(i)
+        image_path.touch()
+        image_paths.append(str(image_path))
+    (folder / "note.txt").touch()       # 表示対象外
+    return image_paths
+
+
+def test_streaming_cycles(tmp_path):
+    random.seed(6)
+    image_paths = make_stream_folder(tmp_path)
+    weight_of = lambda image_path: 3 if image_path.endswith("7.jpg") else 1
+    playlist = StreamingPlaylist(STREAM_WINDOW, IMAGE_PATTERN)
+    playlist.set_source([str(tmp_path)], weight_of=weight_of)     # 走査はバックグラウンドで行い、待たない
+    for cycle in range(2):
+        shown = []
+        while (len(shown) < 1) or (not playlist.is_cycle_end()):
+            image_path = playlist.next()
+            if image_path is None:
+                assert playlist.wait_ready(10.0)    # 次の一定数を準備中
+                continue
+            shown.append(image_path)
+            assert len(playlist.upcoming(STREAM_COUNT)) <= STREAM_WINDOW     # 保持するのは一定数のみ
+        # 毎周、全画像を重みの回数ずつ表示し、同じ画像が連続しない
+        assert Counter(shown) == Counter({image_path: weight_of(image_path) for image_path in image_paths})
+        assert all(a != b for a, b in zip(shown, shown[1:]))
+        assert playlist.cycles == cycle
+        assert len(playlist) == STREAM_COUNT
+
+
+def test_streaming_set_source(tmp_path):
+    random.seed(7)
+    make_stream_folder(tmp_path)
+    other_folder = tmp_path / "other"
+    other_folder.mkdir()
+    (other_folder / "only.jpg").touch()
+    playlist = StreamingPlaylist(STREAM_WINDOW, IMAGE_PATTERN)
+    playlist.set_source([str(tmp_path / "sub00")])
+    assert playlist.wait_ready(10.0)
+    first = playlist.next()
+    # 同じフォルダを設定し直しても、取り出し済みの表示順を続ける
+    upcoming = playlist.upcoming(STREAM_WINDOW)
+    playlist.set_source([str(tmp_path / "sub00")])
+    assert playlist.upcoming(STREAM_WINDOW) == upcoming
+    # フォルダを変更した場合、準備が完了するまでは現在の表示順で表示し、完了後に切り替える
+    playlist.set_source([str(other_folder)])
+    assert playlist.next() == upcoming[0]
+    assert playlist.wait_ready(10.0)
+    assert playlist.next() == str(other_folder / "only.jpg")
+    assert first not in playlist
+    assert len(playlist) == 1
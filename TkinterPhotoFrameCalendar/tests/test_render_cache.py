@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import time
+
+import pytest
+
+pytest.importorskip("pyaudio")      # OutputMedia の読み込みに必要
+
+from PIL import Image
+
+from AppCodes.OutputMedia import DiskRenderCache, ImageSynchronize
+
+
+### 定数
+SIZE = (64, 48)
+COLOR = "#f5f5dc"
+
+
+def synchronize_copies(inside_folder:str, outside_folder:str) -> ImageSynchronize:
+    '''アプリ起動時と同じく内部側フォルダを作り直し、コピー方式で同期してコピー完了を待つ
+    '''
+    if os.path.isdir(inside_folder):
+        shutil.rmtree(inside_folder)
+    os.mkdir(inside_folder)
+    syn_pcs = ImageSynchronize(inside_folder, ImageSynchronize.MODE_COPY)
+    syn_pcs.synchronize([outside_folder])
+    for i in range(100):
+        if not syn_pcs.is_copying():
+            break
+        time.sleep(0.05)
+    syn_pcs.take_copied_images()
+    return syn_pcs
+
+
+def test_disk_cache_hits_after_restart_in_copy_mode(tmp_path):
+    outside_folder = str(tmp_path / "outside")
+    os.mkdir(outside_folder)
+    Image.new("RGB", (320, 240), "red").save(outside_folder + "/photo.jpg")
+    cache_folder = str(tmp_path / "cache")
+    # 1回目の起動：整形した画像をディスクキャッシュへ登録
+    syn_pcs = synchronize_copies(str(tmp_path / "SlideShow"), outside_folder)
+    image_path = syn_pcs.image_paths()[0]
+    assert os.stat(image_path).st_mtime_ns == os.stat(outside_folder + "/photo.jpg").st_mtime_ns
+    disk_cache = DiskRenderCache(cache_folder, 10 * 1024 * 1024)
+    key = disk_cache.make_key(syn_pcs.source_record(image_path), SIZE[0], SIZE[1], COLOR)
+    assert disk_cache.get(key) is None
+    disk_cache.put(key, Image.new("RGB", SIZE, "red"))
+    disk_cache.flush()
+    # 再起動：内部側フォルダは作り直され、日付変更後の入れ替えで別の内部側フォルダになる場合もある
+    time.sleep(0.01)
+    syn_pcs = synchronize_copies(str(tmp_path / "SlideShow_2"), outside_folder)
+    image_path = syn_pcs.image_paths()[0]
+    disk_cache = DiskRenderCache(cache_folder, 10 * 1024 * 1024)
+    key = disk_cache.make_key(syn_pcs.source_record(image_path), SIZE[0], SIZE[1], COLOR)
+    img = disk_cache.get(key)
+    assert img is not None
+    assert img.size == SIZE
+    assert disk_cache.hits == 1
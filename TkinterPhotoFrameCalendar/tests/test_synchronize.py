@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pyaudio")      # OutputMedia の読み込みに必要
+
+from AppCodes.OutputMedia import ImageSynchronize
+
+
+def wait_copies(syn_pcs:ImageSynchronize):
+    '''コピー完了を待つ
+    '''
+    for i in range(100):
+        if not syn_pcs.is_copying():
+            break
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize("mode", [ImageSynchronize.MODE_COPY, ImageSynchronize.MODE_LINK, ImageSynchronize.MODE_DIRECT])
+def test_same_name_in_different_folders(tmp_path, mode):
+    outside_folder = str(tmp_path / "outside")
+    inside_folder = str(tmp_path / "inside")
+    src_paths = [outside_folder + "/2023/IMG_0001.JPG", outside_folder + "/2024/trip/IMG_0001.JPG"]
+    for src_path in src_paths:
+        os.makedirs(os.path.dirname(src_path))
+        with open(src_path, "w") as f:
+            f.write(src_path)
+    os.mkdir(inside_folder)
+    # 索引から取得した画像（その日の画像）でも、フォルダの走査でも、同名の画像を全て同期する
+    for indexed_images in ([(src_path, os.path.getsize(src_path), os.stat(src_path).st_mtime_ns) for src_path in src_paths],
+                           None):
+        syn_pcs = ImageSynchronize(inside_folder, mode)
+        syn_pcs.synchronize([outside_folder], indexed_images)
+        wait_copies(syn_pcs)
+        image_paths = syn_pcs.image_paths()
+        assert len(set(image_paths)) == 2
+        assert sorted(syn_pcs.source_path(image_path) for image_path in image_paths) == src_paths
+        for image_path in image_paths:
+            with open(image_path) as f:
+                assert f.read() == syn_pcs.source_path(image_path)
+        # 1枚だけ削除しても、もう1枚は残る
+        removed = syn_pcs.remove_image(src_paths[0])
+        assert syn_pcs.image_paths() == [syn_pcs.image_path(src_paths[1])]
+        assert syn_pcs.add_image(src_paths[0]) in (removed, None)
+        wait_copies(syn_pcs)
+        assert len(syn_pcs.image_paths()) == 2